@@ -1,82 +1,299 @@
 import sys
+import time
+
+STARTUP_TIME = time.perf_counter()  # 用于 --startup-timing 统计启动耗时
+
 import shutil
 import os
-import re
-import glob
+import json
+from collections import deque
 from PyQt5.QtWidgets import QApplication, QWidget
-from PyQt5.QtCore import QProcess, QThread, pyqtSignal, Qt
+from PyQt5.QtCore import QObject, QProcess, QThread, QTimer, QFileSystemWatcher, pyqtSignal, Qt
 from ui_mainwindow import Ui_MainWindow
-from fusion import process_video_with_subtitles
+from downloader import (build_ytdlp_command, parse_download_progress, parse_output_path, rename_to_clean,
+                        download_video, DOWNLOAD_CONCURRENCY)
+from job_server import WorkerProcess
+from pipeline import Pipeline, Stage
+from metrics import job_metrics
+from events import EventDecoder, ProgressTracker, make_event, describe_progress
+from catalogue import MediaCatalogue
 
 VIDEO_DIR = os.path.join(os.getcwd(), "video")
-SUBTITLE_SCRIPT = "subtitle_generator.py"
-SUBTITLE_TRANSLATE_SCRIPT = "subtitle_translator.py"
+SUBTITLE_DIR = "outsrt"
+TRANSCRIBE_WORKER_SCRIPT = "transcribe_worker.py"
+TRANSLATE_WORKER_SCRIPT = "translate_worker.py"
+WHISPER_MODEL = "small.en"
+FONT_PATH = "/usr/share/fonts/truetype/msttcorefonts/Times_New_Roman.ttf"
+
+# 自动流水线：各阶段并发数与阶段间队列长度
+PIPELINE_CONCURRENCY = {"download": DOWNLOAD_CONCURRENCY, "transcribe": 1, "translate": 1, "fuse": 1}
+PIPELINE_QUEUE_SIZE = 2
+PIPELINE_STAGES = ["download", "transcribe", "translate", "fuse"]
+
+# 日志窗口最多保留的行数与刷新间隔；进度按钮最多每 PROGRESS_REPAINT_MS 毫秒重绘一次
+LOG_MAX_LINES = 5000
+LOG_FLUSH_INTERVAL_MS = 100
+PROGRESS_REPAINT_MS = 250
+# 目录变化通知在该时间内合并为一次增量更新（下载、转写时会连续触发很多次）
+CATALOGUE_DEBOUNCE_MS = 300
+
+
+class CatalogueWatcher(QObject):
+    """用 QFileSystemWatcher 监视视频和字幕目录，目录变化时增量更新 MediaCatalogue，有增删时发出 changed_signal"""
+    changed_signal = pyqtSignal()
+
+    def __init__(self, catalogue, debounce_ms=CATALOGUE_DEBOUNCE_MS, parent=None):
+        super().__init__(parent)
+        self.catalogue = catalogue
+        self.dirty = set()
+        self.watcher = QFileSystemWatcher(self)
+        self.watcher.directoryChanged.connect(self.on_directory_changed)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(debounce_ms)
+        self.timer.timeout.connect(self.apply_changes)
+        self.watch_directories()
+
+    def watch_directories(self):
+        watched = set(self.watcher.directories())
+        for directory in self.catalogue.directories():
+            os.makedirs(directory, exist_ok=True)
+            if directory not in watched:
+                self.watcher.addPath(directory)
+
+    def on_directory_changed(self, path):
+        self.dirty.add(os.path.abspath(path))
+        self.timer.start()
+
+    def apply_changes(self):
+        dirty, self.dirty = self.dirty, set()
+        # 目录被删除后重建时需要重新加入监视
+        self.watch_directories()
+        changed = False
+        for directory in dirty:
+            added, removed = self.catalogue.rescan_dir(directory)
+            changed = changed or bool(added or removed)
+        if changed:
+            self.changed_signal.emit()
+
+    def rescan(self):
+        """手动刷新：立即重新比较所有目录"""
+        self.dirty.update(self.catalogue.directories())
+        self.timer.stop()
+        self.apply_changes()
+
+
+class LogView(QObject):
+    """日志环形缓冲：append() 只写入定长队列，定时器批量刷新到控件；控件本身也只保留最近 max_lines 行，
+    无论批处理运行多久，内存和界面响应都保持稳定"""
+
+    def __init__(self, widget, max_lines=LOG_MAX_LINES, interval_ms=LOG_FLUSH_INTERVAL_MS, parent=None):
+        super().__init__(parent)
+        self.widget = widget
+        self.widget.setMaximumBlockCount(max_lines)
+        self.pending = deque(maxlen=max_lines)
+        self.dropped = 0            # 两次刷新之间被环形缓冲挤掉的行数
+        self.timer = QTimer(self)
+        self.timer.timeout.connect(self.flush)
+        self.timer.start(interval_ms)
+
+    def append(self, text):
+        for line in str(text).rstrip("\n").split("\n"):
+            if len(self.pending) == self.pending.maxlen:
+                self.dropped += 1
+            self.pending.append(line)
+
+    def flush(self):
+        if not self.pending:
+            return
+        lines = list(self.pending)
+        self.pending.clear()
+        if self.dropped:
+            lines.insert(0, f"...（省略 {self.dropped} 行日志）...")
+            self.dropped = 0
+        scrollbar = self.widget.verticalScrollBar()
+        at_bottom = scrollbar.value() >= scrollbar.maximum() - 4
+        self.widget.appendPlainText("\n".join(lines))
+        if at_bottom:
+            scrollbar.setValue(scrollbar.maximum())
+
+
+class WorkerClient(QObject):
+    """常驻工作进程客户端：按需启动 QProcess，通过 stdin 提交 JSON 任务，stdout / stderr 按整行解析事件"""
+    event_signal = pyqtSignal(dict)
+    log_signal = pyqtSignal(str)
+    exited_signal = pyqtSignal(int)
 
+    def __init__(self, script, args=None, parent=None):
+        super().__init__(parent)
+        self.script = script
+        self.args = args or []
+        self.process = None
+        # 未凑成整行的数据留在解码器中，等下一块数据到达
+        self.stdout_decoder = EventDecoder()
+        self.stderr_decoder = EventDecoder()
+        self.job_seq = 0
 
-def find_subtitle_for_video(video_filename):
-    video_name = os.path.splitext(video_filename)[0]
-    standard_path = os.path.join("outsrt", f"{video_name}.srt")
-    if os.path.exists(standard_path):
-        return standard_path
+    def is_running(self):
+        return self.process is not None and self.process.state() != QProcess.NotRunning
+
+    def ensure_started(self):
+        if self.is_running():
+            return
+        self.log_signal.emit(f"启动工作进程: {self.script}")
+        process = QProcess(self)
+        process.readyReadStandardOutput.connect(self.read_stdout)
+        process.readyReadStandardError.connect(self.read_stderr)
+        process.finished.connect(self.on_finished)
+        process.start(sys.executable, [self.script, "--serve"] + self.args)
+        process.waitForStarted()
+        self.process = process
+        self.stdout_decoder = EventDecoder()
+        self.stderr_decoder = EventDecoder()
+
+    def submit(self, job):
+        """提交任务，返回任务 id"""
+        self.ensure_started()
+        self.job_seq += 1
+        job = dict(job, id=f"{os.path.splitext(self.script)[0]}-{self.job_seq}")
+        self.process.write((json.dumps(job, ensure_ascii=False) + "\n").encode("utf-8"))
+        return job["id"]
+
+    def read_stdout(self):
+        if not self.process:
+            return
+        output = self.process.readAllStandardOutput().data().decode("utf-8", errors="ignore")
+        self.dispatch(self.stdout_decoder.feed(output))
+
+    def read_stderr(self):
+        if self.process:
+            output = self.process.readAllStandardError().data().decode("utf-8", errors="ignore")
+            self.dispatch(self.stderr_decoder.feed(output))
+
+    def dispatch(self, items):
+        for event, line in items:
+            if event is not None:
+                self.event_signal.emit(event)
+            else:
+                self.log_signal.emit(line)
 
-    if not os.path.exists("outsrt"):
-        return None
-    outsrt_files = os.listdir("outsrt")
-    video_name_simple = re.sub(r'[^\w]', '', video_name).lower()
+    def on_finished(self, exitCode, exitStatus):
+        if self.sender() is self.process:
+            self.dispatch(self.stdout_decoder.flush() + self.stderr_decoder.flush())
+            self.process = None
+            self.exited_signal.emit(exitCode)
 
-    for f in outsrt_files:
-        if not f.endswith(".srt"):
-            continue
-        f_simple = re.sub(r'[^\w]', '', os.path.splitext(f)[0]).lower()
-        if video_name_simple == f_simple:
-            return os.path.join("outsrt", f)
-    return None
+    def stop(self):
+        process = self.process
+        if process and process.state() != QProcess.NotRunning:
+            self.process = None
+            process.write(b'{"cmd": "shutdown"}\n')
+            process.closeWriteChannel()
+            if not process.waitForFinished(3000):
+                process.kill()
 
 
 class FuseThread(QThread):
-    log_signal = pyqtSignal(str)
+    event_signal = pyqtSignal(dict)
     finished_signal = pyqtSignal(str, bool)
 
-    def __init__(self, Vname, font_path):
+    def __init__(self, Vname, font_path, mode="burn", catalogue=None):
         super().__init__()
         self.Vname = Vname
         self.font_path = font_path
+        self.mode = mode
+        self.catalogue = catalogue
 
     def run(self):
+        from fusion import process_video_with_subtitles
+        tracker = ProgressTracker("fuse", self.Vname)
         try:
             def log_callback(msg):
-                self.log_signal.emit(msg)
-
-            def progress_callback(percent):
-                self.log_signal.emit(f"PROGRESS:{percent}")
-
-            process_video_with_subtitles(
-                self.Vname,
-                self.font_path,
-                log_callback=log_callback,
-                progress_callback=progress_callback
-            )
+                self.event_signal.emit(make_event("log", "fuse", self.Vname, level="info", message=msg))
+
+            def progress_callback(percent, done=None, unit=None):
+                event = tracker.update(percent, done=done, unit=unit)
+                if event:
+                    self.event_signal.emit(event)
+
+            with job_metrics(self.Vname, "fuse", source=self.Vname):
+                process_video_with_subtitles(
+                    self.Vname,
+                    self.font_path,
+                    log_callback=log_callback,
+                    progress_callback=progress_callback,
+                    mode=self.mode,
+                    catalogue=self.catalogue
+                )
             self.finished_signal.emit(self.Vname, True)
         except Exception as e:
-            self.log_signal.emit(f"错误: {e}")
+            self.event_signal.emit(make_event("error", "fuse", self.Vname, level="error", message=str(e)))
             self.finished_signal.emit(self.Vname, False)
 
 
-def clean_filename(filename):
-    filename = re.sub(r'[^A-Za-z0-9_\u4e00-\u9fff\s]', '', filename)
-    filename = filename.strip()
-    first_word = filename.split()[0] if filename else "video"
-    return first_word
+class PipelineThread(QThread):
+    """自动流水线：每个视频独立经过 下载 → 转写 → 翻译 → 融合，不同视频可同时处于不同阶段"""
+    event_signal = pyqtSignal(dict)
+    finished_signal = pyqtSignal(dict)
 
+    def __init__(self, jobs, first_stage="download", quality_label="720p", fuse_mode="burn",
+                 translate_preset="quality", catalogue=None):
+        super().__init__()
+        self.catalogue = catalogue
+        self.jobs = jobs
+        self.first_stage = first_stage
+        self.quality_label = quality_label
+        self.fuse_mode = fuse_mode
+        self.translate_preset = translate_preset
+        self.pipeline = None
+
+    def build_stages(self):
+        def download(job, progress_callback, log_callback):
+            job["video_path"] = download_video(job["url"], self.quality_label, VIDEO_DIR,
+                                               log_callback=log_callback, progress_callback=progress_callback)
+
+        def worker_stage(script, args, input_key, output_key, options=None):
+            # 每个工作线程持有自己的常驻模型进程；options 随每个任务一起提交
+            def factory(log_callback):
+                worker = WorkerProcess(script, args, log_callback=log_callback)
+
+                def handler(job, progress_callback, log_callback):
+                    request = dict(options or {}, input=os.path.abspath(job[input_key]))
+                    job[output_key] = worker.run(request, progress_callback)
+                handler.close = worker.close
+                return handler
+            return factory
+
+        def fuse(job, progress_callback, log_callback):
+            from fusion import process_video_with_subtitles
+            Vname = os.path.splitext(os.path.basename(job["video_path"]))[0]
+            job["output"] = process_video_with_subtitles(Vname, FONT_PATH, log_callback=log_callback,
+                                                         progress_callback=progress_callback, mode=self.fuse_mode,
+                                                         catalogue=self.catalogue)
+            if not job["output"]:
+                raise RuntimeError(f"未找到名为 {Vname} 的视频文件！")
+
+        stages = {
+            "download": Stage("download", download, PIPELINE_CONCURRENCY["download"]),
+            "transcribe": Stage("transcribe", worker_stage(
+                TRANSCRIBE_WORKER_SCRIPT, ["--model", WHISPER_MODEL],
+                "video_path", "srt_path"), PIPELINE_CONCURRENCY["transcribe"], per_worker=True),
+            "translate": Stage("translate", worker_stage(TRANSLATE_WORKER_SCRIPT, [], "srt_path", "zh_srt_path",
+                                                         {"preset": self.translate_preset}),
+                               PIPELINE_CONCURRENCY["translate"], per_worker=True),
+            "fuse": Stage("fuse", fuse, PIPELINE_CONCURRENCY["fuse"]),
+        }
+        return [stages[name] for name in PIPELINE_STAGES[PIPELINE_STAGES.index(self.first_stage):]]
 
-def find_latest_video_file(directory):
-    video_extensions = ['*.mp4', '*.mkv', '*.webm', '*.avi', '*.mov']
-    files = []
-    for ext in video_extensions:
-        files.extend(glob.glob(os.path.join(directory, ext)))
-    if not files:
-        return None
-    return max(files, key=lambda x: os.path.getctime(x))
+    def run(self):
+        self.pipeline = Pipeline(self.build_stages(), queue_size=PIPELINE_QUEUE_SIZE,
+                                 event_callback=self.event_signal.emit)
+        results = self.pipeline.run(self.jobs)
+        self.finished_signal.emit(results)
+
+    def cancel(self):
+        if self.pipeline:
+            self.pipeline.cancel()
 
 
 class YouTubeDownloader(QWidget):
@@ -84,6 +301,19 @@ class YouTubeDownloader(QWidget):
         super().__init__()
         self.ui = Ui_MainWindow()
         self.ui.setupUi(self)
+        self.log_view = LogView(self.ui.output_text, parent=self)
+
+        # 视频 / 字幕目录索引：启动时扫描一次，之后随文件系统变化增量更新
+        self.catalogue = MediaCatalogue(VIDEO_DIR, SUBTITLE_DIR)
+        self.catalogue_watcher = CatalogueWatcher(self.catalogue, parent=self)
+        self.catalogue_watcher.changed_signal.connect(self.refresh_video_list)
+
+        # 进度按钮：只记录最新进度，定时器统一重绘
+        self.pending_progress = {}           # 按钮 -> (百分比, 文本, 说明)
+        self.painted_progress = {}           # 按钮 -> 上次重绘时的 (整数百分比, 按钮文字)
+        self.progress_timer = QTimer(self)
+        self.progress_timer.timeout.connect(self.repaint_progress)
+        self.progress_timer.start(PROGRESS_REPAINT_MS)
 
         # 队列与状态
         self.video_path = None               # 最近一次下载完成的视频路径
@@ -92,10 +322,26 @@ class YouTubeDownloader(QWidget):
         self.translate_queue = []            # 翻译字幕的待处理srt列表
         self.download_queue = []             # 批量链接下载队列（字符串URL）
         self.downloaded_video_paths = []     # 本轮批量中新下载的视频路径
-        self.current_process = None
-        self.translate_process = None
-        self.process = None
+        self.active_downloads = {}           # QProcess -> {"url", "buffer", "path", "percent"}
+        self.download_total = 0
+        self.download_done = 0
+        self.current_subtitle_job = None
+        self.current_translate_job = None
         self.fuse_threads = []
+        self.pipeline_thread = None
+        self.pipeline_jobs = {}
+        self.close_requested = False
+
+        # 常驻工作进程：模型只加载一次，任务逐个提交
+        self.subtitle_worker = WorkerClient(
+            TRANSCRIBE_WORKER_SCRIPT, ["--model", WHISPER_MODEL], self)
+        self.subtitle_worker.event_signal.connect(self.handle_subtitle_event)
+        self.subtitle_worker.log_signal.connect(self.log)
+        self.subtitle_worker.exited_signal.connect(self.subtitle_worker_exited)
+        self.translate_worker = WorkerClient(TRANSLATE_WORKER_SCRIPT, parent=self)
+        self.translate_worker.event_signal.connect(self.handle_translate_event)
+        self.translate_worker.log_signal.connect(self.log)
+        self.translate_worker.exited_signal.connect(self.translate_worker_exited)
 
         # 自动模式：下载->字幕->翻译->融合
         self.auto_mode_enabled = False
@@ -112,11 +358,31 @@ class YouTubeDownloader(QWidget):
 
     def toggle_auto_mode(self, state):
         self.auto_mode_enabled = state == Qt.Checked
-        self.ui.output_text.append(f"自动流水线模式 {'开启' if self.auto_mode_enabled else '关闭'}")
+        self.log(f"自动流水线模式 {'开启' if self.auto_mode_enabled else '关闭'}")
+
+    def log(self, text):
+        self.log_view.append(text)
 
     # ---------- 进度按钮UI ----------
-    def update_button_progress(self, button, percent, base_text):
-        button.setText(f"{base_text} {int(percent)}%")
+    def update_button_progress(self, button, percent, base_text, detail=""):
+        """只记录最新进度，由 repaint_progress 定时合并重绘"""
+        self.pending_progress[button] = (percent, base_text, detail)
+
+    def repaint_progress(self):
+        pending, self.pending_progress = self.pending_progress, {}
+        for button, (percent, base_text, detail) in pending.items():
+            self.paint_button_progress(button, percent, base_text, detail)
+
+    def paint_button_progress(self, button, percent, base_text, detail=""):
+        text = f"{base_text} {int(percent)}%" + (f" ({detail})" if detail else "")
+        last_percent, last_text = self.painted_progress.get(button, (None, None))
+        if text != last_text:
+            button.setText(text)
+        # 渐变样式表只在整数百分比变化时重建
+        if int(percent) == last_percent:
+            self.painted_progress[button] = (last_percent, text)
+            return
+        self.painted_progress[button] = (int(percent), text)
         button.setStyleSheet(f"""
             QPushButton {{
                 background: qlineargradient(
@@ -131,7 +397,15 @@ class YouTubeDownloader(QWidget):
             }}
         """)
 
+    def append_log_event(self, event):
+        """按级别输出 log / error 事件"""
+        prefix = {"warning": "[警告] ", "error": "[错误] "}.get(event.get("level"), "")
+        self.log(prefix + event.get("message", ""))
+
     def reset_button(self, button, text, color):
+        # 丢弃尚未重绘的进度，避免定时器把按钮又改回进度状态
+        self.pending_progress.pop(button, None)
+        self.painted_progress.pop(button, None)
         button.setText(text)
         button.setStyleSheet(f"""
             QPushButton {{
@@ -150,22 +424,22 @@ class YouTubeDownloader(QWidget):
         if not hasattr(self, 'video_path') or not self.video_path:
             selected_items = self.ui.video_list_widget.selectedItems()
             if not selected_items:
-                self.ui.output_text.append("错误：请先选择一个视频文件")
+                self.log("错误：请先选择一个视频文件")
                 return
             self.video_path = os.path.join(VIDEO_DIR, selected_items[0].text())
 
-        font_path = "/usr/share/fonts/truetype/msttcorefonts/Times_New_Roman.ttf"
+        font_path = FONT_PATH
         Vname = os.path.splitext(os.path.basename(self.video_path))[0]
-        self.ui.output_text.append(f"开始处理: {Vname}")
+        self.log(f"开始处理: {Vname}")
 
-        thread = FuseThread(Vname, font_path)
-        thread.log_signal.connect(self.handle_fuse_log)
+        thread = FuseThread(Vname, font_path, self.ui.fuse_mode_combo.currentData(), self.catalogue)
+        thread.event_signal.connect(self.handle_fuse_event)
 
         def on_finished(name, success):
             if success:
-                self.ui.output_text.append(f"{name} 字幕融合完成！")
+                self.log(f"{name} 字幕融合完成！")
             else:
-                self.ui.output_text.append(f"{name} 字幕融合失败！")
+                self.log(f"{name} 字幕融合失败！")
             self.reset_button(self.ui.subtitle_fuse_button, "融合选中视频字幕", "#6f42c1")
             self.set_buttons_enabled(True)
 
@@ -174,29 +448,33 @@ class YouTubeDownloader(QWidget):
         self.set_buttons_enabled(False)
         thread.start()
 
-    def handle_fuse_log(self, msg):
-        if msg.startswith("PROGRESS:"):
-            try:
-                percent = int(msg.split("PROGRESS:")[1])
-                self.update_button_progress(self.ui.subtitle_fuse_button, percent, "融合选中视频字幕")
-            except:
-                pass
+    def handle_fuse_event(self, event):
+        if event["event"] == "progress":
+            self.update_button_progress(self.ui.subtitle_fuse_button, event["percent"], "融合选中视频字幕",
+                                        describe_progress(event))
         else:
-            self.ui.output_text.append(msg)
+            self.append_log_event(event)
 
     # ---------- 视频列表 ----------
     def load_video_list(self):
-        self.ui.video_list_widget.clear()
-        if not os.path.exists(VIDEO_DIR):
-            os.makedirs(VIDEO_DIR)
-        video_files = [f for f in os.listdir(VIDEO_DIR)
-                       if f.lower().endswith(('.mp4', '.mkv', '.webm', '.flv', '.avi', '.mov'))]
+        """启动和点击刷新时调用：让索引立即与磁盘同步，再刷新列表"""
+        self.catalogue_watcher.rescan()
+        video_files = self.refresh_video_list()
         if not video_files:
-            self.ui.output_text.append("video/ 目录暂无视频文件。")
+            self.log("video/ 目录暂无视频文件。")
             return
-        for vf in sorted(video_files):
+        self.log(f"加载到 {len(video_files)} 个视频文件。")
+
+    def refresh_video_list(self):
+        """按索引重建列表（不访问磁盘），保留当前选中项"""
+        selected = {item.text() for item in self.ui.video_list_widget.selectedItems()}
+        video_files = self.catalogue.video_files()
+        self.ui.video_list_widget.clear()
+        for vf in video_files:
             self.ui.video_list_widget.addItem(vf)
-        self.ui.output_text.append(f"加载到 {len(video_files)} 个视频文件。")
+            if vf in selected:
+                self.ui.video_list_widget.item(self.ui.video_list_widget.count() - 1).setSelected(True)
+        return video_files
 
     def check_ytdlp_installed(self):
         return shutil.which("yt-dlp") is not None
@@ -207,110 +485,101 @@ class YouTubeDownloader(QWidget):
         urls_text = self.ui.url_input.toPlainText().strip()
         urls = [u.strip() for u in urls_text.splitlines() if u.strip()]
         if not urls:
-            self.ui.output_text.append("错误：请输入至少一个视频链接（每行一个）！")
+            self.log("错误：请输入至少一个视频链接（每行一个）！")
             return
         if not self.check_ytdlp_installed():
-            self.ui.output_text.append("错误：未检测到 yt-dlp，请先安装。\n安装命令: pip install yt-dlp")
+            self.log("错误：未检测到 yt-dlp，请先安装。\n安装命令: pip install yt-dlp")
+            return
+
+        if self.auto_mode_enabled:
+            jobs = [{"id": f"video-{i + 1}", "url": url, "name": url} for i, url in enumerate(urls)]
+            self.start_pipeline(jobs, "download")
             return
 
         self.download_queue = urls[:]  # 拷贝
         self.downloaded_video_paths = []
-        self.ui.output_text.append(f"批量下载任务数: {len(self.download_queue)}")
+        self.download_total = len(urls)
+        self.download_done = 0
+        self.log(f"批量下载任务数: {len(self.download_queue)}（同时下载 {DOWNLOAD_CONCURRENCY} 个）")
         self.set_buttons_enabled(False)
+        self.update_button_progress(self.ui.download_button, 0, "下载视频")
         self.process_next_download()
 
     def process_next_download(self):
-        """顺序弹出URL，调用yt-dlp下载；单进程串行，便于定位输出文件。"""
-        if not self.download_queue:
-            self.ui.output_text.append("[完成] 所有视频下载完成！")
+        """在并发上限内启动 yt-dlp；每个下载通过 --print after_move 报告自己的最终文件路径。"""
+        while self.download_queue and len(self.active_downloads) < DOWNLOAD_CONCURRENCY:
+            url = self.download_queue.pop(0)
+            self.log(f"开始下载视频: {url}")
+            os.makedirs(VIDEO_DIR, exist_ok=True)
+            cmd = build_ytdlp_command(url, self.ui.quality_combo.currentText(), VIDEO_DIR)
+            process = QProcess(self)
+            process.setProcessChannelMode(QProcess.MergedChannels)
+            self.active_downloads[process] = {"url": url, "buffer": "", "path": None, "percent": 0}
+            process.readyReadStandardOutput.connect(lambda p=process: self.read_output(p))
+            process.finished.connect(lambda exitCode, exitStatus, p=process: self.download_finished(p, exitCode))
+            process.start(cmd[0], cmd[1:])
+
+        if not self.download_queue and not self.active_downloads:
+            self.log("[完成] 所有视频下载完成！")
             self.reset_button(self.ui.download_button, "下载视频", "#0078d7")
-            self.load_video_list()
-
-            # 批量下载完成后，如开启自动模式，则批量进入字幕生成队列
-            if self.auto_mode_enabled and self.downloaded_video_paths:
-                self.subtitle_queue = self.downloaded_video_paths[:]
-                names = [os.path.basename(p) for p in self.subtitle_queue]
-                self.ui.output_text.append(f"[自动模式] 开始批量生成字幕，共 {len(names)} 个：\n" + "\n".join(names))
-                self.process_next_subtitle()
-            else:
-                self.set_buttons_enabled(True)
-            return
-
-        url = self.download_queue.pop(0)
-        self.ui.output_text.append(f"开始下载视频: {url}")
-        self.update_button_progress(self.ui.download_button, 0, "下载视频")
-
-        quality_map = {
-            "1080p": "bv[height<=1080]+ba/b[height<=1080]",
-            "720p": "bv[height<=720]+ba/b[height<=720]",
-            "480p": "bv[height<=480]+ba/b[height<=480]",
-            "360p": "bv[height<=360]+ba/b[height<=360]",
-        }
-        quality = quality_map.get(self.ui.quality_combo.currentText(),
-                                  "bv[height<=720]+ba/b[height<=720]")
-
-        os.makedirs(VIDEO_DIR, exist_ok=True)
-        cmd = [
-            "yt-dlp",
-            "-f", quality,
-            "-o", os.path.join(VIDEO_DIR, "%(title)s.%(ext)s"),
-            url
-        ]
-        self.video_path = None
-        self.process = QProcess(self)
-        self.process.setProcessChannelMode(QProcess.MergedChannels)
-        self.process.readyReadStandardOutput.connect(self.read_output)
-        self.process.readyReadStandardError.connect(self.read_output)
-        self.process.finished.connect(self.download_finished)
-        self.process.start(cmd[0], cmd[1:])
-
-    def read_output(self):
-        text_data = self.process.readAllStandardOutput().data().decode("utf-8", errors="ignore")
-        err_data = self.process.readAllStandardError().data().decode("utf-8", errors="ignore")
-        output = text_data + err_data
-        if output:
-            self.ui.output_text.append(output)
-
-        # 粗略从分片日志估计下载进度
-        frag_match = re.search(r"\(frag\s+(\d+)/(\d+)\)", output)
-        if frag_match:
-            current_frag = int(frag_match.group(1))
-            total_frag = int(frag_match.group(2))
-            progress_percent = int((current_frag / total_frag) * 100) if total_frag else 0
-            self.update_button_progress(self.ui.download_button, progress_percent, "下载视频")
-
-    def download_finished(self):
-        latest_video = find_latest_video_file(VIDEO_DIR)
-        if latest_video:
-            self.video_path = latest_video
-            self.ui.output_text.append(f"检测到最新视频文件: {os.path.basename(latest_video)}")
-
-            dir_name = os.path.dirname(latest_video)
-            old_name = os.path.basename(latest_video)
-            name, ext = os.path.splitext(old_name)
-
-            new_name = clean_filename(name) + ext
-            new_path = os.path.join(dir_name, new_name)
+            self.refresh_video_list()
+            self.set_buttons_enabled(True)
 
+    def read_output(self, process):
+        state = self.active_downloads.get(process)
+        if state is None:
+            return
+        state["buffer"] += process.readAllStandardOutput().data().decode("utf-8", errors="ignore")
+        *lines, state["buffer"] = state["buffer"].split("\n")
+        for line in lines:
+            path = parse_output_path(line)
+            if path:
+                state["path"] = path
+                continue
+            if line.strip():
+                self.log(line)
+            progress_percent = parse_download_progress(line)
+            if progress_percent is not None:
+                state["percent"] = progress_percent
+        self.update_download_progress()
+
+    def update_download_progress(self):
+        """总进度 = 已完成数 + 进行中各下载的进度"""
+        if not self.download_total:
+            return
+        active = sum(state["percent"] for state in self.active_downloads.values()) / 100
+        percent = (self.download_done + active) / self.download_total * 100
+        self.update_button_progress(self.ui.download_button, percent, "下载视频")
+
+    def download_finished(self, process, exitCode):
+        self.read_output(process)
+        state = self.active_downloads.pop(process, None)
+        process.deleteLater()
+        if state is None:
+            return
+        self.download_done += 1
+        video_path = state["path"] or parse_output_path(state["buffer"])
+        if exitCode == 0 and video_path and os.path.exists(video_path):
+            self.log(f"下载的视频文件: {os.path.basename(video_path)}")
             try:
-                if new_path != latest_video:
-                    if os.path.exists(new_path):
-                        os.remove(new_path)
-                    os.rename(latest_video, new_path)
-                    self.video_path = new_path
-                self.ui.output_text.append(f"已重命名文件: {os.path.basename(self.video_path)}")
+                video_path = rename_to_clean(video_path)
+                self.log(f"已重命名文件: {os.path.basename(video_path)}")
             except Exception as e:
-                self.ui.output_text.append(f"重命名失败: {e}")
+                self.log(f"重命名失败: {e}")
 
-            self.ui.output_text.append("下载完成！")
+            self.log("下载完成！")
+            self.video_path = video_path
             # 记录到本轮批量下载列表中
-            if self.video_path and os.path.exists(self.video_path):
-                self.downloaded_video_paths.append(self.video_path)
+            if os.path.exists(video_path):
+                self.downloaded_video_paths.append(video_path)
+                self.catalogue.add(video_path)
+        elif exitCode != 0:
+            self.log(f"[失败] 下载失败: {state['url']}，退出代码：{exitCode}")
         else:
-            self.ui.output_text.append("未找到下载的视频文件。")
+            self.log(f"未找到下载的视频文件: {state['url']}")
 
         # 继续下一个下载任务
-        self.reset_button(self.ui.download_button, "下载视频", "#0078d7")
+        self.update_download_progress()
         self.process_next_download()
 
     # ======================= 生成字幕（批处理） =======================
@@ -318,113 +587,196 @@ class YouTubeDownloader(QWidget):
         self.subtitle_queue = [os.path.join(VIDEO_DIR, item.text())
                                for item in self.ui.video_list_widget.selectedItems()]
         if not self.subtitle_queue:
-            self.ui.output_text.append("错误：请先选择至少一个视频文件")
+            self.log("错误：请先选择至少一个视频文件")
+            return
+        if self.auto_mode_enabled:
+            jobs = [{"id": f"video-{i + 1}", "video_path": path, "name": os.path.basename(path)}
+                    for i, path in enumerate(self.subtitle_queue)]
+            self.subtitle_queue = []
+            self.start_pipeline(jobs, "transcribe")
             return
         self.set_buttons_enabled(False)
         self.process_next_subtitle()
 
     def process_next_subtitle(self):
         if not self.subtitle_queue:
-            self.ui.output_text.append("[完成] 所有字幕生成完成！")
+            self.log("[完成] 所有字幕生成完成！")
             self.reset_button(self.ui.subtitle_button, "生成选中视频字幕", "#dc3545")
-            if self.auto_mode_enabled:
-                self.auto_start_translation_batch()
-            else:
-                self.set_buttons_enabled(True)
+            self.set_buttons_enabled(True)
             return
 
         video_file = self.subtitle_queue.pop(0)
-        self.ui.output_text.append(f"正在生成字幕: {os.path.basename(video_file)}")
+        self.log(f"正在生成字幕: {os.path.basename(video_file)}")
         self.update_button_progress(self.ui.subtitle_button, 0, "生成选中视频字幕")
-        self.current_process = QProcess(self)
-        self.current_process.setProcessChannelMode(QProcess.MergedChannels)
-        self.current_process.readyReadStandardOutput.connect(self.handle_subtitle_output)
-        self.current_process.finished.connect(self.subtitle_process_finished)
-        self.current_process.start(sys.executable, [SUBTITLE_SCRIPT, video_file])
-
-    def handle_subtitle_output(self):
-        if self.current_process:
-            output = self.current_process.readAllStandardOutput().data().decode("utf-8", errors="ignore")
-            if output:
-                self.ui.output_text.append(output)
-            for line in output.splitlines():
-                if line.startswith("PROGRESS:"):
-                    try:
-                        percent = float(line.split("PROGRESS:")[1].strip())
-                        self.update_button_progress(self.ui.subtitle_button, percent, "生成选中视频字幕")
-                    except:
-                        pass
-
-    def subtitle_process_finished(self, exitCode, exitStatus):
-        if exitCode == 0:
-            self.ui.output_text.append("[完成] 当前视频字幕生成成功")
-        else:
-            self.ui.output_text.append(f"[失败] 当前视频字幕生成失败，退出代码：{exitCode}")
-        self.process_next_subtitle()
+        self.current_subtitle_job = self.subtitle_worker.submit({"input": os.path.abspath(video_file)})
+
+    def handle_subtitle_event(self, event):
+        kind = event.get("event")
+        if kind == "ready":
+            self.log("Whisper 模型加载完成")
+            return
+        if kind == "log":
+            self.append_log_event(event)
+            return
+        if event.get("job") != self.current_subtitle_job:
+            return
+        if kind == "progress":
+            self.update_button_progress(self.ui.subtitle_button, event["percent"], "生成选中视频字幕",
+                                        describe_progress(event))
+        elif kind == "done":
+            self.log(f"[完成] 当前视频字幕生成成功: {event.get('output')}")
+            self.current_subtitle_job = None
+            self.process_next_subtitle()
+        elif kind == "error":
+            self.log(f"[失败] 当前视频字幕生成失败: {event.get('message')}")
+            self.current_subtitle_job = None
+            self.process_next_subtitle()
+
+    def subtitle_worker_exited(self, exitCode):
+        if self.current_subtitle_job:
+            self.log(f"[失败] 字幕生成进程异常退出，退出代码：{exitCode}")
+            self.current_subtitle_job = None
+            self.process_next_subtitle()
 
     # ======================= 翻译字幕（批处理） =======================
     def translate_subtitles_for_selected(self, auto=False):
         self.translate_queue = []
+        videos = []
         for item in self.ui.video_list_widget.selectedItems():
-            subtitle_path = find_subtitle_for_video(item.text())
+            subtitle_path = self.catalogue.find_subtitle_for_video(item.text())
             if subtitle_path and os.path.exists(subtitle_path):
                 self.translate_queue.append(subtitle_path)
+                videos.append(item.text())
         if not self.translate_queue:
-            self.ui.output_text.append("没有找到任何字幕文件进行翻译")
+            self.log("没有找到任何字幕文件进行翻译")
+            return
+        if self.auto_mode_enabled:
+            # 自动模式：翻译完成后继续融合
+            jobs = [{"id": f"video-{i + 1}", "video_path": os.path.join(VIDEO_DIR, name), "srt_path": path,
+                     "name": name} for i, (name, path) in enumerate(zip(videos, self.translate_queue))]
+            self.translate_queue = []
+            self.start_pipeline(jobs, "translate")
             return
         self.set_buttons_enabled(False)
         self.process_next_translate()
 
     def process_next_translate(self):
         if not self.translate_queue:
-            self.ui.output_text.append("[完成] 所有字幕翻译完成！")
+            self.log("[完成] 所有字幕翻译完成！")
             self.reset_button(self.ui.subtitle_translate_button, "翻译选中字幕", "#17a2b8")
-            if self.auto_mode_enabled:
-                self.fuse_selected_subtitles()
-            else:
-                self.set_buttons_enabled(True)
+            self.set_buttons_enabled(True)
             return
 
         srt_file = self.translate_queue.pop(0)
-        self.ui.output_text.append(f"正在翻译字幕: {os.path.basename(srt_file)}")
+        self.log(f"正在翻译字幕: {os.path.basename(srt_file)}")
         self.update_button_progress(self.ui.subtitle_translate_button, 0, "翻译选中字幕")
-        self.translate_process = QProcess(self)
-        self.translate_process.setProcessChannelMode(QProcess.MergedChannels)
-        self.translate_process.readyReadStandardOutput.connect(self.handle_translate_output)
-        self.translate_process.finished.connect(self.translate_process_finished)
-        self.translate_process.start(sys.executable, [SUBTITLE_TRANSLATE_SCRIPT, srt_file])
-
-    def handle_translate_output(self):
-        if self.translate_process:
-            output = self.translate_process.readAllStandardOutput().data().decode("utf-8", errors="ignore")
-            if output:
-                self.ui.output_text.append(output)
-            for line in output.splitlines():
-                if line.startswith("PROGRESS:"):
-                    try:
-                        percent = int(float(line.split("PROGRESS:")[1].strip()))
-                        self.update_button_progress(self.ui.subtitle_translate_button, percent, "翻译选中字幕")
-                    except:
-                        pass
-
-    def translate_process_finished(self):
-        self.process_next_translate()
+        self.current_translate_job = self.translate_worker.submit(
+            {"input": os.path.abspath(srt_file), "preset": self.ui.translate_preset_combo.currentData()})
 
-    def auto_start_translation_batch(self):
-        """自动模式：将刚生成字幕的视频批量转成翻译队列。"""
-        # 从下载得到的视频名推断字幕文件
-        srt_list = []
-        for vpath in self.downloaded_video_paths:
-            base = os.path.basename(vpath)
-            srt = find_subtitle_for_video(base)
-            if srt and os.path.exists(srt):
-                srt_list.append(srt)
-        if srt_list:
-            self.translate_queue = srt_list
-            self.ui.output_text.append(f"[自动模式] 开始批量翻译字幕，共 {len(self.translate_queue)} 个")
+    def handle_translate_event(self, event):
+        kind = event.get("event")
+        if kind == "ready":
+            self.log("翻译模型加载完成")
+            return
+        if kind == "log":
+            self.append_log_event(event)
+            return
+        if event.get("job") != self.current_translate_job:
+            return
+        if kind == "progress":
+            self.update_button_progress(self.ui.subtitle_translate_button, event["percent"], "翻译选中字幕",
+                                        describe_progress(event))
+        elif kind == "done":
+            self.log(f"翻译完成，输出文件：{event.get('output')}")
+            self.current_translate_job = None
             self.process_next_translate()
-        else:
-            self.set_buttons_enabled(True)
+        elif kind == "error":
+            self.log(f"[失败] 字幕翻译失败: {event.get('message')}")
+            self.current_translate_job = None
+            self.process_next_translate()
+
+    def translate_worker_exited(self, exitCode):
+        if self.current_translate_job:
+            self.log(f"[失败] 翻译进程异常退出，退出代码：{exitCode}")
+            self.current_translate_job = None
+            self.process_next_translate()
+
+    # ======================= 自动流水线 =======================
+    def start_pipeline(self, jobs, first_stage):
+        self.pipeline_jobs = {job["id"]: job for job in jobs}
+        names = [job["name"] for job in jobs]
+        self.log(f"[自动模式] 流水线开始，共 {len(names)} 个：\n" + "\n".join(names))
+        self.set_buttons_enabled(False)
+        self.pipeline_thread = PipelineThread(jobs, first_stage, self.ui.quality_combo.currentText(),
+                                              self.ui.fuse_mode_combo.currentData(),
+                                              self.ui.translate_preset_combo.currentData(), self.catalogue)
+        self.pipeline_thread.event_signal.connect(self.handle_pipeline_event)
+        self.pipeline_thread.finished_signal.connect(self.pipeline_finished)
+        self.pipeline_thread.start()
+
+    def handle_pipeline_event(self, event):
+        buttons = {
+            "download": (self.ui.download_button, "下载视频"),
+            "transcribe": (self.ui.subtitle_button, "生成选中视频字幕"),
+            "translate": (self.ui.subtitle_translate_button, "翻译选中字幕"),
+            "fuse": (self.ui.subtitle_fuse_button, "融合选中视频字幕"),
+        }
+        button, text = buttons[event["stage"]]
+        job = self.pipeline_jobs.get(event.get("job"), {})
+        name = job.get("name", "")
+        kind = event["event"]
+        if kind == "progress":
+            self.update_button_progress(button, event["percent"], text, describe_progress(event))
+        elif kind == "log":
+            self.append_log_event(event)
+        elif kind == "start":
+            self.log(f"[{event['stage']}] 开始: {name}")
+        elif kind == "done":
+            if event["stage"] == "download":
+                job["name"] = os.path.basename(job["video_path"])
+                self.catalogue.add(job["video_path"])
+                self.refresh_video_list()
+            self.log(f"[{event['stage']}] 完成: {job.get('name', name)}")
+        elif kind == "error":
+            self.log(f"[{event['stage']}] 失败: {name} {event.get('message')}")
+
+    def pipeline_finished(self, results):
+        done = sum(1 for status in results.values() if status == "done")
+        self.log(f"[自动模式] 流水线结束：成功 {done} / {len(results)}")
+        for job_id, status in results.items():
+            if status != "done":
+                self.log(f"  {self.pipeline_jobs[job_id]['name']}: {status}")
+        self.reset_button(self.ui.download_button, "下载视频", "#0078d7")
+        self.reset_button(self.ui.subtitle_button, "生成选中视频字幕", "#dc3545")
+        self.reset_button(self.ui.subtitle_translate_button, "翻译选中字幕", "#17a2b8")
+        self.reset_button(self.ui.subtitle_fuse_button, "融合选中视频字幕", "#6f42c1")
+        self.pipeline_thread.wait()
+        self.pipeline_thread = None
+        if self.close_requested:
+            self.close()
+            return
+        self.refresh_video_list()
+        self.set_buttons_enabled(True)
+
+    def closeEvent(self, event):
+        self.subtitle_queue = []
+        self.translate_queue = []
+        self.current_subtitle_job = None
+        self.current_translate_job = None
+        # 正在运行的 ffmpeg 一并终止，不留下后台编码进程（融合模块按需导入，没用过就不必处理）
+        if "ffmpeg_executor" in sys.modules:
+            sys.modules["ffmpeg_executor"].cancel_all()
+        if self.pipeline_thread:
+            # 流水线不再启动新任务；正在执行的阶段要写完输出和清单，结束后由 pipeline_finished 再次关闭窗口
+            self.pipeline_thread.cancel()
+            if not self.close_requested:
+                self.close_requested = True
+                self.log("[自动模式] 正在等待流水线当前任务结束，结束后自动关闭窗口…")
+            event.ignore()
+            return
+        self.subtitle_worker.stop()
+        self.translate_worker.stop()
+        super().closeEvent(event)
 
     # ---------- 按钮状态 ----------
     def set_buttons_enabled(self, enabled: bool):
@@ -439,4 +791,10 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     win = YouTubeDownloader()
     win.show()
+    if "--startup-timing" in sys.argv:
+        # 窗口显示后的第一轮事件循环里输出启动耗时并退出（benchmark.py 的 startup 阶段使用）
+        def report_startup():
+            print(f"startup_seconds={time.perf_counter() - STARTUP_TIME:.3f}", flush=True)
+            app.quit()
+        QTimer.singleShot(0, report_startup)
     sys.exit(app.exec_())
@@ -0,0 +1,116 @@
+"""产物清单：记录每个输出文件由哪些输入（内容哈希）和哪些参数生成。
+
+视频 → 字幕 → 翻译字幕 → 分割字幕 → 融合视频 各阶段在开始前调用 is_up_to_date()，
+输入内容和参数都没变、输出也没被改动时直接跳过；上游产物内容真正变化时，下游的输入哈希随之变化而重建。
+清单存放在 SQLite 中，转写/翻译进程和 GUI 可以同时读写。
+"""
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_MANIFEST_PATH = os.path.join("cache", "artifacts.sqlite3")
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+class ArtifactManifest:
+    def __init__(self, path=DEFAULT_MANIFEST_PATH):
+        self.path = path
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS artifacts ("
+            " output TEXT PRIMARY KEY,"
+            " stage TEXT NOT NULL,"
+            " inputs TEXT NOT NULL,"
+            " params TEXT NOT NULL,"
+            " output_digest TEXT NOT NULL)"
+        )
+        # 文件哈希按 (大小, mtime) 缓存，大视频只需完整计算一次
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS digests ("
+            " path TEXT PRIMARY KEY,"
+            " size INTEGER NOT NULL,"
+            " mtime_ns INTEGER NOT NULL,"
+            " digest TEXT NOT NULL)"
+        )
+        self.conn.commit()
+
+    def digest(self, path):
+        """文件内容的 sha256；文件不存在时返回 None"""
+        path = os.path.abspath(path)
+        if not os.path.exists(path):
+            return None
+        stat = os.stat(path)
+        with self.lock:
+            row = self.conn.execute("SELECT size, mtime_ns, digest FROM digests WHERE path = ?", (path,)).fetchone()
+        if row and row[0] == stat.st_size and row[1] == stat.st_mtime_ns:
+            return row[2]
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for block in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                h.update(block)
+        digest = h.hexdigest()
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO digests (path, size, mtime_ns, digest) VALUES (?, ?, ?, ?)",
+                              (path, stat.st_size, stat.st_mtime_ns, digest))
+            self.conn.commit()
+        return digest
+
+    def _input_digests(self, inputs):
+        return {os.path.abspath(p): self.digest(p) for p in inputs if p}
+
+    @staticmethod
+    def _encode(value):
+        return json.dumps(value, sort_keys=True, ensure_ascii=False)
+
+    def is_up_to_date(self, stage, output, inputs, params):
+        """输出存在、未被改动，且输入哈希与参数和上次生成时一致"""
+        output = os.path.abspath(output)
+        if not os.path.exists(output):
+            return False
+        with self.lock:
+            row = self.conn.execute("SELECT stage, inputs, params, output_digest FROM artifacts WHERE output = ?",
+                                    (output,)).fetchone()
+        if not row:
+            return False
+        recorded_stage, recorded_inputs, recorded_params, output_digest = row
+        if recorded_stage != stage or recorded_params != self._encode(params):
+            return False
+        input_digests = self._input_digests(inputs)
+        if None in input_digests.values() or recorded_inputs != self._encode(input_digests):
+            return False
+        return self.digest(output) == output_digest
+
+    def record(self, stage, output, inputs, params):
+        """阶段成功完成后记录输出；中途失败的输出不会被记录，下次会重建"""
+        output_digest = self.digest(output)
+        if output_digest is None:
+            return
+        values = (os.path.abspath(output), stage, self._encode(self._input_digests(inputs)),
+                  self._encode(params), output_digest)
+        with self.lock:
+            self.conn.execute("INSERT OR REPLACE INTO artifacts (output, stage, inputs, params, output_digest) "
+                              "VALUES (?, ?, ?, ?, ?)", values)
+            self.conn.commit()
+
+    def invalidate(self, output):
+        with self.lock:
+            self.conn.execute("DELETE FROM artifacts WHERE output = ?", (os.path.abspath(output),))
+            self.conn.commit()
+
+
+_manifest = None
+_manifest_lock = threading.Lock()
+
+
+def get_manifest():
+    global _manifest
+    with _manifest_lock:
+        if _manifest is None:
+            _manifest = ArtifactManifest()
+        return _manifest
@@ -0,0 +1,99 @@
+"""音频缓存：每个视频只解码一次，得到 16kHz 单声道 float32 PCM（<视频名>.16k.f32，与视频同目录），
+之后转写/重新切分都直接内存映射该文件，不再经过视频解码。
+
+缓存有效性按视频的 大小 + mtime + 内容哈希 判断，记录在 <视频名>.16k.json 中。
+"""
+import os
+import json
+import hashlib
+import subprocess
+import numpy as np
+
+SAMPLE_RATE = 16000
+HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+def quick_hash(path, block_size=HASH_BLOCK_SIZE):
+    """对文件首尾各 block_size 字节加文件大小做 sha1，大视频也能很快算完"""
+    size = os.path.getsize(path)
+    h = hashlib.sha1(str(size).encode())
+    with open(path, "rb") as f:
+        h.update(f.read(block_size))
+        if size > block_size:
+            f.seek(max(size - block_size, block_size))
+            h.update(f.read(block_size))
+    return h.hexdigest()
+
+
+def audio_cache_paths(video_path):
+    base = os.path.splitext(video_path)[0]
+    return base + ".16k.f32", base + ".16k.json"
+
+
+def is_cache_valid(video_path):
+    audio_path, meta_path = audio_cache_paths(video_path)
+    if not (os.path.exists(audio_path) and os.path.exists(meta_path)):
+        return False
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+    except (OSError, ValueError):
+        return False
+    stat = os.stat(video_path)
+    if meta.get("sample_rate") != SAMPLE_RATE or meta.get("size") != stat.st_size:
+        return False
+    if meta.get("mtime") == stat.st_mtime:
+        return True
+    # mtime 变了但内容可能没变（复制、touch），再比较哈希
+    if meta.get("hash") == quick_hash(video_path):
+        meta["mtime"] = stat.st_mtime
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+        return True
+    return False
+
+
+def extract_audio(video_path, log_callback=None):
+    """解码视频音轨到缓存文件，已有有效缓存时直接返回缓存路径"""
+    audio_path, meta_path = audio_cache_paths(video_path)
+    if is_cache_valid(video_path):
+        return audio_path
+
+    if log_callback:
+        log_callback(f"正在提取音频: {os.path.basename(video_path)}")
+    tmp_path = audio_path + ".tmp"
+    command = [
+        "ffmpeg", "-nostdin", "-v", "error",
+        "-i", video_path,
+        "-vn", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "-f", "f32le", "-y", tmp_path
+    ]
+    result = subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True)
+    if result.returncode != 0:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise RuntimeError(f"音频提取失败: {result.stderr.strip()}")
+    os.replace(tmp_path, audio_path)
+
+    stat = os.stat(video_path)
+    meta = {
+        "size": stat.st_size,
+        "mtime": stat.st_mtime,
+        "hash": quick_hash(video_path),
+        "sample_rate": SAMPLE_RATE,
+    }
+    with open(meta_path, "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    return audio_path
+
+
+def load_audio(video_path, log_callback=None):
+    """返回内存映射的 float32 音频数组（写时复制，不会改动缓存文件）"""
+    audio_path = extract_audio(video_path, log_callback=log_callback)
+    if os.path.getsize(audio_path) == 0:
+        return np.zeros(0, dtype=np.float32)
+    return np.memmap(audio_path, dtype=np.float32, mode="c")
+
+
+def audio_duration(audio):
+    return len(audio) / SAMPLE_RATE
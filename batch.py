@@ -0,0 +1,160 @@
+"""无界面批处理入口：不依赖 PyQt / X server，直接以库调用方式运行 下载 → 转写 → 翻译 → 融合 流水线。
+
+    python batch.py https://youtu.be/xxx video/local.mp4 --transcribe-workers 2 --fuse-workers 2
+
+参数可以是链接（先下载）或本地视频文件（跳过下载）。stdout 每行一个 events.py 协议的 JSON 事件，
+例如 {"v": 1, "event": "progress", "stage": "transcribe", "job": "video-1", "percent": 42.0, "rate": 3.1, "eta": 95.0}；
+库函数自身的日志输出被重定向到 stderr。
+"""
+import os
+import sys
+import argparse
+import threading
+
+from pipeline import Pipeline, Stage
+from events import make_event, encode_event
+
+VIDEO_DIR = "video"
+DEFAULT_FONT_PATH = "/usr/share/fonts/truetype/msttcorefonts/Times_New_Roman.ttf"
+
+
+class EventWriter:
+    """线程安全地向 stdout 写 JSON 事件"""
+
+    def __init__(self, stream):
+        self.stream = stream
+        self.lock = threading.Lock()
+
+    def __call__(self, event):
+        line = encode_event(event)
+        with self.lock:
+            self.stream.write(line)
+            self.stream.flush()
+
+
+def build_jobs(inputs):
+    jobs = []
+    for i, item in enumerate(inputs):
+        job = {"id": f"video-{i + 1}", "input": item}
+        if os.path.exists(item):
+            job["video_path"] = os.path.abspath(item)
+        else:
+            job["url"] = item
+        jobs.append(job)
+    return jobs
+
+
+def build_stages(args):
+    def download(job, progress_callback, log_callback):
+        if "video_path" in job:
+            return
+        from downloader import download_video
+        job["video_path"] = download_video(job["url"], args.quality, args.video_dir,
+                                           log_callback=log_callback, progress_callback=progress_callback)
+
+    def transcribe_factory(log_callback):
+        import subtitle_generator
+        compute_type = args.compute_type or subtitle_generator.DEFAULT_COMPUTE_TYPE
+        model = None
+        transcriber = None
+        if args.parallel_chunks > 1:
+            from parallel_transcribe import ParallelTranscriber
+            transcriber = ParallelTranscriber(args.model, compute_type=compute_type,
+                                              workers=args.parallel_chunks)
+        else:
+            model = subtitle_generator.load_model(args.model, compute_type=compute_type)
+
+        def transcribe(job, progress_callback, log_callback):
+            job["srt_path"] = subtitle_generator.generate_subtitles(
+                job["video_path"], model=model, transcriber=transcriber, progress_callback=progress_callback,
+                model_size=args.model, compute_type=compute_type, force=args.force)
+        if transcriber is not None:
+            transcribe.close = transcriber.close
+        return transcribe
+
+    def translate(job, progress_callback, log_callback):
+        import subtitle_translator
+        job["zh_srt_path"] = subtitle_translator.translate_subtitle_file_local(
+            job["srt_path"], progress_callback=progress_callback, use_cache=not args.no_cache, force=args.force,
+            preset=args.translate_preset)
+        if not job["zh_srt_path"]:
+            raise RuntimeError(f"字幕文件不存在: {job['srt_path']}")
+
+    def fuse(job, progress_callback, log_callback):
+        from fusion import process_video_with_subtitles
+        video_path = job["video_path"]
+        Vname = os.path.splitext(os.path.basename(video_path))[0]
+        job["output"] = process_video_with_subtitles(Vname, args.font, log_callback=log_callback,
+                                                     progress_callback=progress_callback,
+                                                     video_dir=os.path.dirname(video_path), force=args.force,
+                                                     mode=args.fuse_mode, subtitle_format=args.subtitle_format,
+                                                     segments=args.fuse_segments)
+        if not job["output"]:
+            raise RuntimeError(f"未找到名为 {Vname} 的视频文件！")
+
+    stages = [
+        Stage("download", download, args.download_workers),
+        Stage("transcribe", transcribe_factory, args.transcribe_workers, per_worker=True),
+        Stage("translate", translate, args.translate_workers),
+        Stage("fuse", fuse, args.fuse_workers),
+    ]
+    if args.until:
+        names = [stage.name for stage in stages]
+        stages = stages[:names.index(args.until) + 1]
+    return stages
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="无界面批处理：下载 → 转写 → 翻译 → 融合")
+    parser.add_argument("inputs", nargs="+", help="视频链接或本地视频文件")
+    parser.add_argument("--quality", default="720p", choices=["1080p", "720p", "480p", "360p"])
+    parser.add_argument("--video-dir", default=VIDEO_DIR)
+    parser.add_argument("--model", default="small.en", help="Whisper 模型大小")
+    parser.add_argument("--compute-type", default=None,
+                        help="例如 int8 / float16（默认 subtitle_generator.DEFAULT_COMPUTE_TYPE，与 GUI、命令行一致）")
+    parser.add_argument("--parallel-chunks", type=int, default=1, help="每个转写线程按静音分块并行的进程数")
+    parser.add_argument("--font", default=DEFAULT_FONT_PATH)
+    parser.add_argument("--fuse-mode", default="burn", choices=["burn", "parallel", "soft"],
+                        help="burn 烧录字幕（重新编码）；parallel 按关键帧分段并行烧录；soft 复制音视频流并封装字幕轨")
+    parser.add_argument("--fuse-segments", type=int, default=None, help="parallel 模式的分段数（默认按 CPU 核数）")
+    parser.add_argument("--subtitle-format", default="srt", choices=["srt", "ass"],
+                        help="软字幕为 MKV 时的字幕轨格式（ass 带样式）")
+    parser.add_argument("--download-workers", type=int, default=3)
+    parser.add_argument("--transcribe-workers", type=int, default=1)
+    parser.add_argument("--translate-workers", type=int, default=1)
+    parser.add_argument("--fuse-workers", type=int, default=1)
+    parser.add_argument("--queue-size", type=int, default=2, help="阶段之间的队列长度")
+    parser.add_argument("--until", choices=["download", "transcribe", "translate", "fuse"], help="只运行到该阶段")
+    parser.add_argument("--translate-preset", default="quality", choices=["fast", "balanced", "quality"],
+                        help="翻译解码预设：fast 贪心（适合批量处理旧视频）/ balanced / quality 束宽 4")
+    parser.add_argument("--no-cache", action="store_true", help="不使用翻译缓存")
+    parser.add_argument("--force", action="store_true", help="忽略产物清单，全部重做")
+    args = parser.parse_args(argv)
+
+    emit = EventWriter(sys.stdout)
+    # 库函数中的 print 全部转到 stderr，stdout 只保留 JSON 事件
+    sys.stdout = sys.stderr
+
+    jobs = build_jobs(args.inputs)
+    for job in jobs:
+        emit(make_event("queued", job=job["id"], input=job["input"]))
+
+    pipeline = Pipeline(build_stages(args), queue_size=args.queue_size, event_callback=emit)
+    try:
+        results = pipeline.run(jobs)
+    except KeyboardInterrupt:
+        pipeline.cancel()
+        # 融合阶段启动过 ffmpeg 时一并终止
+        if "ffmpeg_executor" in sys.modules:
+            sys.modules["ffmpeg_executor"].cancel_all()
+        emit(make_event("cancelled", level="warning"))
+        sys.exit(130)
+
+    outputs = {job["id"]: job.get("output") for job in jobs}
+    emit(make_event("summary", results=results, outputs=outputs))
+    if any(status != "done" for status in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,360 @@
+"""离线阶段基准测试：在本地生成可复现的合成素材，分别测量各阶段的耗时、吞吐量和峰值内存。
+
+    python benchmark.py                                   # 默认 1 万 / 10 万条字幕，全部阶段
+    python benchmark.py --cues 10000 100000 1000000 --stages segment split
+    python benchmark.py --stages translate --marian models/tiny-marian   # 使用本地小 Marian 模型
+    python benchmark.py --stages translate --marian Helsinki-NLP/opus-mt-en-zh --backends ctranslate2 transformers
+    python benchmark.py --stages startup                  # 启动耗时：用法提示路径、GUI 窗口显示，附 import 耗时排行
+
+素材（固定随机种子）：ffmpeg lavfi testsrc 视频 + 正弦音 / 噪声音频、合成单词时间戳流、合成双语 SRT。
+每个阶段在独立子进程中运行，峰值 RSS 只统计该阶段（含其启动的 ffmpeg）。
+结果追加到 JSON 历史文件，并与上一次运行中相同阶段、相同规模的结果比较，变慢超过阈值时标出。
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import subprocess
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+from subtitle_io import format_srt_time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+STAGES = ["segment", "split", "translate", "fuse", "startup"]
+# 启动耗时的测量对象：不带参数运行（只打印用法）的命令行脚本，以及 GUI 显示出窗口
+STARTUP_TARGETS = {
+    "subtitle_generator": ["subtitle_generator.py"],
+    "subtitle_translator": ["subtitle_translator.py"],
+    "transcribe_worker": ["transcribe_worker.py"],
+    "translate_worker": ["translate_worker.py"],
+    "batch": ["batch.py", "--help"],
+    "app": ["app.py", "--startup-timing"],
+}
+IMPORT_TOP_N = 8
+DEFAULT_CUES = [10000, 100000]
+DEFAULT_WORK_DIR = "bench_media"
+DEFAULT_HISTORY = os.path.join("cache", "benchmark_history.json")
+REGRESSION_THRESHOLD = 0.10   # 吞吐量下降超过 10% 视为退化
+SEED = 20240501
+
+WORDS = ["the", "model", "video", "subtitle", "we", "can", "see", "that", "this", "is", "a", "very",
+         "simple", "example", "of", "speech", "and", "it", "works", "well", "today", "with", "some", "noise"]
+CN_WORDS = ["我们", "可以", "看到", "这个", "视频", "字幕", "模型", "非常", "简单", "例子", "今天", "效果", "很好"]
+PUNCTUATION = [".", ",", "?", "!", ";", ""]
+
+
+# ==============================
+# 合成素材
+# ==============================
+def synthetic_words(cues, seed=SEED):
+    """约 cues 条字幕量的单词时间戳流（惰性生成），平均每 8 个词一个标点，偶尔有较长停顿"""
+    from parallel_transcribe import Word
+    rng = random.Random(seed)
+    t = 0.0
+    for _ in range(cues * 8):
+        word = rng.choice(WORDS)
+        if rng.random() < 0.125:
+            word += rng.choice(PUNCTUATION)
+        start = t + (rng.random() * 0.8 if rng.random() < 0.05 else rng.random() * 0.05)
+        end = start + 0.1 + rng.random() * 0.3
+        t = end
+        yield Word(start, end, " " + word)
+
+
+def write_bilingual_srt(path, cues, seed=SEED, duration=None):
+    """英文在上、中文在下的双语 SRT；给出 duration 时条目均匀分布在该时长内"""
+    rng = random.Random(seed)
+    step = duration / cues if duration else 2.5
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(cues):
+            start = i * step
+            end = start + step * 0.9
+            en = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))).capitalize() + "."
+            cn = "".join(rng.choice(CN_WORDS) for _ in range(rng.randint(3, 8))) + "。"
+            f.write(f"{i + 1}\n{format_srt_time(start * 1000)} --> {format_srt_time(end * 1000)}\n{en}\n{cn}\n\n")
+    return path
+
+
+def write_english_srt(path, cues, seed=SEED):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(cues):
+            en = " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 12))).capitalize() + "."
+            f.write(f"{i + 1}\n{format_srt_time(i * 2500)} --> {format_srt_time(i * 2500 + 2200)}\n{en}\n\n")
+    return path
+
+
+def make_media(path, seconds, size="1280x720", rate=30, audio="tone"):
+    """testsrc 彩条视频 + 440Hz 正弦音（audio="noise" 时为粉红噪声）"""
+    audio_source = "anoisesrc=color=pink:amplitude=0.2" if audio == "noise" else "sine=frequency=440"
+    command = ["ffmpeg", "-v", "error",
+               "-f", "lavfi", "-i", f"testsrc=size={size}:rate={rate}:duration={seconds}",
+               "-f", "lavfi", "-i", f"{audio_source}:sample_rate=48000:duration={seconds}",
+               "-c:v", "libx264", "-preset", "veryfast", "-g", str(rate * 2), "-pix_fmt", "yuv420p",
+               "-c:a", "aac", "-shortest", "-y", path]
+    subprocess.run(command, check=True)
+    return path
+
+
+# ==============================
+# 各阶段
+# ==============================
+def peak_rss_mb():
+    """本进程及其已结束子进程（ffmpeg）的峰值 RSS（MB）"""
+    if resource is None:
+        return None
+    usage = max(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+                resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss)
+    # Linux 单位为 KB，macOS 为字节
+    return round(usage / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def bench_segment(work_dir, cues, options):
+    import subtitle_generator
+    count = 0
+    words = 0
+
+    def counted():
+        nonlocal words
+        for w in synthetic_words(cues):
+            words += 1
+            yield w
+
+    start = time.perf_counter()
+    for _ in subtitle_generator.segment_words(counted()):
+        count += 1
+    seconds = time.perf_counter() - start
+    return {"seconds": seconds, "items": count, "unit": "cues", "words_per_s": round(words / seconds, 1)}
+
+
+def bench_split(work_dir, cues, options):
+    from split import split_srt
+    source = write_bilingual_srt(os.path.join(work_dir, f"bilingual_{cues}.srt"), cues)
+    start = time.perf_counter()
+    en_count, _ = split_srt(source, os.path.join(work_dir, "split_en.srt"), os.path.join(work_dir, "split_cn.srt"))
+    return {"seconds": time.perf_counter() - start, "items": en_count, "unit": "cues"}
+
+
+class StubTokenizer:
+    """按空格切分的分词器，只用于按长度分桶"""
+
+    def __call__(self, texts, truncation=True, **kwargs):
+        return {"input_ids": [[0] * (len(t.split()) + 1) for t in texts]}
+
+
+class StubBackend:
+    """不加载权重的翻译后端：返回反转的原文，只测量分桶、缓存与文件读写的开销"""
+    name = "stub"
+
+    def translate(self, texts, generation_params):
+        return [t[::-1] for t in texts]
+
+
+def use_stub_translator(subtitle_translator):
+    subtitle_translator.tokenizer = StubTokenizer()
+    subtitle_translator.model = StubBackend()
+
+
+def bench_translate(work_dir, cues, options):
+    import subtitle_translator
+    result = {"unit": "cues", "model": options.marian or "stub"}
+    if options.marian:
+        subtitle_translator.model_name = options.marian
+        subtitle_translator.TRANSLATION_BACKEND = options.backend
+        # 模型加载（以及首次的 CTranslate2 转换）单独计时，吞吐量只按翻译本身计算
+        start = time.perf_counter()
+        subtitle_translator.load_model()
+        backend = subtitle_translator.model.name
+        result.update(load_seconds=round(time.perf_counter() - start, 3), backend=backend)
+        # 真实模型太慢，按 --translate-limit 截断条数
+        cues = min(cues, options.translate_limit)
+        result.update(preset=options.preset, size_label=f"{cues}:{backend}:{options.preset}")
+    else:
+        use_stub_translator(subtitle_translator)
+    source = write_english_srt(os.path.join(work_dir, f"english_{cues}.srt"), cues)
+    start = time.perf_counter()
+    subtitle_translator.translate_subtitle_file_local(source, progress_callback=None, use_cache=False, force=True,
+                                                      preset=options.preset)
+    result.update(seconds=time.perf_counter() - start, items=cues)
+    return result
+
+
+def bench_fuse(work_dir, cues, options):
+    from fusion import add_subtitles
+    seconds = options.video_seconds
+    video = os.path.join(work_dir, f"testsrc_{seconds}s_{options.audio}.mp4")
+    if not os.path.exists(video):
+        make_media(video, seconds, audio=options.audio)
+    # 视频中平均每 2.5 秒一条字幕，与字幕规模无关
+    srt_file = write_bilingual_srt(os.path.join(work_dir, f"fuse_{seconds}s.srt"), max(1, int(seconds / 2.5)),
+                                   duration=seconds)
+    start = time.perf_counter()
+    add_subtitles(video, srt_file, os.path.join(work_dir, "fused"))
+    elapsed = time.perf_counter() - start
+    frames = seconds * 30
+    return {"seconds": elapsed, "items": frames, "unit": "frames", "size_label": f"{seconds}s"}
+
+
+def parse_importtime(stderr, top=IMPORT_TOP_N):
+    """-X importtime 输出中耗时最多的顶层导入：[(模块, 累计毫秒), ...]"""
+    modules = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # 顶层导入的模块名前只有一个空格，嵌套导入按层级缩进
+        if not cumulative.strip().isdigit() or name.startswith("  "):
+            continue
+        modules.append((name.strip(), round(int(cumulative) / 1000, 1)))
+    return sorted(modules, key=lambda m: -m[1])[:top]
+
+
+def bench_startup(work_dir, target, options):
+    """从解释器启动到脚本退出的总耗时；GUI 使用 offscreen 平台，窗口显示后立即退出"""
+    command = [sys.executable, "-X", "importtime"] + [os.path.join(options.repo_dir, a) if a.endswith(".py") else a
+                                                     for a in STARTUP_TARGETS[target]]
+    env = dict(os.environ, QT_QPA_PLATFORM="offscreen", PYTHONDONTWRITEBYTECODE="1")
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, env=env, cwd=work_dir)
+    seconds = time.perf_counter() - start
+    if "Traceback" in result.stderr:
+        raise RuntimeError(f"{target} 启动失败:\n{result.stderr[-2000:]}")
+    return {"seconds": seconds, "items": 1, "unit": "runs", "size_label": target,
+            "top_imports": parse_importtime(result.stderr)}
+
+
+BENCHMARKS = {"segment": bench_segment, "split": bench_split, "translate": bench_translate, "fuse": bench_fuse,
+              "startup": bench_startup}
+
+
+def run_stage(stage, work_dir, cues, options):
+    """在子进程中执行：切换到素材目录（产物清单、缓存都写在那里），返回结果与峰值内存"""
+    sys.path.insert(0, options.repo_dir)
+    os.chdir(work_dir)
+    result = BENCHMARKS[stage](".", cues, options)
+    result.update(stage=stage, cues=cues, peak_rss_mb=peak_rss_mb())
+    result["throughput"] = round(result["items"] / result["seconds"], 1) if result["seconds"] else None
+    result["seconds"] = round(result["seconds"], 3)
+    return result
+
+
+def run_isolated(stage, work_dir, cues, options):
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(run_stage, stage, work_dir, cues, options).result()
+
+
+# ==============================
+# 历史记录
+# ==============================
+def load_history(path):
+    if not os.path.exists(path):
+        return []
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_history(path, history):
+    if os.path.dirname(path):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(history, f, ensure_ascii=False, indent=1)
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def result_key(result):
+    return result["stage"], result.get("size_label") or result["cues"]
+
+
+def compare(results, previous, threshold=REGRESSION_THRESHOLD):
+    """与上一次运行对比，返回 {key: 吞吐量变化比例}"""
+    if not previous:
+        return {}
+    before = {result_key(r): r for r in previous["results"]}
+    changes = {}
+    for r in results:
+        old = before.get(result_key(r))
+        if old and old.get("throughput") and r.get("throughput"):
+            changes[result_key(r)] = r["throughput"] / old["throughput"] - 1
+    return changes
+
+
+def print_report(results, changes, threshold=REGRESSION_THRESHOLD):
+    print(f"{'阶段':<10}{'规模':>20}{'耗时(s)':>10}{'吞吐量':>14}{'单位':>8}{'峰值RSS(MB)':>13}{'对比上次':>10}")
+    for r in results:
+        key = result_key(r)
+        change = changes.get(key)
+        note = ""
+        if change is not None:
+            note = f"{change:+.1%}" + (" 退化" if change < -threshold else "")
+        print(f"{r['stage']:<10}{str(key[1]):>20}{r['seconds']:>10}{r['throughput']:>14}{r['unit'] + '/s':>8}"
+              f"{str(r['peak_rss_mb']):>13}{note:>10}")
+    for r in results:
+        if r.get("top_imports"):
+            print(f"{r['size_label']} 导入耗时（累计 ms）: " + ", ".join(f"{m} {ms}" for m, ms in r["top_imports"]))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="离线阶段基准测试")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES)
+    parser.add_argument("--cues", nargs="+", type=int, default=DEFAULT_CUES, help="字幕规模（条数），可给多个")
+    parser.add_argument("--video-seconds", type=int, default=30, help="融合阶段测试视频时长")
+    parser.add_argument("--audio", default="tone", choices=["tone", "noise"], help="测试视频的音频")
+    parser.add_argument("--marian", help="Marian 模型目录或名称；不指定时翻译阶段使用桩模型")
+    parser.add_argument("--backends", nargs="+", default=["ctranslate2", "transformers"],
+                        choices=["ctranslate2", "transformers"], help="使用真实模型时对比的翻译后端")
+    parser.add_argument("--preset", default="quality", choices=["fast", "balanced", "quality"], help="翻译解码预设")
+    parser.add_argument("--translate-limit", type=int, default=2000, help="使用真实模型时最多翻译的条数")
+    parser.add_argument("--startup-targets", nargs="+", default=list(STARTUP_TARGETS), choices=list(STARTUP_TARGETS),
+                        help="startup 阶段测量的入口")
+    parser.add_argument("--work-dir", default=DEFAULT_WORK_DIR)
+    parser.add_argument("--history", default=DEFAULT_HISTORY)
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args(argv)
+    args.repo_dir = os.path.dirname(os.path.abspath(__file__))
+    if args.marian and os.path.isdir(args.marian):
+        args.marian = os.path.abspath(args.marian)
+
+    work_dir = os.path.abspath(args.work_dir)
+    os.makedirs(work_dir, exist_ok=True)
+    results = []
+    for stage in args.stages:
+        # 融合阶段的规模由视频时长决定，只测一次
+        sizes = args.cues[:1] if stage == "fuse" else args.cues
+        if stage == "startup":
+            sizes = args.startup_targets
+        # 使用真实模型时按 --backends 分别测量翻译后端
+        backends = args.backends if stage == "translate" and args.marian else [None]
+        for cues in sizes:
+            for backend in backends:
+                size = cues if stage == "startup" else f"{cues} 条"
+                print(f"运行 {stage}（{size}{'，' + backend if backend else ''}）...", flush=True)
+                results.append(run_isolated(stage, work_dir, cues, argparse.Namespace(**vars(args), backend=backend)))
+
+    history = load_history(args.history)
+    changes = compare(results, history[-1] if history else None, args.threshold)
+    print_report(results, changes, args.threshold)
+    history.append({"time": time.strftime("%Y-%m-%d %H:%M:%S"), "git": git_revision(),
+                    "python": platform.python_version(), "machine": platform.machine(),
+                    "cpus": os.cpu_count(), "results": results})
+    save_history(args.history, history)
+    if any(change < -args.threshold for change in changes.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
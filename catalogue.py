@@ -0,0 +1,149 @@
+"""视频与字幕目录索引：在内存中维护 规范化名称 → 视频文件 / 各版本字幕（.srt、_zh、_en、_cn）的映射。
+
+启动时各目录只扫描一次；之后由文件系统监视（GUI 中为 QFileSystemWatcher）通知哪个目录变了，
+rescan_dir() 只比较文件名集合并增量更新索引（不 stat 每个文件），已知的新文件也可以直接 add() / discard()。
+查找字幕、查找视频、列出视频都是字典查询，不再每次 listdir 并对所有文件做正则匹配。
+"""
+import os
+import re
+import threading
+
+VIDEO_EXTS = ('.mp4', '.mkv', '.webm', '.flv', '.avi', '.mov')
+SUBTITLE_EXT = ".srt"
+# 文件名后缀 → 字幕版本：原始转写、双语翻译、分割出的英文、中文
+SUBTITLE_VARIANTS = {"_zh": "zh", "_en": "en", "_cn": "cn"}
+
+
+def normalize_name(name):
+    """只保留字母数字下划线并转小写，用于匹配重命名前后或带特殊字符的文件名"""
+    return re.sub(r'[^\w]', '', name).lower()
+
+
+def subtitle_keys(filename):
+    """字幕文件对应的 [(规范化名称, 版本), ...]：完整文件名总是作为 srt 版本索引，
+    带 _zh/_en/_cn 后缀时再以去掉后缀的名称索引为对应版本"""
+    stem = os.path.splitext(filename)[0]
+    keys = [(normalize_name(stem), "srt")]
+    for suffix, variant in SUBTITLE_VARIANTS.items():
+        if stem.endswith(suffix) and len(stem) > len(suffix):
+            keys.append((normalize_name(stem[:-len(suffix)]), variant))
+    return keys
+
+
+class MediaCatalogue:
+    def __init__(self, video_dir, subtitle_dir="outsrt"):
+        self.video_dir = os.path.abspath(video_dir)
+        self.subtitle_dir = os.path.abspath(subtitle_dir)
+        self.lock = threading.Lock()
+        self.files = {self.video_dir: set(), self.subtitle_dir: set()}
+        self.videos = {}      # 规范化名称 → {文件名: 路径}
+        self.subtitles = {}   # (规范化名称, 版本) → {文件名: 路径}
+        for directory in self.directories():
+            self.rescan_dir(directory)
+
+    def directories(self):
+        return list(self.files)
+
+    # ---------- 增量更新 ----------
+    def _is_tracked(self, directory, filename):
+        lower = filename.lower()
+        if directory == self.video_dir and lower.endswith(VIDEO_EXTS):
+            return True
+        return directory == self.subtitle_dir and lower.endswith(SUBTITLE_EXT)
+
+    def _index(self, directory, filename, add):
+        path = os.path.join(directory, filename)
+        if directory == self.video_dir:
+            keys = [(self.videos, normalize_name(os.path.splitext(filename)[0]))]
+        else:
+            keys = [(self.subtitles, key) for key in subtitle_keys(filename)]
+        for table, key in keys:
+            if add:
+                table.setdefault(key, {})[filename] = path
+            else:
+                entries = table.get(key, {})
+                entries.pop(filename, None)
+                if not entries:
+                    table.pop(key, None)
+
+    def rescan_dir(self, directory):
+        """重新读取目录的文件名并与已知集合比较，返回 (新增, 删除) 文件名列表"""
+        directory = os.path.abspath(directory)
+        if directory not in self.files:
+            return [], []
+        try:
+            with os.scandir(directory) as entries:
+                current = {e.name for e in entries if self._is_tracked(directory, e.name)}
+        except FileNotFoundError:
+            current = set()
+        with self.lock:
+            known = self.files[directory]
+            added = sorted(current - known)
+            removed = sorted(known - current)
+            for filename in added:
+                self._index(directory, filename, True)
+            for filename in removed:
+                self._index(directory, filename, False)
+            self.files[directory] = current
+        return added, removed
+
+    def add(self, path):
+        """已知新建（或重命名得到）的文件直接加入索引"""
+        directory, filename = os.path.split(os.path.abspath(path))
+        if directory not in self.files or not self._is_tracked(directory, filename):
+            return
+        with self.lock:
+            if filename not in self.files[directory]:
+                self.files[directory].add(filename)
+                self._index(directory, filename, True)
+
+    def discard(self, path):
+        directory, filename = os.path.split(os.path.abspath(path))
+        with self.lock:
+            if filename in self.files.get(directory, ()):
+                self.files[directory].discard(filename)
+                self._index(directory, filename, False)
+
+    # ---------- 查询 ----------
+    def video_files(self):
+        """视频目录中的所有视频文件名（排序）"""
+        with self.lock:
+            return sorted(self.files[self.video_dir])
+
+    def _lookup(self, table, key, exact):
+        entries = table.get(key)
+        if not entries:
+            return None
+        # 文件名完全一致的优先，其余按文件名排序取第一个，结果稳定
+        return entries.get(exact) or entries[min(entries)]
+
+    def find_subtitle(self, video_filename, variant="srt"):
+        """视频对应的字幕路径；variant 为 srt / zh / en / cn，找不到时返回 None"""
+        stem = os.path.splitext(os.path.basename(video_filename))[0]
+        suffix = "" if variant == "srt" else f"_{variant}"
+        with self.lock:
+            return self._lookup(self.subtitles, (normalize_name(stem), variant), f"{stem}{suffix}{SUBTITLE_EXT}")
+
+    def find_subtitle_for_video(self, video_filename):
+        return self.find_subtitle(video_filename, "srt")
+
+    def subtitle_variants(self, video_filename):
+        """{版本: 路径}，只包含已存在的版本"""
+        variants = {}
+        for variant in ["srt", *SUBTITLE_VARIANTS.values()]:
+            path = self.find_subtitle(video_filename, variant)
+            if path:
+                variants[variant] = path
+        return variants
+
+    def find_video(self, name):
+        """按视频名（不含扩展名）查找视频路径，文件名必须与 name 完全一致，否则返回 None
+        （不做规范化匹配，以免把字幕融合进另一个视频）；多个扩展名同时存在时按 VIDEO_EXTS 的顺序优先"""
+        with self.lock:
+            entries = self.videos.get(normalize_name(name), {})
+            exact = [f for f in entries if os.path.splitext(f)[0] == name]
+            if not exact:
+                return None
+            order = {ext: i for i, ext in enumerate(VIDEO_EXTS)}
+            best = min(exact, key=lambda f: (order.get(os.path.splitext(f)[1].lower(), len(order)), f))
+            return entries[best]
@@ -0,0 +1,104 @@
+import os
+import re
+import threading
+import subprocess
+
+QUALITY_MAP = {
+    "1080p": "bv[height<=1080]+ba/b[height<=1080]",
+    "720p": "bv[height<=720]+ba/b[height<=720]",
+    "480p": "bv[height<=480]+ba/b[height<=480]",
+    "360p": "bv[height<=360]+ba/b[height<=360]",
+}
+DEFAULT_QUALITY = "bv[height<=720]+ba/b[height<=720]"
+DOWNLOAD_CONCURRENCY = 3
+# yt-dlp 在文件移动到最终位置后打印该前缀 + 完整路径，用来准确定位每个下载结果
+FILEPATH_MARKER = "__VSF_FILEPATH__ "
+
+_rename_lock = threading.Lock()
+
+
+def clean_filename(filename):
+    filename = re.sub(r'[^A-Za-z0-9_\u4e00-\u9fff\s]', '', filename)
+    filename = filename.strip()
+    first_word = filename.split()[0] if filename else "video"
+    return first_word
+
+
+def rename_to_clean(video_path):
+    """按 clean_filename 重命名下载的视频，返回新路径；
+    目标已存在时（例如同时下载的两个视频标题首词相同）加 _2、_3… 后缀，不覆盖已有文件"""
+    with _rename_lock:
+        return _rename_to_clean(video_path)
+
+
+def _rename_to_clean(video_path):
+    dir_name = os.path.dirname(video_path)
+    name, ext = os.path.splitext(os.path.basename(video_path))
+    base = clean_filename(name)
+    new_path = os.path.join(dir_name, base + ext)
+    index = 2
+    while new_path != video_path and os.path.exists(new_path):
+        new_path = os.path.join(dir_name, f"{base}_{index}{ext}")
+        index += 1
+    if new_path != video_path:
+        os.rename(video_path, new_path)
+    return new_path
+
+
+def build_ytdlp_command(url, quality_label, output_dir):
+    quality = QUALITY_MAP.get(quality_label, DEFAULT_QUALITY)
+    return [
+        "yt-dlp",
+        "-f", quality,
+        "-o", os.path.join(output_dir, "%(title)s.%(ext)s"),
+        # --print 隐含 --quiet，需要 --progress 保留进度输出
+        "--newline", "--progress",
+        "--print", f"after_move:{FILEPATH_MARKER}%(filepath)s",
+        url
+    ]
+
+
+def parse_output_path(line):
+    """从 yt-dlp 输出行中取出最终文件路径，没有时返回 None"""
+    line = line.strip()
+    if line.startswith(FILEPATH_MARKER):
+        return line[len(FILEPATH_MARKER):]
+    return None
+
+
+def parse_download_progress(output):
+    """从 yt-dlp 日志估计下载进度（优先分片数，其次百分比），没有匹配时返回 None"""
+    frag_matches = re.findall(r"\(frag\s+(\d+)/(\d+)\)", output)
+    if frag_matches:
+        current_frag, total_frag = map(int, frag_matches[-1])
+        return int((current_frag / total_frag) * 100) if total_frag else 0
+    percent_matches = re.findall(r"\[download\]\s+([\d.]+)%", output)
+    if percent_matches:
+        return int(float(percent_matches[-1]))
+    return None
+
+
+def download_video(url, quality_label, output_dir, log_callback=None, progress_callback=None):
+    """阻塞下载单个视频并按 clean_filename 重命名，返回最终视频路径"""
+    os.makedirs(output_dir, exist_ok=True)
+    cmd = build_ytdlp_command(url, quality_label, output_dir)
+    process = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                               text=True, encoding="utf-8", errors="ignore")
+    video_path = None
+    for line in process.stdout:
+        line = line.rstrip()
+        path = parse_output_path(line)
+        if path:
+            video_path = path
+            continue
+        if log_callback and line:
+            log_callback(line)
+        percent = parse_download_progress(line)
+        if percent is not None and progress_callback:
+            progress_callback(percent)
+    process.wait()
+    if process.returncode != 0:
+        raise RuntimeError(f"yt-dlp 下载失败，退出代码：{process.returncode}")
+    if not video_path or not os.path.exists(video_path):
+        raise RuntimeError("未找到下载的视频文件。")
+    return rename_to_clean(video_path)
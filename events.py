@@ -0,0 +1,141 @@
+"""工作进程与调度端之间的结构化事件协议（JSON Lines）。
+
+每个事件独占一行，是一个带 "v" 版本号的 JSON 对象，例如：
+    {"v": 1, "event": "progress", "stage": "transcribe", "job": "video-1", "percent": 42.0,
+     "done": 310.5, "unit": "audio_s", "rate": 3.1, "eta": 125.0, "time": 1700000000.0}
+    {"v": 1, "event": "log", "stage": "fuse", "job": "video-1", "level": "warning", "message": "..."}
+
+event 取值：ready / queued / start / progress / log / done / error / summary / cancelled。
+done 为已处理量，unit 为其单位：转写 audio_s（音频秒数）、翻译 cues（字幕条数）、编码 frames（帧数）；
+rate 为每秒处理量，即 audio_s/s、cues/s、fps。
+读取端用 EventDecoder 按整行解析，数据块在行中间截断也不会丢事件；不是事件的行原样作为日志文本返回。
+"""
+import json
+import time
+
+PROTOCOL_VERSION = 1
+LEVELS = ("debug", "info", "warning", "error")
+RATE_UNITS = {"audio_s": "audio_s/s", "cues": "cues/s", "frames": "fps"}
+
+
+def make_event(event, stage=None, job=None, **fields):
+    data = {"v": PROTOCOL_VERSION, "event": event, "stage": stage, "job": job}
+    data.update((k, v) for k, v in fields.items() if v is not None)
+    data["time"] = round(time.time(), 3)
+    return data
+
+
+def encode_event(event):
+    return json.dumps(event, ensure_ascii=False) + "\n"
+
+
+def decode_line(line):
+    """是事件行时返回 dict，否则返回 None"""
+    line = line.strip()
+    if not line.startswith("{"):
+        return None
+    try:
+        data = json.loads(line)
+    except ValueError:
+        return None
+    if not isinstance(data, dict) or data.get("v") != PROTOCOL_VERSION:
+        return None
+    return data
+
+
+class EventDecoder:
+    """增量解码：feed() 接收任意切分的数据块，返回完整行对应的 [(event 或 None, 原始行), ...]"""
+
+    def __init__(self):
+        self.buffer = ""
+
+    def feed(self, data):
+        self.buffer += data.replace("\r\n", "\n").replace("\r", "\n")
+        *lines, self.buffer = self.buffer.split("\n")
+        return [(decode_line(line), line) for line in lines if line.strip()]
+
+    def flush(self):
+        line, self.buffer = self.buffer, ""
+        return [(decode_line(line), line)] if line.strip() else []
+
+
+class ProgressTracker:
+    """根据进度百分比和已处理量计算吞吐量与剩余时间；min_interval 秒内的重复进度会被合并"""
+
+    def __init__(self, stage=None, job=None, min_interval=0.2):
+        self.stage = stage
+        self.job = job
+        self.min_interval = min_interval
+        self.started = time.monotonic()
+        self.last_emit = 0.0
+
+    def update(self, percent, done=None, unit=None):
+        """返回 progress 事件；被节流时返回 None（100% 总会返回）"""
+        now = time.monotonic()
+        percent = max(0.0, min(100.0, float(percent)))
+        if percent < 100 and now - self.last_emit < self.min_interval:
+            return None
+        self.last_emit = now
+        elapsed = now - self.started
+        rate = None
+        if done is not None and elapsed > 0:
+            rate = round(done / elapsed, 2)
+            done = round(done, 2)
+        eta = None
+        if 0 < percent < 100 and elapsed > 0:
+            eta = round(elapsed * (100 - percent) / percent, 1)
+        return make_event("progress", self.stage, self.job, percent=round(percent, 2), done=done,
+                          unit=unit if done is not None else None, rate=rate, eta=eta)
+
+
+class LogWriter:
+    """文件对象适配器：把 print 输出逐行转成 log 事件（用于 redirect_stdout）"""
+
+    def __init__(self, emit, stage=None, job=None, level="info"):
+        self.emit = emit
+        self.stage = stage
+        self.job = job
+        self.level = level
+        self.buffer = ""
+
+    def write(self, text):
+        self.buffer += text
+        *lines, self.buffer = self.buffer.split("\n")
+        for line in lines:
+            if line.strip():
+                self.emit(make_event("log", self.stage, self.job, level=self.level, message=line))
+        return len(text)
+
+    def flush(self):
+        if self.buffer.strip():
+            self.emit(make_event("log", self.stage, self.job, level=self.level, message=self.buffer))
+        self.buffer = ""
+
+
+def progress_printer(stage, job=None):
+    """命令行脚本使用的进度回调：把 progress 事件打印到 stdout"""
+    tracker = ProgressTracker(stage, job)
+
+    def progress_callback(percent, done=None, unit=None):
+        event = tracker.update(percent, done=done, unit=unit)
+        if event:
+            print(encode_event(event), end="", flush=True)
+    return progress_callback
+
+
+def format_duration(seconds):
+    seconds = int(seconds)
+    h, rest = divmod(seconds, 3600)
+    m, s = divmod(rest, 60)
+    return f"{h}:{m:02d}:{s:02d}" if h else f"{m:02d}:{s:02d}"
+
+
+def describe_progress(event):
+    """进度事件的简短说明，例如 "3.1 audio_s/s, 剩余 02:05" """
+    parts = []
+    if event.get("rate") is not None:
+        unit = event.get("unit")
+        parts.append(f"{event['rate']} {RATE_UNITS.get(unit, unit or '')}".strip())
+    if event.get("eta") is not None:
+        parts.append(f"剩余 {format_duration(event['eta'])}")
+    return ", ".join(parts)
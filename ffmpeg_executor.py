@@ -0,0 +1,272 @@
+"""基于 asyncio 的 ffmpeg 执行器。
+
+- 所有 ffmpeg / ffprobe 子进程由同一个后台事件循环管理，调用方线程只等待结果；
+- 按 CPU 核数分配"核心预算"：每个编码任务声明自己大约占用的核数，预算不足时排队，
+  多个融合线程同时启动也不会把机器压垮；只复制流的任务只占 1 个核；
+- 进度读取 `-progress pipe:1` 输出的 key=value（out_time_us、frame、fps、speed、progress），不再解析日志；
+  stderr 另行读取，只转给 log_callback，失败时最后几行附在异常信息里；
+- 取消或超时时先向 ffmpeg 发送 q 让它正常收尾，超过宽限时间再 terminate / kill，不会留下孤儿进程。
+
+    executor = get_executor()
+    executor.run(["ffmpeg", "-i", "in.mp4", ..., "out.mp4"], progress_callback=cb, cores=4, timeout=3600)
+    future = executor.submit(command)   # concurrent.futures.Future，future.cancel() 终止 ffmpeg
+"""
+import os
+import asyncio
+import threading
+from collections import deque
+
+STDERR_TAIL_LINES = 20
+TERMINATE_GRACE_SECONDS = 5.0
+
+
+def available_cores():
+    """当前进程可用的 CPU 核数（遵循 taskset / cgroup 的 CPU 亲和性设置）"""
+    if hasattr(os, "sched_getaffinity"):
+        return max(1, len(os.sched_getaffinity(0)))
+    return os.cpu_count() or 1
+
+
+# 一个普通编码任务默认占用的核数：同时最多约 2 个整片编码
+DEFAULT_ENCODER_CORES = max(1, available_cores() // 2)
+
+
+class FFmpegError(RuntimeError):
+    pass
+
+
+class CoreBudget:
+    """asyncio 下的计数信号量：acquire(n) 一次占用 n 个核，超过总预算的请求按总预算计"""
+
+    def __init__(self, total):
+        self.total = total
+        self.free = total
+        self.condition = asyncio.Condition()
+
+    async def acquire(self, cores):
+        cores = max(1, min(cores, self.total))
+        async with self.condition:
+            await self.condition.wait_for(lambda: self.free >= cores)
+            self.free -= cores
+        return cores
+
+    async def release(self, cores):
+        async with self.condition:
+            self.free += cores
+            self.condition.notify_all()
+
+
+def parse_progress_block(lines):
+    """-progress 的一组 key=value（以 progress=continue/end 结尾）转成 dict"""
+    values = {}
+    for line in lines:
+        key, sep, value = line.partition("=")
+        if sep:
+            values[key.strip()] = value.strip()
+    return values
+
+
+def progress_seconds(values):
+    """已输出的媒体时长（秒）；ffmpeg 的 out_time_ms 实际单位也是微秒"""
+    for key in ("out_time_us", "out_time_ms"):
+        value = values.get(key)
+        if value and value != "N/A":
+            try:
+                return max(0.0, int(value) / 1_000_000)
+            except ValueError:
+                pass
+    return None
+
+
+def input_file(command):
+    """命令中的第一个 -i 参数"""
+    if "-i" in command:
+        index = command.index("-i")
+        if index + 1 < len(command):
+            return command[index + 1]
+    return None
+
+
+def with_progress_args(command):
+    """在程序名之后插入 -progress pipe:1 -nostats（stdout 只用于进度）"""
+    return [command[0], "-progress", "pipe:1", "-nostats"] + list(command[1:])
+
+
+class FFmpegExecutor:
+    def __init__(self, total_cores=None):
+        self.total_cores = total_cores or available_cores()
+        self.loop = asyncio.new_event_loop()
+        self.budget = None
+        self.processes = set()
+        self.started = threading.Event()
+        self.thread = threading.Thread(target=self._run_loop, name="ffmpeg-executor", daemon=True)
+        self.thread.start()
+        self.started.wait()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.budget = CoreBudget(self.total_cores)
+        self.started.set()
+        self.loop.run_forever()
+
+    # ---------- 调用方线程使用的同步接口 ----------
+    def submit(self, command, log_callback=None, progress_callback=None, duration=None, cores=None, timeout=None):
+        """提交一个 ffmpeg 命令，返回 concurrent.futures.Future（结果为最后的进度 dict）"""
+        return asyncio.run_coroutine_threadsafe(
+            self.run_async(command, log_callback, progress_callback, duration, cores, timeout), self.loop)
+
+    def run(self, command, log_callback=None, progress_callback=None, duration=None, cores=None, timeout=None):
+        """阻塞执行；调用线程被中断（KeyboardInterrupt 等）时终止 ffmpeg"""
+        future = self.submit(command, log_callback, progress_callback, duration, cores, timeout)
+        try:
+            return future.result()
+        except BaseException:
+            future.cancel()
+            raise
+
+    def capture(self, command, timeout=None):
+        """执行 ffprobe 一类的短命令并返回 stdout 文本（不占核心预算）"""
+        return asyncio.run_coroutine_threadsafe(self.capture_async(command, timeout), self.loop).result()
+
+    def cancel_all(self):
+        """终止所有正在运行的 ffmpeg（程序退出或流水线取消时调用）"""
+        for process in list(self.processes):
+            asyncio.run_coroutine_threadsafe(self._terminate(process), self.loop)
+
+    # ---------- 事件循环内部 ----------
+    async def run_async(self, command, log_callback=None, progress_callback=None, duration=None, cores=None,
+                        timeout=None):
+        if duration is None and progress_callback:
+            source = input_file(command)
+            if source:
+                duration = await self._probe_duration(source)
+        cores = await self.budget.acquire(cores or DEFAULT_ENCODER_CORES)
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *with_progress_args(command), stdin=asyncio.subprocess.PIPE,
+                stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+            self.processes.add(process)
+            tail = deque(maxlen=STDERR_TAIL_LINES)
+            state = {}
+            try:
+                readers = asyncio.gather(
+                    self._read_progress(process.stdout, state, duration, progress_callback),
+                    self._read_stderr(process.stderr, tail, log_callback))
+                await asyncio.wait_for(readers, timeout)
+                returncode = await process.wait()
+            except asyncio.TimeoutError:
+                await self._terminate(process)
+                raise FFmpegError(f"FFmpeg 超时（{timeout} 秒）已终止")
+            except BaseException:
+                # 取消、progress_callback 抛出的异常、读取失败等：先终止 ffmpeg 再释放核心预算
+                await self._terminate(process)
+                raise
+            finally:
+                self.processes.discard(process)
+        finally:
+            await self.budget.release(cores)
+        if returncode != 0:
+            detail = "\n".join(tail)
+            raise FFmpegError(f"FFmpeg 执行失败（退出码 {returncode}）" + (f":\n{detail}" if detail else ""))
+        return state
+
+    async def capture_async(self, command, timeout=None):
+        process = await asyncio.create_subprocess_exec(
+            *command, stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE)
+        self.processes.add(process)
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except BaseException:
+            await self._terminate(process)
+            raise
+        finally:
+            self.processes.discard(process)
+        if process.returncode != 0:
+            raise FFmpegError(f"{os.path.basename(command[0])} 执行失败: {stderr.decode(errors='replace').strip()}")
+        return stdout.decode(errors="replace")
+
+    async def _probe_duration(self, path):
+        try:
+            output = await self.capture_async(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                                               "-of", "default=noprint_wrappers=1:nokey=1", path])
+            return float(output.strip())
+        except (FFmpegError, ValueError, OSError):
+            return None
+
+    async def _read_progress(self, stream, state, duration, progress_callback):
+        block = []
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            line = line.decode(errors="replace").strip()
+            block.append(line)
+            if not line.startswith("progress="):
+                continue
+            values = parse_progress_block(block)
+            block = []
+            state.update(values)
+            if not progress_callback:
+                continue
+            frame = values.get("frame")
+            frames = int(frame) if frame and frame.isdigit() else None
+            if values.get("progress") == "end":
+                progress_callback(100, done=frames, unit="frames")
+                continue
+            seconds = progress_seconds(values)
+            if duration and seconds is not None:
+                progress_callback(min(seconds / duration * 100, 99.9), done=frames, unit="frames")
+
+    async def _read_stderr(self, stream, tail, log_callback):
+        while True:
+            line = await stream.readline()
+            if not line:
+                break
+            line = line.decode(errors="replace").rstrip()
+            if not line:
+                continue
+            tail.append(line)
+            if log_callback:
+                log_callback(line)
+
+    async def _terminate(self, process, grace=TERMINATE_GRACE_SECONDS):
+        """先发 q 让 ffmpeg 写完文件尾，超时后 terminate，再超时 kill"""
+        if process.returncode is not None:
+            return
+        try:
+            if process.stdin and not process.stdin.is_closing():
+                process.stdin.write(b"q")
+                await process.stdin.drain()
+                process.stdin.close()
+        except (ConnectionError, OSError):
+            pass
+        for action in (None, process.terminate, process.kill):
+            if action:
+                try:
+                    action()
+                except ProcessLookupError:
+                    return
+            try:
+                await asyncio.wait_for(process.wait(), grace)
+                return
+            except asyncio.TimeoutError:
+                continue
+
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_executor():
+    """进程内共享的执行器（第一次使用时创建）"""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = FFmpegExecutor()
+        return _executor
+
+
+def cancel_all():
+    if _executor is not None:
+        _executor.cancel_all()
@@ -1,34 +1,43 @@
 import os
-import subprocess
 import re
+import shutil
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from split import split_srt  # 你的分割字幕模块
+from subtitle_io import iter_cues, shift_cues, write_ass
+from artifacts import get_manifest
+from ffmpeg_executor import get_executor
+from catalogue import VIDEO_EXTS
+import metrics
 
 os.environ["PATH"] += r";C:\ffmpeg\bin"  # ffmpeg路径，根据实际改
 
-def run_ffmpeg_with_progress(command, log_callback=None, progress_callback=None):
-    process = subprocess.Popen(command, stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
-    duration = None
-    for line in process.stderr:
-        line = line.strip()
-        if log_callback:
-            log_callback(line)
-        # 获取视频总时长
-        if duration is None:
-            m = re.search(r'Duration: (\d+):(\d+):([\d\.]+)', line)
-            if m:
-                h, m_, s = map(float, m.groups())
-                duration = h*3600 + m_*60 + s
-        # 获取当前时间
-        m2 = re.search(r'time=(\d+):(\d+):([\d\.]+)', line)
-        if m2 and duration:
-            h, m_, s = map(float, m2.groups())
-            current_time = h*3600 + m_*60 + s
-            percent = int((current_time / duration) * 100)
-            if progress_callback:
-                progress_callback(percent)
-    process.wait()
-    if process.returncode != 0:
-        raise RuntimeError("FFmpeg 执行失败")
+# 双语字幕样式：英文在下、中文在上
+EN_SUBTITLE_STYLE = dict(subtitle_color='&H00FFFF00', font_size=12, margin_v=14)
+CN_SUBTITLE_STYLE = dict(subtitle_color='&H0000FFFF', font_size=13, margin_v=38)
+ENCODE_PARAMS = {"crf": "23", "preset": "ultrafast"}
+
+# 融合方式：burn 把字幕烧录进画面（重新编码），soft 复制音视频流、把字幕作为独立字幕轨封装（不重新编码），
+# parallel 在关键帧处分段、各段同时烧录后无损拼接
+FUSE_MODES = ("burn", "soft", "parallel")
+# 分段并行烧录：默认段数（不超过 CPU 核数），短于 MIN_SEGMENT_SECONDS 的段会被合并
+PARALLEL_SEGMENTS = min(os.cpu_count() or 2, 8)
+MIN_SEGMENT_SECONDS = 20
+SOFT_SUBTITLE_FORMATS = ("srt", "ass")
+SUBTITLE_LANGUAGES = {"en": ("eng", "English"), "cn": ("chi", "中文")}
+
+def run_ffmpeg_with_progress(command, log_callback=None, progress_callback=None, duration=None, cores=None,
+                             timeout=None, encode=True):
+    """通过共享的 ffmpeg 执行器运行命令并报告进度；duration 为输出时长（秒），为 None 时探测输入文件时长。
+    cores 为该命令大约占用的核数（默认按普通编码计），用于限制同时运行的编码器数量；
+    encode=False 表示只复制视频流，帧数不计入编码帧率"""
+    with metrics.span("ffmpeg", output=os.path.basename(command[-1])) as attrs:
+        state = get_executor().run(command, log_callback=log_callback, progress_callback=progress_callback,
+                                   duration=duration, cores=cores, timeout=timeout)
+        frame = state.get("frame")
+        if encode and frame and frame.isdigit() and int(frame):
+            attrs["frames"] = int(frame)
 
 def get_codec_and_ext(input_ext):
     input_ext = input_ext.lower()
@@ -45,51 +54,254 @@ def get_codec_and_ext(input_ext):
     else:
         return "libx264", ".mp4"
 
-def add_subtitles(input_video_file, srt_file, output_file, font_file=None,
-                  subtitle_color='white', font_size=24, margin_v=21,
-                  log_callback=None, progress_callback=None):
+def escape_filter_path(path):
+    """滤镜参数中的路径需要两级转义：ffmpeg 先按滤镜图去掉一级（\\ ' [ ] , ;），
+    再按滤镜选项值去掉一级（\\ : '）。Windows 盘符、目录名中的逗号、方括号、引号都能原样传给滤镜"""
+    value = re.sub(r"([\\:'])", r"\\\1", path)
+    return re.sub(r"([\\'\[\],;])", r"\\\1", value)
+
+def build_ass_filter(ass_file, font_file=None):
     if font_file:
-        subtitle_filter = f"subtitles={srt_file}:fontsdir={os.path.dirname(font_file)}:" \
-                          f"force_style='FontName={os.path.basename(font_file)}," \
-                          f"PrimaryColour={subtitle_color},FontSize={font_size},MarginV={margin_v},Italic=1'"
-    else:
-        subtitle_filter = f"subtitles={srt_file}:" \
-                          f"force_style='PrimaryColour={subtitle_color},FontSize={font_size},MarginV={margin_v},Italic=1'"
+        return (f"ass=filename={escape_filter_path(ass_file)}"
+                f":fontsdir={escape_filter_path(os.path.dirname(font_file))}")
+    return f"ass=filename={escape_filter_path(ass_file)}"
+
+def write_styled_ass(subtitle_tracks, ass_file, font_file=None, start=None, end=None):
+    """把 [(srt_file, style_dict), ...] 写成一个多样式 ASS；给出 start/end（秒）时只保留该时间段并平移到 0"""
+    tracks = []
+    for n, (srt_file, style) in enumerate(subtitle_tracks):
+        cues = iter_cues(srt_file)
+        if start is not None:
+            cues = shift_cues(cues, int(round(start * 1000)), int(round(end * 1000)))
+        tracks.append((f"Track{n + 1}", cues, style))
+    return write_ass(tracks, ass_file, font_file)
 
+def burn_subtitles(input_video_file, subtitle_tracks, output_file, font_file=None,
+                   log_callback=None, progress_callback=None):
+    """subtitle_tracks: [(srt_file, style_dict), ...]，写成一个带各自样式的 ASS，一次编码完成"""
     _, input_ext = os.path.splitext(input_video_file)
     codec, output_ext = get_codec_and_ext(input_ext)
     output_file = os.path.splitext(output_file)[0] + output_ext
     audio_codec = "libopus" if output_ext == ".webm" else "aac"
+    ass_file = os.path.splitext(output_file)[0] + ".burn.ass"
+    write_styled_ass(subtitle_tracks, ass_file, font_file)
 
     command = [
         "ffmpeg",
         "-i", input_video_file,
-        "-vf", subtitle_filter,
+        "-vf", build_ass_filter(ass_file, font_file),
         "-c:v", codec,
-        "-crf", "23",
-        "-preset", "ultrafast",
+        "-crf", ENCODE_PARAMS["crf"],
+        "-preset", ENCODE_PARAMS["preset"],
         "-c:a", audio_codec,
         "-y", output_file
     ]
 
     if log_callback:
         log_callback(f"正在添加字幕到视频: {os.path.basename(output_file)}")
-    
-    run_ffmpeg_with_progress(command, log_callback=log_callback, progress_callback=progress_callback)
+
+    try:
+        run_ffmpeg_with_progress(command, log_callback=log_callback, progress_callback=progress_callback)
+    finally:
+        os.remove(ass_file)
 
     if log_callback:
         log_callback(f"字幕添加成功: {output_file}")
     return output_file
 
-def process_video_with_subtitles(Vname, font_file=None, log_callback=None, progress_callback=None):
-    video_dir = "video"
-    exts = ['.mp4', '.mkv', '.webm', '.flv', '.avi']
-    input_video_file = None
-    for ext in exts:
-        candidate = os.path.join(video_dir, Vname + ext)
-        if os.path.exists(candidate):
-            input_video_file = candidate
+def add_subtitles(input_video_file, srt_file, output_file, font_file=None,
+                  subtitle_color='white', font_size=24, margin_v=21,
+                  log_callback=None, progress_callback=None):
+    style = dict(subtitle_color=subtitle_color, font_size=font_size, margin_v=margin_v)
+    return burn_subtitles(input_video_file, [(srt_file, style)], output_file, font_file,
+                          log_callback=log_callback, progress_callback=progress_callback)
+
+def probe_duration(video_file):
+    output = get_executor().capture(["ffprobe", "-v", "error", "-show_entries", "format=duration",
+                                     "-of", "default=noprint_wrappers=1:nokey=1", video_file])
+    return float(output.strip())
+
+def probe_keyframes(video_file):
+    """视频流所有关键帧的时间（秒），只解析关键帧，不完整解码"""
+    output = get_executor().capture(["ffprobe", "-v", "error", "-select_streams", "v:0", "-skip_frame", "nokey",
+                                     "-show_entries", "frame=best_effort_timestamp_time", "-of", "csv=p=0",
+                                     video_file])
+    times = []
+    for line in output.splitlines():
+        value = line.strip().rstrip(",")
+        if value and value != "N/A":
+            times.append(float(value))
+    return sorted(times)
+
+def plan_segments(keyframes, duration, segments, min_seconds=MIN_SEGMENT_SECONDS):
+    """在最接近等分点的关键帧处切分，返回 [(开始秒, 结束秒), ...]"""
+    cuts = [0.0]
+    for i in range(1, segments):
+        target = duration * i / segments
+        candidates = [t for t in keyframes if cuts[-1] + min_seconds <= t <= duration - min_seconds]
+        if not candidates:
             break
+        cut = min(candidates, key=lambda t: abs(t - target))
+        if cut > cuts[-1]:
+            cuts.append(cut)
+    cuts.append(duration)
+    return list(zip(cuts[:-1], cuts[1:]))
+
+class SegmentProgress:
+    """按段时长加权汇总各段进度，帧数累加，通过同一个 progress_callback 报告"""
+
+    def __init__(self, segments, progress_callback=None):
+        self.durations = [end - start for start, end in segments]
+        self.total = sum(self.durations) or 1
+        self.percents = [0.0] * len(segments)
+        self.frames = [0] * len(segments)
+        self.progress_callback = progress_callback
+        self.lock = threading.Lock()
+
+    def callback(self, index):
+        def progress_callback(percent, done=None, unit=None):
+            with self.lock:
+                self.percents[index] = min(float(percent), 100.0)
+                if done is not None:
+                    self.frames[index] = done
+                overall = sum(p * d for p, d in zip(self.percents, self.durations)) / self.total
+                frames = sum(self.frames)
+            if self.progress_callback:
+                self.progress_callback(int(overall), done=frames, unit="frames")
+        return progress_callback
+
+def burn_subtitles_parallel(input_video_file, subtitle_tracks, output_file, font_file=None,
+                            log_callback=None, progress_callback=None, segments=PARALLEL_SEGMENTS):
+    """在关键帧处把视频切成 segments 段，各段用平移到段内时间轴的 ASS 字幕同时烧录（只编码视频），
+    再用 concat 分离器无损拼接并合入音频。视频太短或关键帧不足时退回单进程烧录。"""
+    _, input_ext = os.path.splitext(input_video_file)
+    codec, output_ext = get_codec_and_ext(input_ext)
+    output_file = os.path.splitext(output_file)[0] + output_ext
+    audio_codec = "libopus" if output_ext == ".webm" else "aac"
+
+    duration = probe_duration(input_video_file)
+    plan = plan_segments(probe_keyframes(input_video_file), duration, segments)
+    if len(plan) < 2:
+        if log_callback:
+            log_callback("视频较短或关键帧不足，改用单进程烧录。")
+        return burn_subtitles(input_video_file, subtitle_tracks, output_file, font_file,
+                              log_callback=log_callback, progress_callback=progress_callback)
+
+    if log_callback:
+        log_callback(f"分段并行烧录: {len(plan)} 段，切点 " + ", ".join(f"{start:.2f}s" for start, _ in plan[1:]))
+    threads_per_segment = max(1, (os.cpu_count() or 1) // len(plan))
+    tracker = SegmentProgress(plan, progress_callback)
+    work_dir = tempfile.mkdtemp(prefix="fuse_", dir=os.path.dirname(os.path.abspath(output_file)))
+    try:
+        def encode_segment(index):
+            start, end = plan[index]
+            ass_file = write_styled_ass(subtitle_tracks, os.path.join(work_dir, f"seg{index:03d}.ass"),
+                                        font_file, start, end)
+            segment_file = os.path.join(work_dir, f"seg{index:03d}.mkv")
+            command = [
+                "ffmpeg",
+                "-ss", f"{start:.6f}", "-i", input_video_file,
+                "-t", f"{end - start:.6f}",
+                "-map", "0:v:0", "-an",
+                "-vf", build_ass_filter(ass_file, font_file),
+                "-c:v", codec,
+                "-crf", ENCODE_PARAMS["crf"],
+                "-preset", ENCODE_PARAMS["preset"],
+                "-threads", str(threads_per_segment),
+                "-y", segment_file
+            ]
+            run_ffmpeg_with_progress(command, progress_callback=tracker.callback(index), duration=end - start,
+                                     cores=threads_per_segment)
+            return segment_file
+
+        with ThreadPoolExecutor(max_workers=len(plan)) as pool:
+            segment_files = list(pool.map(metrics.wrap(encode_segment), range(len(plan))))
+
+        list_file = os.path.join(work_dir, "segments.txt")
+        with open(list_file, "w", encoding="utf-8") as f:
+            for segment_file in segment_files:
+                f.write(f"file '{os.path.abspath(segment_file)}'\n")
+        command = [
+            "ffmpeg",
+            "-f", "concat", "-safe", "0", "-i", list_file,
+            "-i", input_video_file,
+            "-map", "0:v", "-map", "1:a?",
+            "-c:v", "copy",
+            "-c:a", audio_codec,
+            "-y", output_file
+        ]
+        if log_callback:
+            log_callback(f"拼接 {len(segment_files)} 段视频: {os.path.basename(output_file)}")
+        run_ffmpeg_with_progress(command, duration=duration, cores=1, encode=False)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    if progress_callback:
+        progress_callback(100)
+    if log_callback:
+        log_callback(f"字幕添加成功: {output_file}")
+    return output_file
+
+def get_soft_container(input_ext):
+    """软字幕封装格式：MP4 系列用 mov_text，其它容器统一输出 MKV"""
+    if input_ext.lower() in ['.mp4', '.mov', '.m4v']:
+        return ".mp4"
+    return ".mkv"
+
+def mux_subtitles(input_video_file, subtitle_tracks, output_file, font_file=None,
+                  log_callback=None, progress_callback=None):
+    """subtitle_tracks: [(字幕文件, 语言键), ...]；复制音视频流，把字幕封装为带语言标签的独立字幕轨。
+    输出 MKV 且提供字体时把字体作为附件一并封装，ASS 样式在其它机器上也能正确显示"""
+    _, input_ext = os.path.splitext(input_video_file)
+    output_ext = get_soft_container(input_ext)
+    output_file = os.path.splitext(output_file)[0] + output_ext
+
+    command = ["ffmpeg", "-i", input_video_file]
+    for subtitle_file, _ in subtitle_tracks:
+        command += ["-i", subtitle_file]
+    command += ["-map", "0:v", "-map", "0:a?"]
+    for i in range(len(subtitle_tracks)):
+        command += ["-map", f"{i + 1}:0"]
+    # MP4 只支持 mov_text；MKV 保留原格式（SRT 或带样式的 ASS）
+    command += ["-c:v", "copy", "-c:a", "copy", "-c:s", "mov_text" if output_ext == ".mp4" else "copy"]
+    for i, (_, lang) in enumerate(subtitle_tracks):
+        code, title = SUBTITLE_LANGUAGES[lang]
+        command += [f"-metadata:s:s:{i}", f"language={code}", f"-metadata:s:s:{i}", f"title={title}",
+                    f"-disposition:s:{i}", "default" if i == 0 else "0"]
+    if font_file and os.path.exists(font_file) and output_ext == ".mkv":
+        command += ["-attach", font_file, "-metadata:s:t", "mimetype=application/x-truetype-font"]
+    command += ["-y", output_file]
+
+    if log_callback:
+        log_callback(f"正在封装软字幕: {os.path.basename(output_file)}")
+
+    # 只复制流，几乎不占 CPU
+    run_ffmpeg_with_progress(command, log_callback=log_callback, progress_callback=progress_callback, cores=1,
+                             encode=False)
+
+    if log_callback:
+        log_callback(f"软字幕封装成功: {output_file}")
+    return output_file
+
+def process_video_with_subtitles(Vname, font_file=None, log_callback=None, progress_callback=None,
+                                 single_pass=True, force=False, video_dir="video", mode="burn",
+                                 subtitle_format="srt", segments=None, catalogue=None):
+    """分割双语字幕并融合到视频；输入内容和参数未变的阶段直接跳过（force=True 强制重做）。
+    mode="burn" 烧录字幕（重新编码），输出 <名>_cn.*；mode="soft" 只封装字幕轨（不重新编码），输出 <名>_sub.mkv/.mp4，
+    subtitle_format="ass" 时 MKV 使用带样式的 ASS 字幕轨；
+    mode="parallel" 与 burn 输出相同，但在关键帧处分成 segments 段同时编码。
+    传入 catalogue（MediaCatalogue）时从索引中查找视频，不再逐个扩展名检查文件。"""
+    if mode not in FUSE_MODES:
+        raise ValueError(f"未知的融合方式: {mode}")
+    input_video_file = None
+    if catalogue is not None:
+        input_video_file = catalogue.find_video(Vname)
+    else:
+        for ext in VIDEO_EXTS:
+            candidate = os.path.join(video_dir, Vname + ext)
+            if os.path.exists(candidate):
+                input_video_file = candidate
+                break
 
     if input_video_file is None:
         if log_callback:
@@ -100,35 +312,114 @@ def process_video_with_subtitles(Vname, font_file=None, log_callback=None, progr
     output_srt_en = f"outsrt/{Vname}_en.srt"
     output_srt_cn = f"outsrt/{Vname}_cn.srt"
 
-    if log_callback:
-        log_callback("开始分割字幕文件...")
-    split_srt(input_srt, output_srt_en, output_srt_cn)
-    if log_callback:
-        log_callback("字幕文件分割完成。")
-
-    # 添加英文字幕
-    srt_file_en = output_srt_en
-    output_file_en = os.path.join(video_dir, f"{Vname}_en")
-    subtitle_color_en = '&H00FFFF00'
-    font_size_en = 12
-    margin_v_en = 14
-
-    output_file_en = add_subtitles(input_video_file, srt_file_en, output_file_en, font_file,
-                                   subtitle_color=subtitle_color_en, font_size=font_size_en,
-                                   margin_v=margin_v_en, log_callback=log_callback,
-                                   progress_callback=progress_callback)
-
-    # 添加中文字幕
-    srt_file_cn = output_srt_cn
+    manifest = get_manifest()
+    # split_by：按 原文 / 译文 的行位置拆分（见 subtitle_io.split_cue_text）；拆分规则变化时需要修改以重新生成
+    split_params = {"format": "zh-en", "split_by": "position"}
+    if not force and all(manifest.is_up_to_date("split", out, [input_srt], split_params)
+                         for out in (output_srt_en, output_srt_cn)):
+        if log_callback:
+            log_callback("分割字幕已是最新，跳过分割。")
+    else:
+        if log_callback:
+            log_callback("开始分割字幕文件...")
+        split_srt(input_srt, output_srt_en, output_srt_cn)
+        manifest.record("split", output_srt_en, [input_srt], split_params)
+        manifest.record("split", output_srt_cn, [input_srt], split_params)
+        if log_callback:
+            log_callback("字幕文件分割完成。")
+
+    if mode == "soft":
+        return mux_video_with_subtitles(Vname, input_video_file, output_srt_en, output_srt_cn, font_file,
+                                        subtitle_format, log_callback, progress_callback, force, video_dir)
+
+    en_track = (output_srt_en, EN_SUBTITLE_STYLE)
+    cn_track = (output_srt_cn, CN_SUBTITLE_STYLE)
     output_file_cn = os.path.join(video_dir, f"{Vname}_cn")
-    subtitle_color_cn = '&H0000FFFF'
-    font_size_cn = 13
-    margin_v_cn = 38
 
-    output_file_cn = add_subtitles(output_file_en, srt_file_cn, output_file_cn, font_file,
-                                   subtitle_color=subtitle_color_cn, font_size=font_size_cn,
-                                   margin_v=margin_v_cn, log_callback=log_callback,
-                                   progress_callback=progress_callback)
+    _, output_ext = get_codec_and_ext(os.path.splitext(input_video_file)[1])
+    expected_output = output_file_cn + output_ext
+    fuse_inputs = [input_video_file, output_srt_en, output_srt_cn]
+    if font_file and os.path.exists(font_file):
+        fuse_inputs.append(font_file)
+    fuse_params = {
+        "single_pass": single_pass,
+        "en_style": EN_SUBTITLE_STYLE,
+        "cn_style": CN_SUBTITLE_STYLE,
+        "encode": ENCODE_PARAMS,
+        "font": os.path.basename(font_file) if font_file else None,
+        "mode": mode,
+        # 两条字幕写入同一个带样式的 ASS、由 ass 滤镜一次渲染（原来是串联的 subtitles 滤镜）
+        "renderer": "styled-ass",
+    }
+    if mode == "parallel":
+        segments = segments or PARALLEL_SEGMENTS
+        fuse_params["segments"] = segments
+    if not force and manifest.is_up_to_date("fuse", expected_output, fuse_inputs, fuse_params):
+        if log_callback:
+            log_callback(f"融合视频已是最新，跳过编码: {expected_output}")
+        if progress_callback:
+            progress_callback(100)
+        return expected_output
 
+    if mode == "parallel":
+        # 分段并行：每段同时烧录两条字幕，拼接后合入音频
+        output_file_cn = burn_subtitles_parallel(input_video_file, [en_track, cn_track], output_file_cn, font_file,
+                                                 log_callback=log_callback, progress_callback=progress_callback,
+                                                 segments=segments)
+    elif single_pass:
+        # 单次编码：英文、中文两条字幕滤镜串联，不生成中间视频
+        output_file_cn = burn_subtitles(input_video_file, [en_track, cn_track], output_file_cn, font_file,
+                                        log_callback=log_callback, progress_callback=progress_callback)
+    else:
+        # 添加英文字幕
+        output_file_en = os.path.join(video_dir, f"{Vname}_en")
+        output_file_en = burn_subtitles(input_video_file, [en_track], output_file_en, font_file,
+                                        log_callback=log_callback, progress_callback=progress_callback)
+
+        # 添加中文字幕
+        output_file_cn = burn_subtitles(output_file_en, [cn_track], output_file_cn, font_file,
+                                        log_callback=log_callback, progress_callback=progress_callback)
+
+    manifest.record("fuse", output_file_cn, fuse_inputs, fuse_params)
     if log_callback:
         log_callback(f"最终输出文件: {output_file_cn}")
+    return output_file_cn
+
+def mux_video_with_subtitles(Vname, input_video_file, output_srt_en, output_srt_cn, font_file=None,
+                             subtitle_format="srt", log_callback=None, progress_callback=None,
+                             force=False, video_dir="video"):
+    """软字幕模式：中文轨在前（默认显示），英文轨在后"""
+    output_ext = get_soft_container(os.path.splitext(input_video_file)[1])
+    # mov_text 不支持样式，MP4 始终按 SRT 封装
+    use_ass = subtitle_format == "ass" and output_ext == ".mkv"
+    output_file = os.path.join(video_dir, f"{Vname}_sub")
+    expected_output = output_file + output_ext
+    manifest = get_manifest()
+    mux_inputs = [input_video_file, output_srt_en, output_srt_cn]
+    if use_ass and font_file and os.path.exists(font_file):
+        mux_inputs.append(font_file)
+    mux_params = {"mode": "soft", "format": "ass" if use_ass else "srt", "languages": SUBTITLE_LANGUAGES}
+    if use_ass:
+        mux_params.update(en_style=EN_SUBTITLE_STYLE, cn_style=CN_SUBTITLE_STYLE,
+                          font=os.path.basename(font_file) if font_file else None)
+    if not force and manifest.is_up_to_date("fuse", expected_output, mux_inputs, mux_params):
+        if log_callback:
+            log_callback(f"软字幕视频已是最新，跳过封装: {expected_output}")
+        if progress_callback:
+            progress_callback(100)
+        return expected_output
+
+    tracks = [(output_srt_cn, "cn"), (output_srt_en, "en")]
+    if use_ass:
+        tracks = [
+            (write_styled_ass([(output_srt_cn, CN_SUBTITLE_STYLE)], os.path.splitext(output_srt_cn)[0] + ".ass",
+                              font_file), "cn"),
+            (write_styled_ass([(output_srt_en, EN_SUBTITLE_STYLE)], os.path.splitext(output_srt_en)[0] + ".ass",
+                              font_file), "en"),
+        ]
+    output_file = mux_subtitles(input_video_file, tracks, output_file, font_file if use_ass else None,
+                                log_callback=log_callback, progress_callback=progress_callback)
+    manifest.record("fuse", output_file, mux_inputs, mux_params)
+    if log_callback:
+        log_callback(f"最终输出文件: {output_file}")
+    return output_file
@@ -0,0 +1,246 @@
+"""常驻工作进程的通用任务协议（JSON Lines）
+
+请求（每行一个 JSON）：
+    {"id": "job-1", "input": "outsrt/xxx.srt", ...其它参数}
+    {"cmd": "shutdown"}
+事件使用 events.py 定义的结构化协议，job 字段为请求中的 id：
+    {"v": 1, "event": "ready", "stage": "translate", ...}
+    {"v": 1, "event": "progress", "stage": "translate", "job": "job-1", "percent": 42.0, "rate": 12.5, "eta": 30.0, ...}
+    {"v": 1, "event": "log", "stage": "translate", "job": "job-1", "level": "info", "message": "..."}
+    {"v": 1, "event": "done", "stage": "translate", "job": "job-1", "output": "..."}
+    {"v": 1, "event": "error", "stage": "translate", "job": "job-1", "level": "error", "message": "..."}
+
+工作进程可通过 stdin/stdout（GUI 的 QProcess）或本机 TCP 端口（命令行提交）接收任务，
+模型只在进程启动时加载一次，任务之间串行执行。
+"""
+import sys
+import json
+import socket
+import threading
+import contextlib
+import socketserver
+
+from events import make_event, encode_event, decode_line, ProgressTracker, LogWriter
+from metrics import job_metrics
+
+DEFAULT_HOST = "127.0.0.1"
+
+
+def run_job(handler, job, emit, stage=None):
+    """执行单个任务，处理函数中的 print 输出转成 log 事件，避免污染事件流"""
+    job_id = job.get("id")
+    tracker = ProgressTracker(stage, job_id)
+
+    def progress_callback(percent, done=None, unit=None):
+        event = tracker.update(percent, done=done, unit=unit)
+        if event:
+            emit(event)
+
+    log_writer = LogWriter(emit, stage, job_id)
+    try:
+        with contextlib.redirect_stdout(log_writer), job_metrics(job_id, stage, source=job.get("input")):
+            output = handler(job, progress_callback)
+        log_writer.flush()
+        emit(make_event("done", stage, job_id, output=output))
+    except Exception as e:
+        log_writer.flush()
+        emit(make_event("error", stage, job_id, level="error", message=str(e)))
+
+
+def serve_stdio(handler, stage=None):
+    """从 stdin 逐行读取任务，事件写到 stdout"""
+    out = sys.stdout
+
+    def emit(event):
+        out.write(encode_event(event))
+        out.flush()
+
+    emit(make_event("ready", stage))
+    for line in sys.stdin:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            job = json.loads(line)
+        except ValueError:
+            emit(make_event("error", stage, level="error", message=f"无法解析的请求: {line}"))
+            continue
+        if job.get("cmd") == "shutdown":
+            break
+        run_job(handler, job, emit, stage)
+
+
+def serve_tcp(handler, port, host=DEFAULT_HOST, stage=None):
+    """在本机端口上接收任务；多个客户端共用同一个已加载模型，任务通过锁串行执行"""
+    job_lock = threading.Lock()
+
+    class JobRequestHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            def emit(event):
+                self.wfile.write(encode_event(event).encode("utf-8"))
+                self.wfile.flush()
+
+            emit(make_event("ready", stage))
+            for raw in self.rfile:
+                line = raw.decode("utf-8").strip()
+                if not line:
+                    continue
+                try:
+                    job = json.loads(line)
+                except ValueError:
+                    emit(make_event("error", stage, level="error", message=f"无法解析的请求: {line}"))
+                    continue
+                if job.get("cmd") == "shutdown":
+                    threading.Thread(target=server.shutdown, daemon=True).start()
+                    break
+                with job_lock:
+                    run_job(handler, job, emit, stage)
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    server = socketserver.ThreadingTCPServer((host, port), JobRequestHandler)
+    print(f"工作进程已监听 {host}:{port}", file=sys.stderr, flush=True)
+    with server:
+        server.serve_forever()
+
+
+def submit_jobs(jobs, port, host=DEFAULT_HOST, event_callback=None):
+    """命令行客户端：把任务提交给已运行的工作进程，逐条返回事件，全部完成后返回结果列表"""
+    pending = {job["id"] for job in jobs}
+    results = []
+    with socket.create_connection((host, port)) as sock:
+        stream = sock.makefile("rwb")
+        for job in jobs:
+            stream.write(encode_event(job).encode("utf-8"))
+        stream.flush()
+        for raw in stream:
+            event = decode_line(raw.decode("utf-8"))
+            if event is None:
+                continue
+            if event_callback:
+                event_callback(event)
+            if event.get("event") in ("done", "error") and event.get("job") in pending:
+                results.append(event)
+                pending.discard(event.get("job"))
+                if not pending:
+                    break
+    return results
+
+
+def print_event(event, out=None):
+    """事件写到 out（默认 sys.stdout）；在 redirect_stdout 内调用时必须显式传入原来的 stdout"""
+    out = out or sys.stdout
+    out.write(encode_event(event))
+    out.flush()
+
+
+def worker_main(handler, build_job, preload=None, configure=None, argv=None, description="worker", stage=None):
+    """工作进程通用命令行：
+        --serve              从 stdin 读取任务（GUI 使用）
+        --listen PORT        监听本机端口
+        --submit PORT FILE.. 提交任务到已运行的工作进程
+        FILE..               不启动常驻进程，直接在当前进程依次处理（模型只加载一次）
+    configure(parser) 可追加工作进程自己的参数，preload(args) 在接收任务前加载模型，stage 写入每个事件
+    """
+    import argparse
+
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--serve", action="store_true", help="从 stdin 读取 JSON Lines 任务")
+    parser.add_argument("--listen", type=int, metavar="PORT", help="监听本机 TCP 端口")
+    parser.add_argument("--submit", type=int, metavar="PORT", help="提交任务到已运行的工作进程")
+    parser.add_argument("files", nargs="*")
+    if configure:
+        configure(parser)
+    args = parser.parse_args(argv)
+
+    if preload and (args.serve or args.listen or args.files) and not args.submit:
+        # 模型在接收任务前加载；加载日志走 stderr
+        with contextlib.redirect_stdout(sys.stderr):
+            preload(args)
+
+    if args.serve:
+        serve_stdio(handler, stage)
+    elif args.listen:
+        serve_tcp(handler, args.listen, stage=stage)
+    elif args.submit:
+        if not args.files:
+            parser.error("--submit 需要至少一个文件")
+        jobs = [build_job(i, path) for i, path in enumerate(args.files)]
+        results = submit_jobs(jobs, args.submit, event_callback=print_event)
+        if any(r.get("event") == "error" for r in results):
+            sys.exit(1)
+    elif args.files:
+        # 处理函数在 redirect_stdout(LogWriter) 中运行，事件必须写到重定向之前的 stdout，
+        # 否则 print 出的事件又被 LogWriter 转成 log 事件，无限递归
+        out = sys.stdout
+        failed = False
+        for i, path in enumerate(args.files):
+            def emit(event):
+                nonlocal failed
+                failed = failed or event.get("event") == "error"
+                print_event(event, out)
+            run_job(handler, build_job(i, path), emit, stage)
+        if failed:
+            sys.exit(1)
+    else:
+        parser.print_usage()
+        sys.exit(1)
+
+
+class WorkerProcess:
+    """在普通线程中使用常驻工作进程：启动 --serve 子进程，提交任务后阻塞等待结果，进度通过回调返回"""
+
+    def __init__(self, script, args=(), log_callback=None):
+        import subprocess
+        self.log_callback = log_callback
+        self.job_seq = 0
+        self.process = subprocess.Popen(
+            [sys.executable, script, "--serve", *args],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            text=True, encoding="utf-8", errors="replace", bufsize=1,
+        )
+        self.stderr_thread = threading.Thread(target=self._forward_stderr, daemon=True)
+        self.stderr_thread.start()
+        self.script = script
+        self._wait_for(lambda event: event.get("event") == "ready")
+
+    def _forward_stderr(self):
+        for line in self.process.stderr:
+            line = line.rstrip()
+            if line and self.log_callback:
+                self.log_callback(line)
+
+    def _wait_for(self, predicate, progress_callback=None, job_id=None):
+        for line in self.process.stdout:
+            event = decode_line(line)
+            if event is None:
+                if line.strip() and self.log_callback:
+                    self.log_callback(line.rstrip())
+                continue
+            if event.get("event") == "log" and self.log_callback:
+                self.log_callback(event.get("message", ""))
+            if event.get("event") == "progress" and event.get("job") == job_id and progress_callback:
+                progress_callback(event["percent"], done=event.get("done"), unit=event.get("unit"))
+            if predicate(event):
+                return event
+        raise RuntimeError(f"{self.script} 进程意外退出，退出代码：{self.process.wait()}")
+
+    def run(self, job, progress_callback=None):
+        """提交一个任务并等待完成，返回 output；失败时抛出 RuntimeError"""
+        self.job_seq += 1
+        job = dict(job, id=f"job-{self.job_seq}")
+        self.process.stdin.write(encode_event(job))
+        self.process.stdin.flush()
+        event = self._wait_for(lambda e: e.get("job") == job["id"] and e.get("event") in ("done", "error"),
+                               progress_callback=progress_callback, job_id=job["id"])
+        if event["event"] == "error":
+            raise RuntimeError(event.get("message"))
+        return event.get("output")
+
+    def close(self):
+        if self.process.poll() is None:
+            try:
+                self.process.stdin.write(encode_event({"cmd": "shutdown"}))
+                self.process.stdin.close()
+                self.process.wait(timeout=5)
+            except Exception:
+                self.process.kill()
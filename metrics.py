@@ -0,0 +1,236 @@
+"""阶段计时与指标导出。
+
+在模型加载、model.transcribe / model.generate、split_srt、每次 ffmpeg 调用外包一层 span()，
+记录开始时间、耗时和附加属性（音频秒数、字幕条数、帧数等）：
+
+    with job_metrics("video-1", "transcribe", source="video/lecture.mp4"):
+        with span("whisper.load", model="small.en"):
+            ...
+        with span("whisper.transcribe", audio_seconds=612.0) as attrs:
+            ...
+            attrs["words"] = n
+
+job_metrics() 结束时汇总出 Whisper 实时率（RTF = 转写耗时 / 音频时长）、翻译 cues/s、编码 fps（编码帧数 / 墙钟时间），
+写入 cache/metrics/<运行 ID>_<任务>_<视频名>.json（同一进程内同一任务的各阶段合并在一个文件里）。
+运行 ID 由进程启动时间和随机后缀组成，任务编号（video-1、job-1…）每次运行都会重新开始，不会覆盖以前的记录；
+JSON 中记录每个阶段处理的输入文件。
+设置环境变量 VIDSUBFLOW_PROMETHEUS_DIR 时，另外按阶段写出 vidsubflow_<阶段>.prom，
+供 node_exporter 的 textfile collector 采集。没有 job_metrics() 包裹时 span() 不做任何记录。
+"""
+import os
+import json
+import time
+import uuid
+import threading
+import contextlib
+
+METRICS_DIR = os.path.join("cache", "metrics")
+PROMETHEUS_DIR = os.environ.get("VIDSUBFLOW_PROMETHEUS_DIR")
+# 本进程的运行 ID：指标文件名的前缀
+RUN_ID = time.strftime("%Y%m%d-%H%M%S") + "-" + uuid.uuid4().hex[:6]
+
+_local = threading.local()
+_file_lock = threading.Lock()
+
+
+class JobRecorder:
+    """一个任务在一个阶段内的所有 span；线程安全（并行编码的各段会同时写入）"""
+
+    def __init__(self, job, stage, source=None):
+        self.job = job
+        self.stage = stage
+        self.source = source
+        self.spans = []
+        self.lock = threading.Lock()
+        self.started = time.time()
+
+    def add(self, name, start, seconds, attrs):
+        with self.lock:
+            self.spans.append({"name": name, "start": round(start, 3), "seconds": round(seconds, 4), **attrs})
+
+    def totals(self):
+        """按 span 名称汇总：{名称: {"count", "seconds", 以及数值属性之和}}"""
+        totals = {}
+        with self.lock:
+            spans = list(self.spans)
+        for s in spans:
+            total = totals.setdefault(s["name"], {"count": 0, "seconds": 0.0})
+            total["count"] += 1
+            for key, value in s.items():
+                if key in ("name", "start") or isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                total[key] = total.get(key, 0) + value
+        return totals
+
+    def summary(self):
+        totals = self.totals()
+        derived = {}
+        transcribe = totals.get("whisper.transcribe")
+        if transcribe and transcribe.get("audio_seconds"):
+            derived["whisper_rtf"] = round(transcribe["seconds"] / transcribe["audio_seconds"], 4)
+        generate = totals.get("marian.generate")
+        if generate and generate["seconds"] and generate.get("cues"):
+            derived["translate_cues_per_s"] = round(generate["cues"] / generate["seconds"], 2)
+        # 编码帧率按墙钟时间计算：分段并行时同时运行的各段只算一次，得到整体吞吐量
+        with self.lock:
+            encodes = [s for s in self.spans if s["name"] == "ffmpeg" and s.get("frames")]
+        wall = wall_seconds(encodes)
+        if wall:
+            derived["encode_fps"] = round(sum(s["frames"] for s in encodes) / wall, 2)
+        return {
+            "input": self.source,
+            "started": round(self.started, 3),
+            "seconds": round(time.time() - self.started, 3),
+            "totals": {name: {k: round(v, 4) if isinstance(v, float) else v for k, v in t.items()}
+                       for name, t in totals.items()},
+            "metrics": derived,
+            "spans": self.spans,
+        }
+
+
+def wall_seconds(spans):
+    """多个 span 覆盖的墙钟时间（秒），重叠部分只算一次"""
+    total = 0.0
+    covered_until = None
+    for start, end in sorted((s["start"], s["start"] + s["seconds"]) for s in spans):
+        if covered_until is None or start > covered_until:
+            total += end - start
+            covered_until = end
+        elif end > covered_until:
+            total += end - covered_until
+            covered_until = end
+    return total
+
+
+def current_recorder():
+    return getattr(_local, "recorder", None)
+
+
+@contextlib.contextmanager
+def bind(recorder):
+    """在当前线程上启用 recorder（线程池中的任务用它接上提交方的任务）"""
+    previous = current_recorder()
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = previous
+
+
+def wrap(func):
+    """把 func 绑定到调用 wrap() 时的 recorder，返回可交给线程池执行的函数"""
+    recorder = current_recorder()
+
+    def wrapped(*args, **kwargs):
+        with bind(recorder):
+            return func(*args, **kwargs)
+    return wrapped
+
+
+@contextlib.contextmanager
+def span(name, **attrs):
+    """记录一段耗时；yield 出的 dict 可以在结束前补充属性。出错时同样记录，并标记 error"""
+    recorder = current_recorder()
+    wall = time.time()
+    start = time.perf_counter()
+    try:
+        yield attrs
+    except BaseException:
+        attrs["error"] = True
+        raise
+    finally:
+        if recorder is not None:
+            recorder.add(name, wall, time.perf_counter() - start, attrs)
+
+
+@contextlib.contextmanager
+def job_metrics(job, stage, source=None, metrics_dir=None, prometheus_dir=None):
+    """为一个任务的一个阶段收集 span，结束时写出 JSON（以及可选的 Prometheus 文本文件）。
+    source 为本阶段处理的输入文件（视频、字幕或视频名），写入 JSON 并用于文件名。
+    已处在同一任务、同一阶段的 job_metrics() 中时直接复用外层的记录"""
+    outer = current_recorder()
+    if outer is not None and outer.job == job and outer.stage == stage:
+        yield outer
+        return
+    recorder = JobRecorder(job, stage, source)
+    try:
+        with bind(recorder):
+            yield recorder
+    finally:
+        # 这个进程没有实际执行本阶段（例如只是转交给工作进程）时不写，以免覆盖工作进程的记录
+        if recorder.spans:
+            try:
+                summary = recorder.summary()
+                write_job_json(job, stage, summary, metrics_dir or METRICS_DIR, source=source)
+                prometheus_dir = prometheus_dir or PROMETHEUS_DIR
+                if prometheus_dir:
+                    write_prometheus(job, stage, summary, prometheus_dir)
+            except OSError as e:
+                print(f"写出指标失败: {e}", flush=True)
+
+
+def safe_name(job):
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in str(job)) or "job"
+
+
+def metrics_file_name(job, source=None, run_id=None):
+    """<运行 ID>_<任务>_<视频名>.json；视频名取输入文件名去掉扩展名，与任务名相同时省略"""
+    parts = [run_id or RUN_ID, safe_name(job)]
+    if source:
+        stem = safe_name(os.path.splitext(os.path.basename(str(source)))[0])
+        if stem != parts[-1]:
+            parts.append(stem)
+    return "_".join(parts) + ".json"
+
+
+def write_job_json(job, stage, summary, metrics_dir=METRICS_DIR, source=None):
+    """合并写入 <metrics_dir>/<运行 ID>_<任务>_<视频名>.json 的 stages[stage]；先写临时文件再替换"""
+    os.makedirs(metrics_dir, exist_ok=True)
+    path = os.path.join(metrics_dir, metrics_file_name(job, source))
+    with _file_lock:
+        data = {"job": job, "run": RUN_ID, "stages": {}}
+        if os.path.exists(path):
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except ValueError:
+                pass
+        data.setdefault("stages", {})[stage] = summary
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(data, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, path)
+    return path
+
+
+def prometheus_label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_prometheus(job, stage, summary):
+    labels = f'job_id="{prometheus_label(job)}",stage="{prometheus_label(stage)}"'
+    lines = [
+        "# HELP vidsubflow_stage_seconds 阶段总耗时（秒）",
+        "# TYPE vidsubflow_stage_seconds gauge",
+        f"vidsubflow_stage_seconds{{{labels}}} {summary['seconds']}",
+        "# HELP vidsubflow_span_seconds 各类 span 的累计耗时（秒）",
+        "# TYPE vidsubflow_span_seconds gauge",
+    ]
+    for name, total in sorted(summary["totals"].items()):
+        lines.append(f'vidsubflow_span_seconds{{{labels},span="{prometheus_label(name)}"}} {total["seconds"]}')
+    for key, value in sorted(summary["metrics"].items()):
+        lines += [f"# TYPE vidsubflow_{key} gauge", f"vidsubflow_{key}{{{labels}}} {value}"]
+    lines += ["# TYPE vidsubflow_last_run_timestamp_seconds gauge",
+              f"vidsubflow_last_run_timestamp_seconds{{{labels}}} {summary['started']}"]
+    return "\n".join(lines) + "\n"
+
+
+def write_prometheus(job, stage, summary, prometheus_dir):
+    """每个阶段一个文件，只保留最近一个任务（避免标签无限增长）；textfile collector 要求原子替换"""
+    os.makedirs(prometheus_dir, exist_ok=True)
+    path = os.path.join(prometheus_dir, f"vidsubflow_{safe_name(stage)}.prom")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(format_prometheus(job, stage, summary))
+    os.replace(tmp, path)
+    return path
@@ -0,0 +1,86 @@
+"""长视频多核并行转写：在静音处把音频切成约 N 分钟的块，进程池中每个进程各自持有一个 WhisperModel
+并按线程预算转写，最后把单词时间戳加上块偏移合并回全局时间轴。
+"""
+import os
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from audio_cache import SAMPLE_RATE
+
+SILENCE_SEARCH_SECONDS = 20.0   # 在目标切点前后多少秒内找静音
+SILENCE_FRAME_SECONDS = 0.05
+
+Word = namedtuple("Word", ["start", "end", "word"])
+
+_worker_model = None
+
+
+def find_chunk_bounds(audio, chunk_seconds, search_seconds=SILENCE_SEARCH_SECONDS,
+                      frame_seconds=SILENCE_FRAME_SECONDS):
+    """返回 [(起始采样, 结束采样), ...]，切点取目标位置附近能量最低的帧"""
+    total = len(audio)
+    chunk = int(chunk_seconds * SAMPLE_RATE)
+    search = int(search_seconds * SAMPLE_RATE)
+    frame = max(1, int(frame_seconds * SAMPLE_RATE))
+    points = [0]
+    target = chunk
+    # 最后一块不足 1/4 块长时并入前一块
+    while target < total - chunk // 4:
+        lo = max(points[-1] + frame, target - search)
+        hi = min(total, target + search)
+        n_frames = (hi - lo) // frame
+        if n_frames <= 0:
+            break
+        window = np.asarray(audio[lo:lo + n_frames * frame], dtype=np.float32).reshape(n_frames, frame)
+        energy = np.square(window).mean(axis=1)
+        cut = lo + int(np.argmin(energy)) * frame + frame // 2
+        points.append(cut)
+        target = cut + chunk
+    points.append(total)
+    return list(zip(points[:-1], points[1:]))
+
+
+def _init_worker(model_size, device, compute_type, cpu_threads):
+    global _worker_model
+    from faster_whisper import WhisperModel
+    _worker_model = WhisperModel(model_size, device=device, compute_type=compute_type,
+                                 cpu_threads=cpu_threads, num_workers=1)
+
+
+def _transcribe_chunk(audio_path, start, end):
+    audio = np.memmap(audio_path, dtype=np.float32, mode="c")[start:end]
+    segments, _ = _worker_model.transcribe(audio, word_timestamps=True)
+    offset = start / SAMPLE_RATE
+    return [(w.start + offset, w.end + offset, w.word)
+            for seg in segments if seg.words for w in seg.words]
+
+
+class ParallelTranscriber:
+    """常驻进程池；每个进程加载一次模型，可重复用于多个视频"""
+
+    def __init__(self, model_size, device="cpu", compute_type="default", workers=None):
+        cpu_count = os.cpu_count() or 1
+        self.workers = workers or max(1, cpu_count // 4)
+        cpu_threads = max(1, cpu_count // self.workers)
+        self.executor = ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+            initargs=(model_size, device, compute_type, cpu_threads),
+        )
+
+    def transcribe(self, audio_path, chunk_minutes):
+        """按时间顺序逐个产出全局时间轴上的 Word；前面的块转写完即可开始下游切分"""
+        if os.path.getsize(audio_path) == 0:
+            return
+        audio = np.memmap(audio_path, dtype=np.float32, mode="r")
+        bounds = find_chunk_bounds(audio, chunk_minutes * 60)
+        del audio
+        futures = [self.executor.submit(_transcribe_chunk, audio_path, start, end) for start, end in bounds]
+        for future in futures:
+            for start, end, word in future.result():
+                yield Word(start, end, word)
+
+    def close(self):
+        self.executor.shutdown(cancel_futures=True)
@@ -0,0 +1,133 @@
+"""按视频流水线调度：每个视频依次经过 下载 → 转写 → 翻译 → 融合，
+阶段之间用有界队列连接，每个阶段可以配置并发数，不同视频可以同时处于不同阶段。
+"""
+import queue
+import threading
+
+from events import make_event, ProgressTracker
+from metrics import job_metrics
+
+_STOP = object()
+
+
+class Stage:
+    """流水线阶段。
+
+    func(job, progress_callback, log_callback) 处理一个任务（job 为 dict，可写入下游需要的字段），失败时抛异常。
+    progress_callback(percent, done=None, unit=None) 中 done/unit 为已处理量（如音频秒数、字幕条数、帧数），用于计算吞吐量。
+    per_worker=True 时 func(log_callback) 是工厂函数，每个工作线程调用一次得到自己的处理函数
+    （例如各自持有一个常驻模型进程），处理函数若有 close() 会在线程退出时调用。
+    """
+
+    def __init__(self, name, func, concurrency=1, per_worker=False):
+        self.name = name
+        self.func = func
+        self.concurrency = max(1, int(concurrency))
+        self.per_worker = per_worker
+
+
+class Pipeline:
+    def __init__(self, stages, queue_size=2, event_callback=None):
+        self.stages = stages
+        self.queue_size = queue_size
+        self.event_callback = event_callback
+        self.cancelled = threading.Event()
+        self.results = {}
+        self.lock = threading.Lock()
+
+    def emit(self, event, stage=None, job=None, **fields):
+        if self.event_callback:
+            self.event_callback(make_event(event, stage, job, **fields))
+
+    def cancel(self):
+        """不再启动新的任务；正在执行的任务会执行完"""
+        self.cancelled.set()
+
+    def run(self, jobs):
+        """阻塞直到所有任务走完流水线，返回 {job_id: "done" / "failed:<阶段>" / "cancelled"}"""
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in self.stages]
+        remaining = [stage.concurrency for stage in self.stages]
+        threads = []
+
+        for index, stage in enumerate(self.stages):
+            for n in range(stage.concurrency):
+                t = threading.Thread(target=self._stage_worker, args=(index, queues, remaining),
+                                     name=f"{stage.name}-{n}", daemon=True)
+                t.start()
+                threads.append(t)
+
+        for job in jobs:
+            self.results[job["id"]] = "pending"
+            if self.cancelled.is_set():
+                self.results[job["id"]] = "cancelled"
+                continue
+            queues[0].put(job)
+        for _ in range(self.stages[0].concurrency):
+            queues[0].put(_STOP)
+
+        for t in threads:
+            t.join()
+        return dict(self.results)
+
+    def _stage_worker(self, index, queues, remaining):
+        stage = self.stages[index]
+        handler = stage.func
+        setup_error = None
+        if stage.per_worker:
+            try:
+                handler = stage.func(
+                    lambda message: self.emit("log", stage.name, None, level="info", message=message))
+            except Exception as e:
+                # 初始化失败时继续消费队列并把任务标记为失败，避免上游阻塞
+                handler = None
+                setup_error = e
+        try:
+            while True:
+                job = queues[index].get()
+                if job is _STOP:
+                    break
+                if self.cancelled.is_set():
+                    self.results[job["id"]] = "cancelled"
+                    continue
+                if setup_error is not None:
+                    self.results[job["id"]] = f"failed:{stage.name}"
+                    self.emit("error", stage.name, job["id"], level="error", message=str(setup_error))
+                    continue
+                if self._run_job(stage, handler, job) and index + 1 < len(self.stages):
+                    queues[index + 1].put(job)
+        finally:
+            if stage.per_worker and handler is not None and hasattr(handler, "close"):
+                handler.close()
+            with self.lock:
+                remaining[index] -= 1
+                last_worker = remaining[index] == 0
+            # 本阶段最后一个线程退出时通知下游阶段结束
+            if last_worker and index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1].concurrency):
+                    queues[index + 1].put(_STOP)
+
+    def _run_job(self, stage, handler, job):
+        job_id = job["id"]
+        tracker = ProgressTracker(stage.name, job_id)
+
+        def progress_callback(percent, done=None, unit=None):
+            event = tracker.update(percent, done=done, unit=unit)
+            if event and self.event_callback:
+                self.event_callback(event)
+
+        def log_callback(message, level="info"):
+            self.emit("log", stage.name, job_id, level=level, message=message)
+
+        self.emit("start", stage.name, job_id)
+        try:
+            source = job.get("video_path") or job.get("input") or job.get("url")
+            with job_metrics(job_id, stage.name, source=source):
+                handler(job, progress_callback, log_callback)
+        except Exception as e:
+            self.results[job_id] = f"failed:{stage.name}"
+            self.emit("error", stage.name, job_id, level="error", message=str(e))
+            return False
+        self.emit("done", stage.name, job_id)
+        if stage is self.stages[-1]:
+            self.results[job_id] = "done"
+        return True
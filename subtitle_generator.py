@@ -1,138 +1,341 @@
 import sys
 import os
-import nltk
-from faster_whisper import WhisperModel
 from datetime import timedelta
+import numpy as np
 import srt
-import ffmpeg
+from audio_cache import load_audio, audio_duration, audio_cache_paths
+from artifacts import get_manifest
+from events import progress_printer
+from metrics import span, job_metrics
 
-if len(sys.argv) < 2:
-    print("请提供视频文件路径")
-    sys.exit(1)
+DEFAULT_MODEL_SIZE = "small.en"
+DEFAULT_DEVICE = "cpu"
+DEFAULT_COMPUTE_TYPE = "default"
+DEFAULT_CHUNK_MINUTES = 10
+OUTPUT_DIR = "outsrt"
 
-video_path = sys.argv[1]
+sentence_end_punctuations = {'.', '?', '!', '。', '？', '！', ',', ';', ':', '，', '；', '：'}
+force_break_punctuations = {'.', '?', '!', '。', '？', '！', ';', ':', '；', '：'}  # 非逗号的强制断句标点
 
-if not os.path.exists(video_path):
-    print(f"视频文件不存在: {video_path}")
-    sys.exit(1)
+# 断句参数（同时作为产物清单的参数，修改后已有字幕会重新生成）
+LONG_SENTENCE_WORDS = 10      # 超过该词数遇到任意标点即断句
+MAX_CUE_WORDS = 16            # 超过该词数再按最长停顿切分
+PAUSE_SPLIT_RANGE = (10, 30)  # 按停顿切分时的取值范围
+TAIL_SPLIT_RANGE = (6, 20)    # 结尾剩余单词的切分范围
 
-nltk.download('punkt', quiet=True)
 
-output_dir = "outsrt"
-os.makedirs(output_dir, exist_ok=True)
+def load_model(model_size=DEFAULT_MODEL_SIZE, device=DEFAULT_DEVICE, compute_type=DEFAULT_COMPUTE_TYPE):
+    # faster_whisper（及其依赖的 ctranslate2、onnxruntime）只在真正需要转写时导入
+    from faster_whisper import WhisperModel
+    with span("whisper.load", model=model_size, device=device, compute_type=compute_type):
+        return WhisperModel(model_size, device=device, compute_type=compute_type)
 
-video_name = os.path.splitext(os.path.basename(video_path))[0]
-output_srt = os.path.join(output_dir, f"{video_name}.srt")
+def clean_text(text):
+    return " ".join(text.split())
 
-# 获取视频时长
-probe = ffmpeg.probe(video_path)
-total_duration = float(probe["format"]["duration"])
+# 单词的标点类别：无标点 / 逗号类（只在长句中断开）/ 强制断句标点
+PUNCT_NONE, PUNCT_SOFT, PUNCT_BREAK = 0, 1, 2
 
-# 加载模型
-model = WhisperModel("small.en", device="cpu")
-segments, info = model.transcribe(video_path, word_timestamps=True)
+def punctuation_class(word):
+    if not word:
+        return PUNCT_NONE
+    if word[-1] in force_break_punctuations:
+        return PUNCT_BREAK
+    if word[-1] in sentence_end_punctuations:
+        return PUNCT_SOFT
+    return PUNCT_NONE
 
-sentence_end_punctuations = {'.', '?', '!', '。', '？', '！', ',', ';', ':', '，', '；', '：'}
-force_break_punctuations = {'.', '?', '!', '。', '？', '！', ';', ':', '；', '：'}  # 非逗号的强制断句标点
-subs = []
+class WordTimeline:
+    """列式单词时间轴：start/end 为 float64 数组，punct 为标点类别，
+    规整后的单词文本以空格分隔存放在同一个 UTF-8 缓冲区中，text_start/text_end 为每个词的字节偏移。
+    字幕文本直接从缓冲区切片得到；时间轴可保存为 .npz，修改断句参数后无需重新转写。"""
+
+    COLUMNS = (("start", np.float64), ("end", np.float64), ("punct", np.int8),
+               ("text_start", np.int64), ("text_end", np.int64))
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.empty(capacity, dtype=dtype))
+        self.text = bytearray()
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self):
+        capacity = max(1024, len(self.start) * 2)
+        for name, dtype in self.COLUMNS:
+            column = np.empty(capacity, dtype=dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+    def append(self, word, start, end):
+        if self.size == len(self.start):
+            self._grow()
+        i = self.size
+        text = " ".join(word.split()).encode("utf-8")
+        if text and self.text:
+            self.text += b" "
+        self.text_start[i] = len(self.text)
+        self.text += text
+        self.text_end[i] = len(self.text)
+        self.start[i] = start
+        self.end[i] = end
+        self.punct[i] = punctuation_class(word)
+        self.size += 1
+
+    @classmethod
+    def from_words(cls, words):
+        timeline = cls()
+        for w in words:
+            timeline.append(w.word, w.start, w.end)
+        return timeline
+
+    def slice_text(self, start, end):
+        """words[start:end] 的文本（等价于空格连接后规整空白）"""
+        return self.text[self.text_start[start]:self.text_end[end - 1]].decode("utf-8").strip()
+
+    def max_pause_split(self, start, window, min_len):
+        """在 [start + min_len, start + window) 内找最长停顿，返回相对 start 的切分位置；没有正停顿时返回 min_len"""
+        lo, hi = start + min_len - 1, start + window - 1
+        if hi <= lo:
+            return min_len
+        gaps = self.start[lo + 1:hi + 1] - self.end[lo:hi]
+        k = int(np.argmax(gaps))
+        if gaps[k] <= 0:
+            return min_len
+        return lo + k + 1 - start
+
+    def save(self, path):
+        n = self.size
+        np.savez(path, start=self.start[:n], end=self.end[:n], punct=self.punct[:n],
+                 text_start=self.text_start[:n], text_end=self.text_end[:n],
+                 text=np.frombuffer(bytes(self.text), dtype=np.uint8))
+
+    @classmethod
+    def load(cls, path):
+        timeline = cls(capacity=0)
+        with np.load(path) as data:
+            for name, dtype in cls.COLUMNS:
+                setattr(timeline, name, data[name].astype(dtype))
+            timeline.text = bytearray(data["text"].tobytes())
+        timeline.size = len(timeline.start)
+        return timeline
+
+class Segmenter:
+    """增量断句：单词追加到 WordTimeline 后按下标处理，字幕条目一旦闭合立即返回；每个单词均摊 O(1)。
+
+    规则：当前句超过 10 个单词且出现过任意标点时，在最近的标点处断开；
+    不足 10 个单词时遇到非逗号标点也断开；超过 16 个单词的句子再按最长停顿切分。
+    """
+
+    def __init__(self, start_index=1, timeline=None):
+        self.timeline = timeline if timeline is not None else WordTimeline()
+        self.begin = 0            # 尚未闭合的第一个单词
+        self.last_punct = -1      # 尚未闭合部分中最近一个标点词的下标
+        self.index = start_index
+
+    def feed(self, w):
+        self.timeline.append(w.word, w.start, w.end)
+        return self.advance(len(self.timeline) - 1, punctuation_class(w.word))
+
+    def advance(self, i, punct):
+        """处理时间轴中的第 i 个单词，punct 为其标点类别"""
+        if punct != PUNCT_NONE:
+            self.last_punct = i
+        n = i + 1
+
+        # 1. 长句 >10 个单词并遇到任意标点断句
+        if n - self.begin > LONG_SENTENCE_WORDS and self.last_punct != -1:
+            cut = self.last_punct + 1
+            cues = self._emit(self.begin, cut, *PAUSE_SPLIT_RANGE)
+            # 剩余单词都在最近标点之后（最多 10 个），其中不会再有标点
+            self.begin = cut
+            self.last_punct = -1
+            return cues
+
+        # 2. 即使不足 10 个单词，只要出现非逗号标点也断句
+        if punct == PUNCT_BREAK:
+            cues = self._emit(self.begin, n, *PAUSE_SPLIT_RANGE)
+            self.begin = n
+            self.last_punct = -1
+            return cues
+        return []
+
+    def finish(self):
+        """处理剩余未切割的单词"""
+        n = len(self.timeline)
+        cues = self._emit(self.begin, n, *TAIL_SPLIT_RANGE) if n > self.begin else []
+        self.begin = n
+        self.last_punct = -1
+        return cues
+
+    def _emit(self, start, end, min_len, max_len):
+        """words[start:end] 超过 16 个单词时反复在最长停顿处切出前半段"""
+        cues = []
+        while end - start > MAX_CUE_WORDS:
+            split = start + self.timeline.max_pause_split(start, min(end - start, max_len), min_len)
+            cues.append(self._make_cue(start, split))
+            start = split
+        cues.append(self._make_cue(start, end))
+        return cues
+
+    def _make_cue(self, start, end):
+        timeline = self.timeline
+        cue = srt.Subtitle(index=self.index, start=timedelta(seconds=float(timeline.start[start])),
+                           end=timedelta(seconds=float(timeline.end[end - 1])),
+                           content=timeline.slice_text(start, end))
+        self.index += 1
+        return cue
+
+def segment_timeline(timeline):
+    """对已有的单词时间轴重新断句（不需要重新转写）"""
+    segmenter = Segmenter(timeline=timeline)
+    # 一次转成 Python 列表，避免逐个读取 numpy 标量
+    for i, punct in enumerate(timeline.punct[:len(timeline)].tolist()):
+        yield from segmenter.advance(i, punct)
+    yield from segmenter.finish()
+
+def iter_words(segments):
+    for seg in segments:
+        if seg.words:
+            yield from seg.words
+
+def segment_words(words, total_duration=None, progress_callback=None, timeline=None):
+    """按标点和停顿把单词流（全局时间轴）切分成字幕条目，条目闭合即产出；单词同时追加到 timeline"""
+    segmenter = Segmenter(timeline=timeline)
+    current_progress = 0.0
+    for w in words:
+        yield from segmenter.feed(w)
+
+        # 输出进度
+        if w.end > current_progress:
+            current_progress = w.end
+            if progress_callback and total_duration:
+                progress_callback(current_progress / total_duration * 100, done=current_progress, unit="audio_s")
+    yield from segmenter.finish()
+
+def write_cues(cues, output_srt):
+    """边切分边追加写入 SRT，中途崩溃或取消也能留下已完成的字幕"""
+    count = 0
+    with open(output_srt, "w", encoding="utf-8") as f:
+        for sub in cues:
+            f.write(sub.to_srt())
+            f.flush()
+            count += 1
+    return count
+
+def write_subtitles(words, output_srt, total_duration=None, progress_callback=None, timeline=None):
+    return write_cues(segment_words(words, total_duration, progress_callback=progress_callback, timeline=timeline),
+                      output_srt)
+
+def transcribe_params(model_size, compute_type, parallel, chunk_minutes):
+    params = {
+        "model": model_size,
+        "compute_type": compute_type,
+        "segmentation": [LONG_SENTENCE_WORDS, MAX_CUE_WORDS, list(PAUSE_SPLIT_RANGE), list(TAIL_SPLIT_RANGE)],
+    }
+    if parallel:
+        params["chunk_minutes"] = chunk_minutes
+    return params
+
+def generate_subtitles(video_path, model=None, output_dir=OUTPUT_DIR, progress_callback=None,
+                       workers=1, chunk_minutes=DEFAULT_CHUNK_MINUTES, transcriber=None,
+                       model_size=DEFAULT_MODEL_SIZE, device=DEFAULT_DEVICE, compute_type=DEFAULT_COMPUTE_TYPE,
+                       force=False):
+    """转写视频并生成 outsrt/<视频名>.srt，返回字幕路径；传入已加载的 model 可避免重复加载。
+    workers > 1（或传入 transcriber）时在静音处分块，用进程池并行转写。
+    视频内容和参数都没变时直接返回已有字幕（force=True 强制重新生成）；
+    只有断句参数变化时从 outsrt/<视频名>.words.npz 的单词时间轴重新断句，不再转写。"""
+    if not os.path.exists(video_path):
+        raise FileNotFoundError(f"视频文件不存在: {video_path}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    video_name = os.path.splitext(os.path.basename(video_path))[0]
+    output_srt = os.path.join(output_dir, f"{video_name}.srt")
+    words_path = os.path.join(output_dir, f"{video_name}.words.npz")
+
+    parallel = transcriber is not None or workers > 1
+    manifest = get_manifest()
+    params = transcribe_params(model_size, compute_type, parallel, chunk_minutes)
+    if not force and manifest.is_up_to_date("transcribe", output_srt, [video_path], params):
+        print(f"字幕已是最新，跳过转写: {output_srt}")
+        if progress_callback:
+            progress_callback(100)
+        return output_srt
+
+    words_params = {k: v for k, v in params.items() if k != "segmentation"}
+    if not force and manifest.is_up_to_date("words", words_path, [video_path], words_params):
+        print(f"单词时间轴已是最新，只重新断句: {words_path}")
+        with span("segment") as attrs:
+            timeline = WordTimeline.load(words_path)
+            attrs.update(words=len(timeline), cues=write_cues(segment_timeline(timeline), output_srt))
+        manifest.record("transcribe", output_srt, [video_path], params)
+        if progress_callback:
+            progress_callback(100)
+        return output_srt
+
+    # 音频只解码一次并缓存为 16kHz PCM，之后直接内存映射
+    audio = load_audio(video_path, log_callback=print)
+    total_duration = audio_duration(audio)
+    timeline = WordTimeline()
+
+    if parallel:
+        from parallel_transcribe import ParallelTranscriber
+        own_transcriber = transcriber is None
+        if own_transcriber:
+            transcriber = ParallelTranscriber(model_size, device=device, compute_type=compute_type, workers=workers)
+        try:
+            audio_path, _ = audio_cache_paths(video_path)
+            # 转写是惰性的，耗时包含边转写边断句写出的全过程
+            with span("whisper.transcribe", audio_seconds=total_duration, workers=transcriber.workers) as attrs:
+                words = transcriber.transcribe(audio_path, chunk_minutes=chunk_minutes)
+                attrs["cues"] = write_subtitles(words, output_srt, total_duration,
+                                                progress_callback=progress_callback, timeline=timeline)
+        finally:
+            if own_transcriber:
+                transcriber.close()
+    else:
+        if model is None:
+            model = load_model(model_size, device=device, compute_type=compute_type)
+        with span("whisper.transcribe", audio_seconds=total_duration) as attrs:
+            segments, info = model.transcribe(audio, word_timestamps=True)
+            attrs["cues"] = write_subtitles(iter_words(segments), output_srt, total_duration,
+                                            progress_callback=progress_callback, timeline=timeline)
+    timeline.save(words_path)
+    manifest.record("words", words_path, [video_path], words_params)
+    manifest.record("transcribe", output_srt, [video_path], params)
+    return output_srt
+
+def main(argv=None):
+    import argparse
+    parser = argparse.ArgumentParser(description="生成视频字幕")
+    parser.add_argument("video_path", nargs="?")
+    parser.add_argument("--model", default=DEFAULT_MODEL_SIZE, help="Whisper 模型大小，例如 small.en / medium.en")
+    parser.add_argument("--device", default=DEFAULT_DEVICE)
+    parser.add_argument("--compute-type", default=DEFAULT_COMPUTE_TYPE, help="例如 int8 / float16 / float32")
+    parser.add_argument("--workers", type=int, default=1, help="并行转写进程数，>1 时按静音分块并行")
+    parser.add_argument("--chunk-minutes", type=float, default=DEFAULT_CHUNK_MINUTES, help="并行转写时每块的大致分钟数")
+    parser.add_argument("--force", action="store_true", help="忽略产物清单，强制重新生成")
+    args = parser.parse_args(argv)
+
+    if not args.video_path:
+        print("请提供视频文件路径")
+        sys.exit(1)
+
+    if not os.path.exists(args.video_path):
+        print(f"视频文件不存在: {args.video_path}")
+        sys.exit(1)
+
+    # 模型在确认需要转写后才加载
+    video_name = os.path.splitext(os.path.basename(args.video_path))[0]
+    with job_metrics(video_name, "transcribe", source=args.video_path):
+        output_srt = generate_subtitles(args.video_path, progress_callback=progress_printer("transcribe"),
+                                        workers=args.workers, chunk_minutes=args.chunk_minutes,
+                                        model_size=args.model, device=args.device,
+                                        compute_type=args.compute_type, force=args.force)
+    print(f"字幕生成完成: {output_srt}")
 
-def clean_text(text):
-    return " ".join(text.split())
 
-def create_subtitle_chunk(words_chunk):
-    start = words_chunk[0].start
-    end = words_chunk[-1].end
-    start_td = timedelta(seconds=start)
-    end_td = timedelta(seconds=end)
-    text = clean_text(" ".join(w.word for w in words_chunk))
-    return srt.Subtitle(index=len(subs) + 1, start=start_td, end=end_td, content=text)
-
-def split_chunk_by_max_pause(chunk_words, min_len=10, max_len=30):
-    """根据最长停顿切分 chunk_words，只有单词数 >16 时才执行"""
-    if len(chunk_words) <= 16:
-        return [chunk_words]
-
-    end_index = min(len(chunk_words), max_len)
-    max_gap = 0
-    split_idx = min_len
-    for i in range(min_len - 1, end_index - 1):
-        gap = chunk_words[i+1].start - chunk_words[i].end
-        if gap > max_gap:
-            max_gap = gap
-            split_idx = i+1
-    first_part = chunk_words[:split_idx]
-    second_part = chunk_words[split_idx:]
-    return [first_part, second_part]
-
-chunk_words = []
-last_punct_index = -1
-current_progress = 0.0
-
-for seg in segments:
-    if seg.words:
-        for w in seg.words:
-            chunk_words.append(w)
-
-            # 记录最近标点位置
-            if w.word and w.word[-1] in sentence_end_punctuations:
-                last_punct_index = len(chunk_words) - 1
-
-            # 1. 长句 >10 个单词并遇到任意标点断句
-            if len(chunk_words) > 10 and last_punct_index != -1:
-                first_chunk = chunk_words[:last_punct_index + 1]
-                rest_chunk = chunk_words[last_punct_index + 1:]
-                # 对前半部分按最长停顿切分
-                chunks_to_process = [first_chunk]
-                while chunks_to_process:
-                    cw = chunks_to_process.pop(0)
-                    parts = split_chunk_by_max_pause(cw, min_len=10, max_len=30)
-                    if len(parts) == 1:
-                        subs.append(create_subtitle_chunk(parts[0]))
-                    else:
-                        subs.append(create_subtitle_chunk(parts[0]))
-                        chunks_to_process.insert(0, parts[1])
-                chunk_words = rest_chunk
-                last_punct_index = -1
-                # 更新剩余 chunk 中的标点位置
-                for i, cw in enumerate(chunk_words):
-                    if cw.word and cw.word[-1] in sentence_end_punctuations:
-                        last_punct_index = i
-
-            # 2. 即使不足 10 个单词，只要出现非逗号标点也断句
-            elif w.word and w.word[-1] in force_break_punctuations:
-                chunks_to_process = [chunk_words]
-                while chunks_to_process:
-                    cw = chunks_to_process.pop(0)
-                    parts = split_chunk_by_max_pause(cw, min_len=10, max_len=30)
-                    if len(parts) == 1:
-                        subs.append(create_subtitle_chunk(parts[0]))
-                    else:
-                        subs.append(create_subtitle_chunk(parts[0]))
-                        chunks_to_process.insert(0, parts[1])
-                chunk_words = []
-                last_punct_index = -1
-
-            # 输出进度
-            progress = w.end
-            if progress > current_progress:
-                current_progress = progress
-                percent = (current_progress / total_duration) * 100
-                print(f"PROGRESS: {percent:.2f}")
-                sys.stdout.flush()
-
-# 处理剩余未切割的单词
-if chunk_words:
-    chunks_to_process = [chunk_words]
-    while chunks_to_process:
-        cw = chunks_to_process.pop(0)
-        parts = split_chunk_by_max_pause(cw, min_len=6, max_len=20)
-        if len(parts) == 1:
-            subs.append(create_subtitle_chunk(parts[0]))
-        else:
-            subs.append(create_subtitle_chunk(parts[0]))
-            chunks_to_process.insert(0, parts[1])
-
-with open(output_srt, "w", encoding="utf-8") as f:
-    f.write(srt.compose(subs))
-
-print(f"字幕生成完成: {output_srt}")
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,180 @@
+"""流式字幕读写：逐条解析 SRT、拆分 / 合并双语字幕、直接写出带样式的 ASS。
+
+所有函数都按条目流式处理，内存占用与字幕文件大小无关。
+时间统一用整数毫秒表示；解析兼容 CRLF、BOM、多行字幕和缺少序号或空行的条目。
+"""
+import os
+import re
+from collections import namedtuple
+
+# start / end 为毫秒，text 为多行文本（以 \n 连接）
+Cue = namedtuple("Cue", "index start end text")
+
+TIMESTAMP_RE = re.compile(
+    r"(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})\s*-->\s*(\d+):(\d{1,2}):(\d{1,2})[,.](\d{1,3})")
+# 中日韩文字与全角标点（含 。、「」 等 CJK 标点）
+CJK_RE = re.compile(r"[\u3000-\u303f\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff\uff01-\uff60]")
+
+# 与 ffmpeg 把 SRT 转成 ASS 时的默认画布一致，字号与 subtitles 滤镜 force_style 的效果相同
+ASS_PLAY_RES = (384, 288)
+ASS_STYLE_FORMAT = ("Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, "
+                    "Bold, Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, "
+                    "Shadow, Alignment, MarginL, MarginR, MarginV, Encoding")
+
+
+def _to_ms(h, m, s, ms):
+    return ((int(h) * 60 + int(m)) * 60 + int(s)) * 1000 + int(ms.ljust(3, "0"))
+
+
+def parse_cues(lines):
+    """从行迭代器中逐条解析 SRT 条目"""
+    pending_index = None
+    start = end = None
+    text = []
+    count = 0
+    for line in lines:
+        line = line.rstrip("\r\n").lstrip("\ufeff")
+        stripped = line.strip()
+        m = TIMESTAMP_RE.match(stripped)
+        if start is None:
+            if m:
+                start, end = _to_ms(*m.groups()[:4]), _to_ms(*m.groups()[4:])
+            elif stripped.isdigit():
+                pending_index = int(stripped)
+            continue
+        if m and text and text[-1].strip().isdigit():
+            # 缺少空行：上一行其实是下一条的序号
+            next_index = int(text.pop().strip())
+            count += 1
+            yield Cue(pending_index or count, start, end, "\n".join(text))
+            pending_index, text = next_index, []
+            start, end = _to_ms(*m.groups()[:4]), _to_ms(*m.groups()[4:])
+            continue
+        if not stripped:
+            count += 1
+            yield Cue(pending_index or count, start, end, "\n".join(text))
+            pending_index, start, end, text = None, None, None, []
+            continue
+        text.append(line)
+    if start is not None:
+        count += 1
+        yield Cue(pending_index or count, start, end, "\n".join(text))
+
+
+def iter_cues(path):
+    """逐条读取 SRT 文件（惰性，不整体载入内存）"""
+    with open(path, "r", encoding="utf-8-sig", newline=None) as f:
+        yield from parse_cues(f)
+
+
+def format_srt_time(ms):
+    h, ms = divmod(int(ms), 3600000)
+    m, ms = divmod(ms, 60000)
+    s, ms = divmod(ms, 1000)
+    return f"{h:02d}:{m:02d}:{s:02d},{ms:03d}"
+
+
+def format_cue(index, cue):
+    return f"{index}\n{format_srt_time(cue.start)} --> {format_srt_time(cue.end)}\n{cue.text}\n\n"
+
+
+def write_srt(cues, path):
+    """边读边写 SRT，序号从 1 重新编号；空文本的条目被跳过。返回写出的条数"""
+    count = 0
+    with open(path, "w", encoding="utf-8") as f:
+        for cue in cues:
+            if not cue.text.strip():
+                continue
+            count += 1
+            f.write(format_cue(count, cue))
+    return count
+
+
+def shift_cues(cues, start_ms, end_ms):
+    """截取与 [start_ms, end_ms) 相交的条目并平移到从 0 开始"""
+    for cue in cues:
+        if cue.end <= start_ms or cue.start >= end_ms:
+            continue
+        yield cue._replace(start=max(cue.start, start_ms) - start_ms, end=min(cue.end, end_ms) - start_ms)
+
+
+def split_cue_text(text):
+    """双语条目拆成 (原文, 译文)。翻译模块写出的格式是 原文在上、译文在最后一行，按位置拆分，
+    译文只有标点、数字或英文名时也不会分错；只有一行时按是否含中日韩字符判断"""
+    lines = [line for line in text.split("\n") if line.strip()]
+    if len(lines) >= 2:
+        return "\n".join(lines[:-1]), lines[-1]
+    if lines and CJK_RE.search(lines[0]):
+        return "", lines[0]
+    return "\n".join(lines), ""
+
+
+def split_bilingual(input_srt, output_srt_en, output_srt_cn):
+    """一次遍历把双语字幕拆成英文、中文两个文件（拆分规则见 split_cue_text）。返回 (英文条数, 中文条数)"""
+    en_count = cn_count = 0
+    with open(output_srt_en, "w", encoding="utf-8") as en_file, \
+            open(output_srt_cn, "w", encoding="utf-8") as cn_file:
+        for cue in iter_cues(input_srt):
+            en_text, cn_text = split_cue_text(cue.text)
+            if en_text:
+                en_count += 1
+                en_file.write(format_cue(en_count, cue._replace(text=en_text)))
+            if cn_text:
+                cn_count += 1
+                cn_file.write(format_cue(cn_count, cue._replace(text=cn_text)))
+    return en_count, cn_count
+
+
+def merge_bilingual(primary_srt, secondary_srt, output_srt):
+    """按条目顺序把两个单语字幕合并成双语字幕（时间轴取 primary），一次遍历。返回条数"""
+    def merged():
+        for first, second in zip(iter_cues(primary_srt), iter_cues(secondary_srt)):
+            yield first._replace(text=f"{first.text}\n{second.text}")
+    return write_srt(merged(), output_srt)
+
+
+def format_ass_time(ms):
+    cs = (int(ms) + 5) // 10
+    h, cs = divmod(cs, 360000)
+    m, cs = divmod(cs, 6000)
+    s, cs = divmod(cs, 100)
+    return f"{h}:{m:02d}:{s:02d}.{cs:02d}"
+
+
+def ass_color(color):
+    """subtitles 滤镜接受的 &HAABBGGRR 原样使用，其它颜色名按白色处理"""
+    return color if str(color).startswith("&H") else "&H00FFFFFF"
+
+
+def font_family(font_file):
+    """字体文件名近似字体族名，例如 Times_New_Roman.ttf -> Times New Roman"""
+    if not font_file:
+        return "Arial"
+    return os.path.splitext(os.path.basename(font_file))[0].replace("_", " ")
+
+
+def ass_style(name, font_file=None, subtitle_color='white', font_size=24, margin_v=21):
+    """ASS 样式行：指定颜色、字号和底边距，斜体，1 像素黑色描边、无阴影，底部居中"""
+    return (f"Style: {name},{font_family(font_file)},{font_size},{ass_color(subtitle_color)},&H000000FF,"
+            f"&H00000000,&H00000000,0,-1,0,0,100,100,0,0,1,1,0,2,10,10,{margin_v},1")
+
+
+def ass_text(text):
+    return text.replace("{", "(").replace("}", ")").replace("\n", "\\N")
+
+
+def write_ass(tracks, output_ass, font_file=None, play_res=ASS_PLAY_RES):
+    """tracks: [(样式名, 字幕条目迭代器, 样式 dict), ...]；多条字幕轨写入同一个 ASS，各自使用自己的样式。
+    条目逐条写出，不需要排序或载入内存。返回输出路径"""
+    with open(output_ass, "w", encoding="utf-8") as f:
+        f.write("[Script Info]\nScriptType: v4.00+\n"
+                f"PlayResX: {play_res[0]}\nPlayResY: {play_res[1]}\nScaledBorderAndShadow: yes\n\n")
+        f.write(f"[V4+ Styles]\nFormat: {ASS_STYLE_FORMAT}\n")
+        for name, _, style in tracks:
+            f.write(ass_style(name, font_file, **style) + "\n")
+        f.write("\n[Events]\nFormat: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text\n")
+        for name, cues, _ in tracks:
+            for cue in cues:
+                f.write(f"Dialogue: 0,{format_ass_time(cue.start)},{format_ass_time(cue.end)},{name},,0,0,0,,"
+                        f"{ass_text(cue.text)}\n")
+    return output_ass
@@ -1,69 +1,314 @@
 import sys
 import os
-import srt
-import torch
-from tqdm import tqdm
-from transformers import MarianMTModel, MarianTokenizer
+import shutil
+import threading
+from translation_cache import TranslationCache
+from artifacts import get_manifest
+from events import progress_printer
+from subtitle_io import iter_cues, write_srt
+from metrics import span, job_metrics
 
 # ==============================
 # 配置更快的模型
 # ==============================
 model_name = "Helsinki-NLP/opus-mt-en-zh"  # 英译中
-print("loading...", flush=True)
-tokenizer = MarianTokenizer.from_pretrained(model_name)
-model = MarianMTModel.from_pretrained(model_name)
-model.eval()
 device = "cpu"  # 如果有GPU，可以改成 "cuda"
-model.to(device)
-print("Loading complete", flush=True)
+BATCH_SIZE = 16           # 每批最多条数
+MAX_BATCH_TOKENS = 2048   # 每批 padding 后的 token 上限（条数 × 最长句长度）
+# 解码预设：fast 贪心解码（适合批量处理旧视频），balanced 小束宽，quality 与原来相同的 num_beams=4。
+# 输出长度上限按源句 token 数计算：min(MAX_DECODE_LENGTH, 源长度 × length_ratio + length_margin)
+DECODING_PRESETS = {
+    "fast": {"num_beams": 1, "length_ratio": 1.5, "length_margin": 8},
+    "balanced": {"num_beams": 2, "length_ratio": 1.5, "length_margin": 10},
+    "quality": {"num_beams": 4, "length_ratio": 2.0, "length_margin": 16},
+}
+DEFAULT_PRESET = "quality"
+MAX_DECODE_LENGTH = 512
+
+# 翻译后端：ctranslate2（int8 量化，首次使用时从 transformers 模型转换并缓存到磁盘）或 transformers（PyTorch fp32）。
+# 未安装 ctranslate2 或转换失败时自动退回 transformers；可用环境变量 VIDSUBFLOW_TRANSLATE_BACKEND 或 --backend 指定
+BACKENDS = ("ctranslate2", "transformers")
+TRANSLATION_BACKEND = os.environ.get("VIDSUBFLOW_TRANSLATE_BACKEND", "ctranslate2")
+CT2_COMPUTE_TYPE = "int8"
+CT2_MODEL_DIR = os.path.join("cache", "ct2")
+
+tokenizer = None
+model = None   # 已加载的翻译后端
+translation_cache = None
+_load_lock = threading.Lock()
+
+
+class TransformersBackend:
+    name = "transformers"
+
+    def __init__(self, model_name, device):
+        from transformers import MarianMTModel
+        loaded = MarianMTModel.from_pretrained(model_name)
+        loaded.eval()
+        loaded.to(device)
+        self.model = loaded
+
+    def translate(self, texts, generation_params):
+        import torch
+        encoded = tokenizer(texts, return_tensors="pt", padding=True, truncation=True).to(device)
+        max_length = decode_length(encoded["input_ids"].shape[1], generation_params)
+        with torch.no_grad(), span("marian.generate", cues=len(texts), tokens=int(encoded["input_ids"].numel()),
+                                   backend=self.name):
+            generated_tokens = self.model.generate(**encoded, num_beams=generation_params["num_beams"],
+                                                   max_length=max_length)
+        return tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)
+
+
+class CTranslate2Backend:
+    """CTranslate2 int8 推理；分词仍使用 MarianTokenizer"""
+    name = "ctranslate2"
+
+    def __init__(self, model_name, device, compute_type=CT2_COMPUTE_TYPE):
+        import ctranslate2
+        self.translator = ctranslate2.Translator(convert_model(model_name, compute_type), device=device,
+                                                 compute_type=compute_type)
+
+    def translate(self, texts, generation_params):
+        sources = [tokenizer.convert_ids_to_tokens(ids) for ids in tokenizer(texts, truncation=True)["input_ids"]]
+        # 批次按长度分桶，按批内最长的源句计算上限即可
+        max_length = decode_length(max(len(s) for s in sources), generation_params)
+        with span("marian.generate", cues=len(texts), tokens=sum(len(s) for s in sources), backend=self.name):
+            results = self.translator.translate_batch(
+                sources, beam_size=generation_params["num_beams"], max_decoding_length=max_length)
+        return [tokenizer.decode(tokenizer.convert_tokens_to_ids(r.hypotheses[0]), skip_special_tokens=True)
+                for r in results]
+
+
+def get_preset(preset=None):
+    """预设名称对应的解码参数（同时作为翻译缓存和产物清单的参数）"""
+    preset = preset or DEFAULT_PRESET
+    if preset not in DECODING_PRESETS:
+        raise ValueError(f"未知的解码预设: {preset}")
+    return DECODING_PRESETS[preset]
+
+def decode_length(source_length, generation_params):
+    return min(MAX_DECODE_LENGTH,
+               int(source_length * generation_params["length_ratio"]) + generation_params["length_margin"])
+
+def converted_model_dir(model_name, compute_type=CT2_COMPUTE_TYPE):
+    safe = model_name.strip("/\\").replace("/", "--").replace("\\", "--").replace(":", "")
+    return os.path.join(CT2_MODEL_DIR, f"{safe}-{compute_type}")
+
+def convert_model(model_name, compute_type=CT2_COMPUTE_TYPE):
+    """把 transformers 模型转换为 CTranslate2 格式并缓存，之后直接使用缓存目录"""
+    output_dir = converted_model_dir(model_name, compute_type)
+    if os.path.exists(os.path.join(output_dir, "model.bin")):
+        return output_dir
+    from ctranslate2.converters import TransformersConverter
+    print(f"首次使用，转换 CTranslate2 {compute_type} 模型: {output_dir}", flush=True)
+    tmp_dir = output_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    with span("ct2.convert", model=model_name, compute_type=compute_type):
+        TransformersConverter(model_name).convert(tmp_dir, quantization=compute_type, force=True)
+    # 转换完整后再改名，中途中断不会留下损坏的缓存
+    shutil.rmtree(output_dir, ignore_errors=True)
+    os.replace(tmp_dir, output_dir)
+    return output_dir
+
+def ctranslate2_available():
+    import importlib.util
+    return importlib.util.find_spec("ctranslate2") is not None
+
+def resolve_backend():
+    """实际会使用的后端名称（已加载时以已加载的为准）"""
+    if model is not None:
+        return model.name
+    if TRANSLATION_BACKEND not in BACKENDS:
+        raise ValueError(f"未知的翻译后端: {TRANSLATION_BACKEND}")
+    if TRANSLATION_BACKEND == "ctranslate2" and not ctranslate2_available():
+        return "transformers"
+    return TRANSLATION_BACKEND
+
+def model_id():
+    """写入翻译缓存和产物清单的模型标识：int8 译文与 fp32 不完全相同，需要分开。
+    模型未加载时是按配置预期的后端，CTranslate2 转换失败改用 transformers 时加载后会变，
+    所以写入缓存和清单时，译文要么由已加载的模型生成，要么全部来自预期后端的缓存条目"""
+    if resolve_backend() == "ctranslate2":
+        return f"{model_name}@ct2-{CT2_COMPUTE_TYPE}"
+    return model_name
+
+def load_model():
+    """加载分词器和翻译后端，进程内只加载一次（常驻翻译进程复用）"""
+    global tokenizer, model
+    with _load_lock:
+        if model is not None:
+            return
+        print("loading...", flush=True)
+        backend = resolve_backend()
+        with span("marian.load", model=model_name, device=device, backend=backend):
+            # torch / transformers 导入耗时数秒，只在加载模型时导入；用法提示和命令行参数错误可以立即返回
+            from transformers import MarianTokenizer
+            tokenizer = MarianTokenizer.from_pretrained(model_name)
+            loaded = None
+            if backend == "ctranslate2":
+                try:
+                    loaded = CTranslate2Backend(model_name, device)
+                except Exception as e:
+                    print(f"CTranslate2 后端不可用，改用 transformers: {e}", flush=True)
+            if loaded is None:
+                loaded = TransformersBackend(model_name, device)
+        model = loaded
+        print(f"Loading complete ({model.name})", flush=True)
 
 # ==============================
 # 翻译函数
 # ==============================
-def translate_text_local(text):
-    encoded = tokenizer(text, return_tensors="pt", padding=True, truncation=True).to(device)
-    with torch.no_grad():
-        generated_tokens = model.generate(
-            **encoded,
-            max_length=512,
-            num_beams=4
-        )
-    translated = tokenizer.batch_decode(generated_tokens, skip_special_tokens=True)[0]
-    return translated
+def translate_text_local(text, preset=None):
+    return translate_batch([text], preset)[0]
+
+def translate_batch(texts, preset=None):
+    """一次翻译一批文本"""
+    load_model()
+    return model.translate(texts, get_preset(preset))
+
+def is_out_of_memory(error):
+    message = str(error).lower()
+    return isinstance(error, MemoryError) or "out of memory" in message or "can't allocate memory" in message
+
+def translate_batch_with_fallback(texts, preset=None):
+    """内存不足时把批次对半拆开重试，直到单条"""
+    try:
+        return translate_batch(texts, preset)
+    except (RuntimeError, MemoryError) as e:
+        if len(texts) == 1 or not is_out_of_memory(e):
+            raise
+        if device == "cuda":
+            import torch
+            torch.cuda.empty_cache()
+        print(f"内存不足，批次 {len(texts)} 条拆分重试", flush=True)
+        mid = len(texts) // 2
+        return translate_batch_with_fallback(texts[:mid], preset) + translate_batch_with_fallback(texts[mid:], preset)
+
+def make_length_batches(lengths, batch_size, max_tokens):
+    """按 token 长度排序后分桶：每批不超过 batch_size 条，且 条数×最长长度 不超过 max_tokens"""
+    order = sorted(range(len(lengths)), key=lambda i: lengths[i])
+    batches = []
+    current = []
+    longest = 0
+    for i in order:
+        new_longest = max(longest, lengths[i])
+        if current and (len(current) >= batch_size or new_longest * (len(current) + 1) > max_tokens):
+            batches.append(current)
+            current = []
+            new_longest = lengths[i]
+        current.append(i)
+        longest = new_longest
+    if current:
+        batches.append(current)
+    return batches
+
+def get_translation_cache():
+    global translation_cache
+    with _load_lock:
+        if translation_cache is None:
+            translation_cache = TranslationCache()
+        return translation_cache
+
+def translate_texts(texts, batch_size=None, max_tokens=None, progress_callback=None, cache=None, preset=None):
+    """批量翻译，结果按原顺序返回；命中缓存和重复的原文不再送入模型"""
+    if not texts:
+        return []
+    generation_params = get_preset(preset)
+    # 全部命中时不加载模型：预期后端的缓存条目只会由该后端写入
+    key = model_id()
+    translated = cache.get_many(texts, key, generation_params) if cache else {}
+    pending = [t for t in dict.fromkeys(texts) if t not in translated]
+    if pending:
+        load_model()
+        if model_id() != key:
+            # 实际加载的后端与预期不同（CTranslate2 不可用），按实际后端重新查缓存
+            key = model_id()
+            if cache:
+                translated.update(cache.get_many(pending, key, generation_params))
+                pending = [t for t in pending if t not in translated]
+    if pending:
+        from tqdm import tqdm
+        batch_size = batch_size or BATCH_SIZE
+        max_tokens = max_tokens or MAX_BATCH_TOKENS
+        lengths = [len(ids) for ids in tokenizer(pending, truncation=True)["input_ids"]]
+        done = 0
+        with tqdm(total=len(pending), desc="翻译进度") as bar:
+            for batch in make_length_batches(lengths, batch_size, max_tokens):
+                sources = [pending[i] for i in batch]
+                results = translate_batch_with_fallback(sources, preset)
+                translated.update(zip(sources, results))
+                if cache:
+                    cache.put_many(list(zip(sources, results)), key, generation_params)
+                done += len(batch)
+                bar.update(len(batch))
+                if progress_callback:
+                    progress_callback(done / len(pending) * 100, done=done, unit="cues")
+    elif progress_callback:
+        progress_callback(100)
+    return [translated[t] for t in texts]
 
 # ==============================
 # 翻译 SRT 文件
 # ==============================
-def translate_subtitle_file_local(input_srt_path):
+def translate_params(preset=None):
+    """产物清单中的翻译参数"""
+    return {"model": model_id(), "generation": get_preset(preset)}
+
+def translate_subtitle_file_local(input_srt_path, progress_callback=None,
+                                  batch_size=None, max_tokens=None, use_cache=True, force=False, preset=None):
+    """翻译 SRT，输出 <名>_zh.srt（原文在上、译文在下）；preset 为解码预设 fast / balanced / quality"""
     if not os.path.exists(input_srt_path):
         print(f"文件不存在: {input_srt_path}", flush=True)
         return
 
-    with open(input_srt_path, "r", encoding="utf-8") as f:
-        srt_content = f.read()
-
-    subtitles = list(srt.parse(srt_content))
-    for idx, sub in enumerate(tqdm(subtitles, desc="翻译进度")):
-        translated = translate_text_local(sub.content)
-        sub.content = f"{sub.content}\n{translated}"
-    
-        # 输出进度百分比
-        progress_percent = (idx + 1) / len(subtitles) * 100
-        print(f"PROGRESS: {progress_percent}", flush=True)
-
     output_path = os.path.splitext(input_srt_path)[0] + "_zh.srt"
-    with open(output_path, "w", encoding="utf-8") as f:
-        f.write(srt.compose(subtitles))
+    manifest = get_manifest()
+    # 模型已加载（常驻翻译进程）时按实际后端检查，否则按预期的后端检查；已是最新时不加载模型
+    if not force and manifest.is_up_to_date("translate", output_path, [input_srt_path], translate_params(preset)):
+        print(f"翻译字幕已是最新，跳过翻译: {output_path}", flush=True)
+        if progress_callback:
+            progress_callback(100)
+        return output_path
+
+    # 只保留原文用于批量翻译；写出时再流式读一遍原文件，不在内存中保存字幕对象
+    cache = get_translation_cache() if use_cache else None
+    translations = translate_texts([cue.text for cue in iter_cues(input_srt_path)], batch_size=batch_size,
+                                   max_tokens=max_tokens, progress_callback=progress_callback, cache=cache,
+                                   preset=preset)
+    if cache:
+        stats = cache.stats()
+        print(f"翻译缓存：命中 {stats['hits']}，未命中 {stats['misses']}，共 {stats['entries']} 条", flush=True)
+    write_srt((cue._replace(text=f"{cue.text}\n{translated}")
+               for cue, translated in zip(iter_cues(input_srt_path), translations)), output_path)
+    # 译文实际来自的后端：有未命中时 translate_texts 已加载模型，按实际后端记录；
+    # 全部命中缓存时模型未加载，预期后端的缓存条目只会由该后端写入，按预期后端记录同样准确
+    manifest.record("translate", output_path, [input_srt_path], translate_params(preset))
 
     print(f"\n翻译完成，输出文件：{output_path}", flush=True)
+    return output_path
 
 # ==============================
 # 命令行入口
 # ==============================
 if __name__ == "__main__":
     if len(sys.argv) < 2:
-        print("用法: python subtitle_translator_marian.py <字幕文件路径.srt>", flush=True)
+        print("用法: python subtitle_translator.py <字幕文件路径.srt> [--batch-size N] [--max-tokens N] [--no-cache] [--force] [--backend ctranslate2|transformers] [--preset fast|balanced|quality]", flush=True)
         sys.exit(1)
 
-    input_path = sys.argv[1]
-    translate_subtitle_file_local(input_path)
+    import argparse
+    parser = argparse.ArgumentParser()
+    parser.add_argument("input_path")
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument("--max-tokens", type=int, default=MAX_BATCH_TOKENS)
+    parser.add_argument("--no-cache", action="store_true", help="不使用翻译缓存")
+    parser.add_argument("--force", action="store_true", help="忽略产物清单，强制重新翻译")
+    parser.add_argument("--backend", choices=BACKENDS, default=TRANSLATION_BACKEND, help="翻译后端")
+    parser.add_argument("--preset", choices=list(DECODING_PRESETS), default=DEFAULT_PRESET,
+                        help="解码预设：fast 贪心 / balanced 小束宽 / quality 束宽 4")
+    args = parser.parse_args()
+    TRANSLATION_BACKEND = args.backend
+    job = os.path.splitext(os.path.basename(args.input_path))[0]
+    with job_metrics(job, "translate", source=args.input_path):
+        translate_subtitle_file_local(args.input_path, progress_callback=progress_printer("translate"),
+                                      batch_size=args.batch_size, max_tokens=args.max_tokens,
+                                      use_cache=not args.no_cache, force=args.force, preset=args.preset)
@@ -0,0 +1,38 @@
+import os
+
+from catalogue import MediaCatalogue
+
+
+def make_catalogue(tmp_path, videos=(), subtitles=()):
+    video_dir, subtitle_dir = tmp_path / "video", tmp_path / "outsrt"
+    video_dir.mkdir()
+    subtitle_dir.mkdir()
+    for name in videos:
+        (video_dir / name).write_bytes(b"")
+    for name in subtitles:
+        (subtitle_dir / name).write_text("", encoding="utf-8")
+    return MediaCatalogue(str(video_dir), str(subtitle_dir))
+
+
+def test_find_video_requires_exact_stem(tmp_path):
+    catalogue = make_catalogue(tmp_path, videos=["My-Talk.mp4"])
+    # 规范化后相同（mytalk），但文件名不同：不能把 MyTalk 的字幕融合进 My-Talk
+    assert catalogue.find_video("MyTalk") is None
+    assert catalogue.find_video("my-talk") is None
+    assert catalogue.find_video("My-Talk") == os.path.join(catalogue.video_dir, "My-Talk.mp4")
+
+
+def test_find_video_prefers_extension_order(tmp_path):
+    catalogue = make_catalogue(tmp_path, videos=["talk.mkv", "talk.mp4", "Talk.mp4"])
+    assert catalogue.find_video("talk") == os.path.join(catalogue.video_dir, "talk.mp4")
+
+
+def test_incremental_updates(tmp_path):
+    catalogue = make_catalogue(tmp_path, videos=["a.mp4"], subtitles=["a.srt"])
+    assert catalogue.subtitle_variants("a.mp4") == {"srt": os.path.join(catalogue.subtitle_dir, "a.srt")}
+    (tmp_path / "outsrt" / "a_zh.srt").write_text("", encoding="utf-8")
+    os.remove(tmp_path / "video" / "a.mp4")
+    assert catalogue.rescan_dir(catalogue.subtitle_dir) == (["a_zh.srt"], [])
+    assert catalogue.rescan_dir(catalogue.video_dir) == ([], ["a.mp4"])
+    assert catalogue.find_subtitle("a.mp4", "zh") == os.path.join(catalogue.subtitle_dir, "a_zh.srt")
+    assert catalogue.find_video("a") is None
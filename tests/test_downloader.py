@@ -0,0 +1,50 @@
+import os
+import threading
+
+from downloader import rename_to_clean
+
+
+def touch(path, content=""):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(content)
+    return str(path)
+
+
+def test_rename_keeps_first_word(tmp_path):
+    path = touch(tmp_path / "Hello World (2024).mp4")
+    assert rename_to_clean(path) == str(tmp_path / "Hello.mp4")
+    assert os.listdir(tmp_path) == ["Hello.mp4"]
+
+
+def test_rename_does_not_overwrite_existing_file(tmp_path):
+    first = rename_to_clean(touch(tmp_path / "How to cook rice.mp4", "rice"))
+    second = rename_to_clean(touch(tmp_path / "How it works.mp4", "works"))
+    third = rename_to_clean(touch(tmp_path / "How come.mp4", "come"))
+    assert [os.path.basename(p) for p in (first, second, third)] == ["How.mp4", "How_2.mp4", "How_3.mp4"]
+    with open(first, encoding="utf-8") as f:
+        assert f.read() == "rice"
+
+
+def test_rename_already_clean_name_is_unchanged(tmp_path):
+    path = touch(tmp_path / "How.mp4")
+    assert rename_to_clean(path) == path
+
+
+def test_concurrent_renames_get_distinct_targets(tmp_path):
+    paths = [touch(tmp_path / f"The video number {i}.mp4", str(i)) for i in range(8)]
+    results = [None] * len(paths)
+
+    def rename(i):
+        results[i] = rename_to_clean(paths[i])
+
+    threads = [threading.Thread(target=rename, args=(i,)) for i in range(len(paths))]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(set(results)) == len(paths)
+    # 每个返回的路径仍然指向自己下载的那个文件
+    for i, path in enumerate(results):
+        with open(path, encoding="utf-8") as f:
+            assert f.read() == str(i)
@@ -0,0 +1,57 @@
+import os
+import sys
+import time
+
+import pytest
+
+from ffmpeg_executor import FFmpegExecutor
+
+pytestmark = pytest.mark.skipif(os.name != "posix", reason="假 ffmpeg 是带 shebang 的脚本")
+
+FAKE_FFMPEG = """#!{python}
+import os, sys, time
+with open({pid_file!r}, "w") as f:
+    f.write(str(os.getpid()))
+print("frame=10\\nout_time_us=1000000\\nprogress=continue", flush=True)
+# 收到 q 时退出，否则一直运行
+if sys.stdin.read(1) == "q":
+    sys.exit(255)
+time.sleep(60)
+"""
+
+
+@pytest.fixture
+def fake_ffmpeg(tmp_path):
+    pid_file = tmp_path / "pid"
+    script = tmp_path / "ffmpeg"
+    script.write_text(FAKE_FFMPEG.format(python=sys.executable, pid_file=str(pid_file)), encoding="utf-8")
+    script.chmod(0o755)
+    return str(script), pid_file
+
+
+def process_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_exception_in_progress_callback_terminates_ffmpeg(fake_ffmpeg):
+    script, pid_file = fake_ffmpeg
+    executor = FFmpegExecutor(total_cores=2)
+
+    def progress_callback(percent, done=None, unit=None):
+        raise RuntimeError("界面已关闭")
+
+    with pytest.raises(RuntimeError, match="界面已关闭"):
+        executor.run([script, "-i", "in.mp4", "out.mp4"], progress_callback=progress_callback, duration=10,
+                     cores=2)
+
+    pid = int(pid_file.read_text())
+    deadline = time.monotonic() + 5
+    while process_alive(pid) and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert not process_alive(pid)
+    assert not executor.processes
+    assert executor.budget.free == executor.budget.total
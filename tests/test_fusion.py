@@ -0,0 +1,76 @@
+import pytest
+
+from fusion import build_ass_filter, escape_filter_path
+
+
+def get_token(text, terms):
+    """按 ffmpeg av_get_token 的规则读取一个记号：\\ 转义下一个字符，'' 内原样保留，遇到 terms 中的字符结束"""
+    out = []
+    i = 0
+    while i < len(text) and text[i] not in terms:
+        c = text[i]
+        if c == "\\" and i + 1 < len(text):
+            out.append(text[i + 1])
+            i += 2
+        elif c == "'":
+            end = text.index("'", i + 1)
+            out.append(text[i + 1:end])
+            i = end + 1
+        else:
+            out.append(c)
+            i += 1
+    return "".join(out), text[i:]
+
+
+def unescape_filter_value(escaped):
+    """模拟 ffmpeg 的两级解析：先按滤镜图取出参数，再按选项值取出一个值"""
+    args, rest = get_token(escaped, "[],;")
+    assert rest == "", f"滤镜图在 {rest!r} 处被截断"
+    value, rest = get_token(args, ":")
+    assert rest == "", f"选项值在 {rest!r} 处被截断"
+    return value
+
+
+@pytest.mark.parametrize("path", [
+    r"C:\a,b\x.ass",
+    r"C:\Users\me\fuse_[1];x\seg000.ass",
+    "/tmp/it's here/seg000.ass",
+    "/home/user/视频/a:b.ass",
+])
+def test_escape_filter_path_survives_both_parsing_levels(path):
+    assert unescape_filter_value(escape_filter_path(path)) == path
+
+
+def test_escape_filter_path_windows_drive():
+    assert escape_filter_path(r"C:\a,b\x.ass") == r"C\\:\\\\a\,b\\\\x.ass"
+    assert escape_filter_path("/a/it's.ass") == r"/a/it\\\'s.ass"
+
+
+def parse_filter(graph):
+    """模拟 ffmpeg 解析单个滤镜：先按滤镜图取出参数，再按选项逐个取 key=value"""
+    name, rest = graph.split("=", 1)
+    args, rest = get_token(rest, "[],;")
+    assert rest == "", f"滤镜图在 {rest!r} 处被截断"
+    options = {}
+    while args:
+        option, args = get_token(args, ":")
+        key, value = option.split("=", 1)
+        options[key] = value
+        args = args[1:]
+    return name, options
+
+
+@pytest.mark.parametrize("work_dir", [
+    r"C:\Users\me\Videos\fuse_k2j1",
+    "/data/videos, 2024 [raw]; final/fuse_k2j1",
+])
+def test_segment_ass_filter_in_temp_dir(work_dir):
+    # 分段烧录的 ASS 写在视频目录下 mkdtemp 创建的绝对路径中
+    ass_file = work_dir + ("\\" if "\\" in work_dir else "/") + "seg003.ass"
+    name, options = parse_filter(build_ass_filter(ass_file))
+    assert (name, options) == ("ass", {"filename": ass_file})
+
+
+def test_ass_filter_with_fontsdir():
+    name, options = parse_filter(build_ass_filter(r"D:\work,1\x.ass", "/usr/share/fonts/[ms];core/times.ttf"))
+    assert options == {"filename": r"D:\work,1\x.ass", "fontsdir": "/usr/share/fonts/[ms];core"}
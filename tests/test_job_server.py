@@ -0,0 +1,44 @@
+import json
+
+import pytest
+
+from job_server import worker_main
+
+
+def printing_handler(job, progress_callback):
+    print(f"处理 {job['input']}")
+    progress_callback(50, done=1, unit="cues")
+    print("第二行日志")
+    progress_callback(100, done=2, unit="cues")
+    return job["input"] + ".out"
+
+
+def build_job(i, path):
+    return {"id": f"job-{i}", "input": path}
+
+
+def test_files_mode_turns_prints_into_log_events(capsys):
+    worker_main(printing_handler, build_job, argv=["a.srt", "b.srt"], stage="translate")
+    lines = capsys.readouterr().out.splitlines()
+    events = [json.loads(line) for line in lines]
+
+    logs = [e["message"] for e in events if e["event"] == "log"]
+    assert logs == ["处理 a.srt", "第二行日志", "处理 b.srt", "第二行日志"]
+    # 日志事件不会被再次包装成 log 事件
+    assert not any(m.startswith("{") for m in logs)
+    done = [(e["job"], e["output"]) for e in events if e["event"] == "done"]
+    assert done == [("job-0", "a.srt.out"), ("job-1", "b.srt.out")]
+    assert [e["percent"] for e in events if e["event"] == "progress" and e["job"] == "job-0"][-1] == 100
+
+
+def test_files_mode_exits_nonzero_on_error(capsys):
+    def failing_handler(job, progress_callback):
+        print("开始")
+        raise RuntimeError("坏文件")
+
+    with pytest.raises(SystemExit) as exc:
+        worker_main(failing_handler, build_job, argv=["a.srt"], stage="translate")
+    assert exc.value.code == 1
+    events = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [e["event"] for e in events] == ["log", "error"]
+    assert events[-1]["message"] == "坏文件"
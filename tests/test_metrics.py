@@ -0,0 +1,43 @@
+import json
+
+from metrics import RUN_ID, JobRecorder, job_metrics, metrics_file_name, span, wall_seconds
+
+
+def test_wall_seconds_counts_overlap_once():
+    spans = [{"start": 0.0, "seconds": 10.0}, {"start": 2.0, "seconds": 10.0}, {"start": 20.0, "seconds": 5.0}]
+    assert wall_seconds(spans) == 17.0
+    assert wall_seconds([]) == 0.0
+
+
+def test_parallel_encode_fps_uses_wall_clock_and_skips_stream_copy():
+    recorder = JobRecorder("video-1", "fuse")
+    # 4 段同时编码，每段 10 秒、300 帧；随后拼接（只复制流，不带 frames）
+    for i in range(4):
+        recorder.add("ffmpeg", 100.0, 10.0, {"output": f"seg{i:03d}.mkv", "frames": 300})
+    recorder.add("ffmpeg", 110.0, 2.0, {"output": "out.mp4"})
+    assert recorder.summary()["metrics"]["encode_fps"] == 120.0
+
+
+def test_single_encode_fps():
+    recorder = JobRecorder("video-1", "fuse")
+    recorder.add("ffmpeg", 100.0, 20.0, {"output": "out.mp4", "frames": 600})
+    assert recorder.summary()["metrics"]["encode_fps"] == 30.0
+
+
+def test_job_metrics_writes_json(tmp_path):
+    with job_metrics("video-1", "translate", source="outsrt/lecture.srt", metrics_dir=str(tmp_path)):
+        with span("marian.generate", cues=10):
+            pass
+    path = tmp_path / metrics_file_name("video-1", "outsrt/lecture.srt")
+    data = json.loads(path.read_text(encoding="utf-8"))
+    assert data["run"] == RUN_ID
+    stage = data["stages"]["translate"]
+    assert stage["input"] == "outsrt/lecture.srt"
+    assert stage["totals"]["marian.generate"]["cues"] == 10
+
+
+def test_metrics_file_name_is_unique_per_run():
+    assert metrics_file_name("video-1", "video/lecture.mp4", run_id="r1") == "r1_video-1_lecture.json"
+    assert metrics_file_name("lecture", "video/lecture.mp4", run_id="r1") == "r1_lecture.json"
+    assert metrics_file_name("video-1", "video/lecture.mp4", run_id="r2") != \
+        metrics_file_name("video-1", "video/lecture.mp4", run_id="r1")
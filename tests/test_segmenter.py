@@ -0,0 +1,120 @@
+"""Segmenter 与原来按列表切分的断句循环逐条比较（固定随机种子）"""
+import random
+
+import pytest
+
+from parallel_transcribe import Word
+from subtitle_generator import (WordTimeline, segment_timeline, segment_words,
+                                sentence_end_punctuations, force_break_punctuations)
+
+SEEDS = range(40)
+VOCABULARY = ["the", "model", "video", "we", "can", "see", "it", "works", "OK", "2024", "你好", "字幕", ""]
+PUNCTUATION = [".", ",", "?", "!", ";", ":", "。", "，", "？", "；"]
+
+
+def reference_segment(words):
+    """原来的断句循环（pop(0) / insert(0) / 切片版本），返回 [(开始, 结束, 文本), ...]"""
+    subs = []
+
+    def create_subtitle_chunk(words_chunk):
+        return (words_chunk[0].start, words_chunk[-1].end, " ".join(" ".join(w.word for w in words_chunk).split()))
+
+    def split_chunk_by_max_pause(chunk_words, min_len=10, max_len=30):
+        if len(chunk_words) <= 16:
+            return [chunk_words]
+        end_index = min(len(chunk_words), max_len)
+        max_gap = 0
+        split_idx = min_len
+        for i in range(min_len - 1, end_index - 1):
+            gap = chunk_words[i + 1].start - chunk_words[i].end
+            if gap > max_gap:
+                max_gap = gap
+                split_idx = i + 1
+        return [chunk_words[:split_idx], chunk_words[split_idx:]]
+
+    def flush(chunk, min_len, max_len):
+        chunks_to_process = [chunk]
+        while chunks_to_process:
+            cw = chunks_to_process.pop(0)
+            parts = split_chunk_by_max_pause(cw, min_len=min_len, max_len=max_len)
+            subs.append(create_subtitle_chunk(parts[0]))
+            if len(parts) > 1:
+                chunks_to_process.insert(0, parts[1])
+
+    chunk_words = []
+    last_punct_index = -1
+    for w in words:
+        chunk_words.append(w)
+        if w.word and w.word[-1] in sentence_end_punctuations:
+            last_punct_index = len(chunk_words) - 1
+        if len(chunk_words) > 10 and last_punct_index != -1:
+            flush(chunk_words[:last_punct_index + 1], 10, 30)
+            chunk_words = chunk_words[last_punct_index + 1:]
+            last_punct_index = -1
+            for i, cw in enumerate(chunk_words):
+                if cw.word and cw.word[-1] in sentence_end_punctuations:
+                    last_punct_index = i
+        elif w.word and w.word[-1] in force_break_punctuations:
+            flush(chunk_words, 10, 30)
+            chunk_words = []
+            last_punct_index = -1
+    if chunk_words:
+        flush(chunk_words, 6, 20)
+    return subs
+
+
+def random_words(seed, count):
+    """标点稀疏程度、停顿长短随种子变化；包含相等停顿、重叠时间戳和长段无标点的情况"""
+    rng = random.Random(seed)
+    punct_rate = rng.choice([0.0, 0.02, 0.08, 0.2, 0.5])
+    words = []
+    t = 0.0
+    for _ in range(count):
+        word = " " + rng.choice(VOCABULARY)
+        if rng.random() < punct_rate:
+            word += rng.choice(PUNCTUATION)
+        gap = rng.choice([0.0, 0.0, 0.1, 0.1, rng.random() * 0.05, rng.random() * 1.5, -0.02])
+        start = round(t + gap, 3)
+        end = round(start + 0.05 + rng.random() * 0.4, 3)
+        words.append(Word(start, end, word))
+        t = end
+    return words
+
+
+def as_tuples(cues):
+    return [(c.start.total_seconds(), c.end.total_seconds(), c.content) for c in cues]
+
+
+def reference_tuples(words):
+    # srt.Subtitle 的 timedelta 精度为微秒
+    return [(round(s, 6), round(e, 6), text) for s, e, text in reference_segment(words)]
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_segment_words_matches_reference(seed):
+    words = random_words(seed, count=50 + seed * 37)
+    cues = list(segment_words(iter(words)))
+    assert as_tuples(cues) == reference_tuples(words)
+    assert [c.index for c in cues] == list(range(1, len(cues) + 1))
+
+
+@pytest.mark.parametrize("seed", SEEDS)
+def test_segment_timeline_matches_reference(seed, tmp_path):
+    words = random_words(seed, count=50 + seed * 37)
+    path = str(tmp_path / "timeline.npz")
+    WordTimeline.from_words(words).save(path)
+    assert as_tuples(segment_timeline(WordTimeline.load(path))) == reference_tuples(words)
+
+
+def test_long_unpunctuated_stream_splits_at_pauses():
+    words = [Word(i * 0.5, i * 0.5 + 0.3, f" w{i}") for i in range(100)]
+    assert as_tuples(segment_words(iter(words))) == reference_tuples(words)
+
+
+def test_no_positive_pause_splits_at_min_length():
+    # 时间戳重叠或紧挨着时没有正停顿，按最小长度切分
+    words = []
+    for i in range(40):
+        start = i * 0.5 - (0.1 if i % 10 == 6 else 0.0)
+        words.append(Word(start, i * 0.5 + 0.5, f" w{i}"))
+    assert as_tuples(segment_words(iter(words))) == reference_tuples(words)
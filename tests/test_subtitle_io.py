@@ -0,0 +1,37 @@
+from subtitle_io import iter_cues, split_bilingual, split_cue_text
+
+
+def write(path, text):
+    path.write_text(text, encoding="utf-8")
+    return str(path)
+
+
+def test_split_cue_text_uses_source_translation_layout():
+    assert split_cue_text("Hello there.\n你好。") == ("Hello there.", "你好。")
+    assert split_cue_text("OK.\nOK") == ("OK.", "OK")
+    assert split_cue_text("Sixty.\n60") == ("Sixty.", "60")
+    assert split_cue_text("Right?\n。") == ("Right?", "。")
+    assert split_cue_text("First line\nsecond line\n两行的译文") == ("First line\nsecond line", "两行的译文")
+
+
+def test_split_cue_text_single_line():
+    assert split_cue_text("Hello") == ("Hello", "")
+    assert split_cue_text("你好") == ("", "你好")
+    assert split_cue_text("「好」") == ("", "「好」")
+
+
+def test_split_bilingual_keeps_tracks_in_step(tmp_path):
+    source = write(tmp_path / "a_zh.srt",
+                   "1\n00:00:00,000 --> 00:00:01,000\nHello there.\n你好。\n\n"
+                   "2\n00:00:01,000 --> 00:00:02,000\nOK.\nOK\n\n"
+                   "3\n00:00:02,000 --> 00:00:03,000\nIn 2024.\n2024\n\n"
+                   "4\n00:00:03,000 --> 00:00:04,000\nWhat?\n。\n\n"
+                   "5\n00:00:04,000 --> 00:00:05,000\nThanks, Alice.\n谢谢，Alice。\n\n")
+    en_path, cn_path = str(tmp_path / "a_en.srt"), str(tmp_path / "a_cn.srt")
+
+    assert split_bilingual(source, en_path, cn_path) == (5, 5)
+    en = list(iter_cues(en_path))
+    cn = list(iter_cues(cn_path))
+    assert [c.text for c in en] == ["Hello there.", "OK.", "In 2024.", "What?", "Thanks, Alice."]
+    assert [c.text for c in cn] == ["你好。", "OK", "2024", "。", "谢谢，Alice。"]
+    assert [(c.start, c.end) for c in en] == [(c.start, c.end) for c in cn]
@@ -0,0 +1,94 @@
+import sys
+import types
+
+import pytest
+
+pytest.importorskip("tqdm")
+
+import artifacts
+import subtitle_translator
+from translation_cache import TranslationCache
+
+
+class FakeTokenizer:
+    @classmethod
+    def from_pretrained(cls, name):
+        return cls()
+
+    def __call__(self, texts, truncation=True, **kwargs):
+        return {"input_ids": [[0] * (len(t.split()) + 1) for t in texts]}
+
+
+class FakeTransformersBackend:
+    name = "transformers"
+
+    def __init__(self, model_name, device):
+        pass
+
+    def translate(self, texts, generation_params):
+        return [f"译:{t}" for t in texts]
+
+
+def broken_ct2_backend(model_name, device):
+    raise RuntimeError("转换失败")
+
+
+@pytest.fixture
+def ct2_fallback(tmp_path, monkeypatch):
+    """配置为 ctranslate2 且已安装，但转换失败、实际退回 transformers"""
+    monkeypatch.setitem(sys.modules, "transformers", types.SimpleNamespace(MarianTokenizer=FakeTokenizer))
+    monkeypatch.setattr(subtitle_translator, "TRANSLATION_BACKEND", "ctranslate2")
+    monkeypatch.setattr(subtitle_translator, "ctranslate2_available", lambda: True)
+    monkeypatch.setattr(subtitle_translator, "CTranslate2Backend", broken_ct2_backend)
+    monkeypatch.setattr(subtitle_translator, "TransformersBackend", FakeTransformersBackend)
+    monkeypatch.setattr(subtitle_translator, "model", None)
+    monkeypatch.setattr(subtitle_translator, "tokenizer", None)
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"))
+    monkeypatch.setattr(subtitle_translator, "translation_cache", cache)
+    monkeypatch.setattr(artifacts, "_manifest", artifacts.ArtifactManifest(str(tmp_path / "artifacts.sqlite3")))
+    return cache
+
+
+def write_srt(path):
+    path.write_text("1\n00:00:00,000 --> 00:00:01,000\nHello there\n\n"
+                    "2\n00:00:01,000 --> 00:00:02,000\nGood night\n\n", encoding="utf-8")
+    return str(path)
+
+
+def test_fallback_backend_keys_manifest_and_cache(tmp_path, ct2_fallback):
+    source = write_srt(tmp_path / "a.srt")
+    assert subtitle_translator.model_id() == "Helsinki-NLP/opus-mt-en-zh@ct2-int8"
+
+    output = subtitle_translator.translate_subtitle_file_local(source)
+
+    assert subtitle_translator.model.name == "transformers"
+    params = {"model": "Helsinki-NLP/opus-mt-en-zh", "generation": subtitle_translator.get_preset(None)}
+    assert artifacts.get_manifest().is_up_to_date("translate", output, [source], params)
+    generation = subtitle_translator.get_preset(None)
+    assert ct2_fallback.get_many(["Hello there"], "Helsinki-NLP/opus-mt-en-zh", generation) == {
+        "Hello there": "译:Hello there"}
+    assert ct2_fallback.get_many(["Hello there"], "Helsinki-NLP/opus-mt-en-zh@ct2-int8", generation) == {}
+
+
+def test_fallback_backend_reuses_its_own_cache_entries(tmp_path, ct2_fallback):
+    generation = subtitle_translator.get_preset(None)
+    ct2_fallback.put_many([("Hello there", "缓存的译文")], "Helsinki-NLP/opus-mt-en-zh", generation)
+
+    result = subtitle_translator.translate_texts(["Hello there", "Good night"], cache=ct2_fallback)
+
+    assert result == ["缓存的译文", "译:Good night"]
+
+
+def test_fully_cached_file_does_not_load_model(tmp_path, ct2_fallback):
+    source = write_srt(tmp_path / "a.srt")
+    generation = subtitle_translator.get_preset(None)
+    ct2_fallback.put_many([("Hello there", "你好"), ("Good night", "晚安")],
+                          "Helsinki-NLP/opus-mt-en-zh@ct2-int8", generation)
+
+    output = subtitle_translator.translate_subtitle_file_local(source)
+
+    assert subtitle_translator.model is None
+    params = {"model": "Helsinki-NLP/opus-mt-en-zh@ct2-int8", "generation": generation}
+    assert artifacts.get_manifest().is_up_to_date("translate", output, [source], params)
+    with open(output, encoding="utf-8") as f:
+        assert "Hello there\n你好" in f.read()
@@ -0,0 +1,29 @@
+from translation_cache import TranslationCache
+
+PARAMS = {"num_beams": 4}
+
+
+def test_evicts_least_recently_used_below_limit(tmp_path):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"), max_entries=10)
+    cache.put_many([(f"text {i}", f"译文 {i}") for i in range(8)], "m", PARAMS)
+    cache.get_many(["text 0"], "m", PARAMS)   # 最近使用过，不会被淘汰
+    cache.put_many([(f"text {i}", f"译文 {i}") for i in range(8, 12)], "m", PARAMS)
+
+    assert cache.stats()["entries"] == 9
+    assert cache.get("text 0", "m", PARAMS) == "译文 0"
+    assert cache.get("text 11", "m", PARAMS) == "译文 11"
+
+
+def test_put_many_counts_only_when_over_limit(tmp_path, monkeypatch):
+    cache = TranslationCache(str(tmp_path / "cache.sqlite3"), max_entries=100)
+    counts = []
+    original = cache.count_entries
+    monkeypatch.setattr(cache, "count_entries", lambda: counts.append(1) or original())
+
+    for batch in range(9):
+        cache.put_many([(f"text {batch} {i}", "译文") for i in range(10)], "m", PARAMS)
+    assert counts == []
+    # 重复写入同样的原文只是替换，估算超过上限后重新统计一次，得到真实条数
+    cache.put_many([(f"text 0 {i}", "新译文") for i in range(10)] * 2, "m", PARAMS)
+    assert len(counts) == 1
+    assert cache.count_upper_bound == 90
@@ -0,0 +1,82 @@
+"""常驻转写进程：WhisperModel 只加载一次，按 JSON Lines 协议接收视频转写任务
+
+    python transcribe_worker.py --serve --model small.en --compute-type int8
+    python transcribe_worker.py --listen 8766 --model medium.en
+    python transcribe_worker.py --submit 8766 video/a.mp4 video/b.mp4
+
+任务可用 "model" / "compute_type" 指定其它模型，加载后同样常驻复用。
+--workers N（N > 1）时改用常驻进程池按静音分块并行转写长视频。
+"""
+import os
+from job_server import worker_main
+
+# (模型大小, 计算类型) -> 已加载的 WhisperModel
+models = {}
+transcribers = {}
+worker_config = {"model": None, "device": None, "compute_type": None, "workers": 1, "chunk_minutes": None}
+
+
+def get_model(model_size=None, compute_type=None):
+    import subtitle_generator
+    model_size = model_size or worker_config["model"]
+    compute_type = compute_type or worker_config["compute_type"]
+    key = (model_size, compute_type)
+    if key not in models:
+        print(f"加载 Whisper 模型: {model_size} ({compute_type})", flush=True)
+        models[key] = subtitle_generator.load_model(model_size, device=worker_config["device"],
+                                                    compute_type=compute_type)
+    return models[key]
+
+
+def get_transcriber(model_size=None, compute_type=None):
+    from parallel_transcribe import ParallelTranscriber
+    model_size = model_size or worker_config["model"]
+    compute_type = compute_type or worker_config["compute_type"]
+    key = (model_size, compute_type)
+    if key not in transcribers:
+        print(f"启动并行转写进程池: {model_size} ({compute_type}) × {worker_config['workers']}", flush=True)
+        transcribers[key] = ParallelTranscriber(model_size, device=worker_config["device"],
+                                                compute_type=compute_type, workers=worker_config["workers"])
+    return transcribers[key]
+
+
+def handle_transcribe_job(job, progress_callback):
+    import subtitle_generator
+    model_size = job.get("model") or worker_config["model"]
+    compute_type = job.get("compute_type") or worker_config["compute_type"]
+    options = dict(output_dir=job.get("output_dir", subtitle_generator.OUTPUT_DIR),
+                   progress_callback=progress_callback, model_size=model_size, compute_type=compute_type,
+                   force=job.get("force", False))
+    if worker_config["workers"] > 1:
+        options["transcriber"] = get_transcriber(model_size, compute_type)
+        options["chunk_minutes"] = job.get("chunk_minutes", worker_config["chunk_minutes"])
+    else:
+        options["model"] = get_model(model_size, compute_type)
+    return subtitle_generator.generate_subtitles(job["input"], **options)
+
+
+def build_transcribe_job(index, path):
+    return {"id": f"transcribe-{index}", "input": os.path.abspath(path)}
+
+
+def configure(parser):
+    import subtitle_generator
+    parser.add_argument("--model", default=subtitle_generator.DEFAULT_MODEL_SIZE)
+    parser.add_argument("--device", default=subtitle_generator.DEFAULT_DEVICE)
+    parser.add_argument("--compute-type", default=subtitle_generator.DEFAULT_COMPUTE_TYPE)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--chunk-minutes", type=float, default=subtitle_generator.DEFAULT_CHUNK_MINUTES)
+
+
+def preload(args):
+    worker_config.update(model=args.model, device=args.device, compute_type=args.compute_type,
+                         workers=args.workers, chunk_minutes=args.chunk_minutes)
+    if args.workers > 1:
+        get_transcriber()
+    else:
+        get_model()
+
+
+if __name__ == "__main__":
+    worker_main(handle_transcribe_job, build_transcribe_job, preload=preload, configure=configure,
+                description="常驻字幕转写进程", stage="transcribe")
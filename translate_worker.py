@@ -0,0 +1,47 @@
+"""常驻翻译进程：MarianMT 模型只加载一次，按 JSON Lines 协议接收 SRT 翻译任务
+
+    python translate_worker.py --serve                  # GUI 通过 stdin/stdout 提交任务
+    python translate_worker.py --listen 8765            # 监听本机端口
+    python translate_worker.py --submit 8765 a.srt b.srt
+
+任务可带 "preset"（fast / balanced / quality）单独指定解码预设，例如 {"id": "t1", "input": "a.srt", "preset": "fast"}
+"""
+import os
+from job_server import worker_main
+
+
+def handle_translate_job(job, progress_callback):
+    import subtitle_translator
+    input_path = job["input"]
+    if not os.path.exists(input_path):
+        raise FileNotFoundError(f"文件不存在: {input_path}")
+    return subtitle_translator.translate_subtitle_file_local(input_path, progress_callback=progress_callback,
+                                                             batch_size=job.get("batch_size"),
+                                                             max_tokens=job.get("max_tokens"),
+                                                             use_cache=job.get("use_cache", True),
+                                                             force=job.get("force", False),
+                                                             preset=job.get("preset"))
+
+
+def build_translate_job(index, path):
+    return {"id": f"translate-{index}", "input": os.path.abspath(path)}
+
+
+def configure(parser):
+    parser.add_argument("--backend", choices=("ctranslate2", "transformers"), help="翻译后端，默认见 subtitle_translator")
+    parser.add_argument("--preset", choices=("fast", "balanced", "quality"),
+                        help="任务未指定 preset 时使用的解码预设")
+
+
+def preload(args):
+    import subtitle_translator
+    if args.backend:
+        subtitle_translator.TRANSLATION_BACKEND = args.backend
+    if args.preset:
+        subtitle_translator.DEFAULT_PRESET = args.preset
+    subtitle_translator.load_model()
+
+
+if __name__ == "__main__":
+    worker_main(handle_translate_job, build_translate_job, preload=preload, configure=configure, description="常驻字幕翻译进程",
+                stage="translate")
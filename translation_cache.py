@@ -0,0 +1,119 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+DEFAULT_CACHE_PATH = os.path.join("cache", "translation_cache.sqlite3")
+DEFAULT_MAX_ENTRIES = 200000
+# 超过上限时淘汰到上限的该比例，之后再插入约 10% 的新条目才会再次统计和淘汰
+EVICT_TO_RATIO = 0.9
+
+
+def normalize_text(text):
+    return " ".join(text.split())
+
+
+class TranslationCache:
+    """磁盘翻译缓存（SQLite）：按 规范化原文 + 模型名 + 解码参数 作为键，超过上限时按最近使用时间淘汰。
+    条目数只在打开时统计一次，之后按插入条数估算上界（INSERT OR REPLACE 可能只是替换），
+    估算超过上限时才重新 COUNT，不在每批写入时扫描全表"""
+
+    def __init__(self, path=DEFAULT_CACHE_PATH, max_entries=DEFAULT_MAX_ENTRIES):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS translations ("
+            " key TEXT PRIMARY KEY,"
+            " source TEXT NOT NULL,"
+            " translation TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS idx_last_used ON translations(last_used)")
+        self.conn.commit()
+        self.count_upper_bound = self.count_entries()
+
+    @staticmethod
+    def make_key(text, model_name, params):
+        payload = json.dumps([normalize_text(text), model_name, params], sort_keys=True, ensure_ascii=False)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def get_many(self, texts, model_name, params):
+        """返回 {原文: 译文}，只包含命中的条目"""
+        keys = {}
+        for t in set(texts):
+            keys.setdefault(self.make_key(t, model_name, params), []).append(t)
+        found = {}
+        with self.lock:
+            key_list = list(keys)
+            hit_keys = []
+            for start in range(0, len(key_list), 500):
+                chunk = key_list[start:start + 500]
+                placeholders = ",".join("?" * len(chunk))
+                rows = self.conn.execute(
+                    f"SELECT key, translation FROM translations WHERE key IN ({placeholders})", chunk
+                ).fetchall()
+                for key, translation in rows:
+                    hit_keys.append(key)
+                    for t in keys[key]:
+                        found[t] = translation
+            if hit_keys:
+                now = time.time()
+                self.conn.executemany("UPDATE translations SET last_used = ? WHERE key = ?",
+                                      [(now, key) for key in hit_keys])
+                self.conn.commit()
+            self.hits += len(hit_keys)
+            self.misses += len(keys) - len(hit_keys)
+        return found
+
+    def get(self, text, model_name, params):
+        return self.get_many([text], model_name, params).get(text)
+
+    def put_many(self, pairs, model_name, params):
+        """pairs: [(原文, 译文), ...]"""
+        now = time.time()
+        with self.lock:
+            self.conn.executemany(
+                "INSERT OR REPLACE INTO translations (key, source, translation, last_used) VALUES (?, ?, ?, ?)",
+                [(self.make_key(src, model_name, params), normalize_text(src), dst, now) for src, dst in pairs]
+            )
+            self.conn.commit()
+            self.count_upper_bound += len(pairs)
+            if self.count_upper_bound > self.max_entries:
+                self.evict()
+
+    def put(self, text, translation, model_name, params):
+        self.put_many([(text, translation)], model_name, params)
+
+    def count_entries(self):
+        return self.conn.execute("SELECT COUNT(*) FROM translations").fetchone()[0]
+
+    def evict(self):
+        count = self.count_entries()
+        if count > self.max_entries:
+            overflow = count - int(self.max_entries * EVICT_TO_RATIO)
+            self.conn.execute(
+                "DELETE FROM translations WHERE key IN "
+                "(SELECT key FROM translations ORDER BY last_used ASC LIMIT ?)",
+                (overflow,)
+            )
+            self.conn.commit()
+            count -= overflow
+        self.count_upper_bound = count
+
+    def stats(self):
+        with self.lock:
+            size = self.count_entries()
+        return {"hits": self.hits, "misses": self.misses, "entries": size}
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
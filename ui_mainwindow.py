@@ -1,5 +1,5 @@
 from PyQt5.QtWidgets import (
-    QLabel, QPushButton, QTextEdit, QComboBox,
+    QLabel, QPushButton, QTextEdit, QPlainTextEdit, QComboBox,
     QListWidget, QVBoxLayout, QHBoxLayout, QCheckBox, QWidget
 )
 from PyQt5.QtGui import QFont
@@ -46,6 +46,26 @@ class Ui_MainWindow:
         self.quality_combo.addItems(["1080p", "720p", "480p", "360p"])
         quality_layout.addWidget(quality_label)
         quality_layout.addWidget(self.quality_combo)
+        fuse_mode_label = QLabel("融合方式:")
+        fuse_mode_label.setFont(QFont("微软雅黑", 12))
+        self.fuse_mode_combo = QComboBox()
+        self.fuse_mode_combo.setFont(QFont("微软雅黑", 12))
+        self.fuse_mode_combo.addItem("烧录字幕（重新编码）", "burn")
+        self.fuse_mode_combo.addItem("分段并行烧录", "parallel")
+        self.fuse_mode_combo.addItem("软字幕（不重新编码）", "soft")
+        translate_preset_label = QLabel("翻译质量:")
+        translate_preset_label.setFont(QFont("微软雅黑", 12))
+        self.translate_preset_combo = QComboBox()
+        self.translate_preset_combo.setFont(QFont("微软雅黑", 12))
+        self.translate_preset_combo.addItem("高质量（束搜索）", "quality")
+        self.translate_preset_combo.addItem("均衡", "balanced")
+        self.translate_preset_combo.addItem("快速（贪心解码）", "fast")
+        quality_layout.addSpacing(20)
+        quality_layout.addWidget(fuse_mode_label)
+        quality_layout.addWidget(self.fuse_mode_combo)
+        quality_layout.addSpacing(20)
+        quality_layout.addWidget(translate_preset_label)
+        quality_layout.addWidget(self.translate_preset_combo)
         quality_layout.addStretch()
         main_layout.addLayout(quality_layout)
 
@@ -92,9 +112,10 @@ class Ui_MainWindow:
             pipeline_layout.addWidget(btn)
         main_layout.addLayout(pipeline_layout)
 
-        # 输出日志
-        self.output_text = QTextEdit()
+        # 输出日志（纯文本控件，行数上限由 app.LogView 设置）
+        self.output_text = QPlainTextEdit()
         self.output_text.setReadOnly(True)
+        self.output_text.setUndoRedoEnabled(False)
         self.output_text.setFont(QFont("Consolas", 10))
         self.output_text.setStyleSheet("background-color: #f5f5f5;")
         main_layout.addWidget(self.output_text, stretch=1)